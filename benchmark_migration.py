@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+STR Migration Throughput Benchmark
+- Replays synthetic plans (100 / 1k / 10k files) against mock_graph_server.py
+- Reports files/s, bytes/s, p50/p95/p99 latency per pipeline step and peak RSS
+  (step timings come from the migration's own metrics)
+- Reports the scheduler's projected makespan against the measured one
+- Each plan runs in its own process so peak RSS is per run
+"""
+
+import sys
+import os
+import json
+import time
+import random
+import logging
+import resource
+import subprocess
+import tempfile
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+class BenchConfig:
+    FILE_COUNTS = [100, 1000, 10000]
+    WORKERS = 8
+    SEED = 42
+
+    # Synthetic size mix: (share of files, min bytes, max bytes)
+    SIZE_PROFILE = [
+        (0.80, 20 * 1024, 200 * 1024),              # screenshots and PNG diagrams
+        (0.17, 500 * 1024, 2 * 1024 * 1024),        # PDFs and slide decks
+        (0.03, 5 * 1024 * 1024, 12 * 1024 * 1024),  # large exports (upload sessions)
+    ]
+    DUPLICATE_RATIO = 0.0   # share of files re-using another file's content
+
+    # Client-side limiter ceiling for the replay; the production default
+    # (50 req/s) would make the limiter, not the pipeline, the bottleneck
+    RATE_LIMIT = 2000.0
+
+    STEPS = ["reconcile", "transfer", "download", "upload", "link", "backup", "update",
+             "batch_link", "batch_backup", "batch_update", "http_request", "file"]
+
+# ============================================================================
+# SYNTHETIC PLANS
+# ============================================================================
+
+def make_plan(count: int, seed: int = BenchConfig.SEED,
+              duplicate_ratio: float = BenchConfig.DUPLICATE_RATIO,
+              size_scale: float = 1.0) -> Tuple[Dict[str, Dict], List[Dict]]:
+    """Build mock OneDrive sources and the matching migration plan"""
+    rng = random.Random(seed)
+    sources = {}
+    plan = []
+
+    for i in range(count):
+        roll = rng.random()
+        for share, low, high in BenchConfig.SIZE_PROFILE:
+            if roll < share:
+                break
+            roll -= share
+        size = max(1, int(rng.randint(low, high) * size_scale))
+
+        content_key = f"content-{i}"
+        if i and rng.random() < duplicate_ratio:
+            original = sources[f"OD{rng.randrange(i):08d}"]
+            content_key, size = original["content_key"], original["size"]
+
+        item_id = f"OD{i:08d}"
+        token = f"Eb{i:08d}"
+        sources[item_id] = {
+            "name": f"{i:08d}-synthetic-diagram-{i}.png",
+            "size": size,
+            "content_key": content_key,
+            "share_token": token
+        }
+        plan.append({
+            "product": f"Synthetic Product {i:06d}",
+            "sharepoint_id": token,
+            "old_url": f"https://example-my.sharepoint.com/:i:/g/personal/joseph_brashear/{token}",
+            "status": "Approved",
+            "csv_row": str(i + 1),
+            "onedrive_item_id": item_id
+        })
+
+    return sources, plan
+
+# ============================================================================
+# REPLAY (child process)
+# ============================================================================
+
+def replay(plan_path: Path, graph_base: str, workers: int, batch: bool, dedup: bool,
+           schedule: bool = True, latency: float = None, bandwidth: float = None) -> Dict:
+    """Run one migration of a synthetic plan in the current directory"""
+    from str_migration_robust import Config, GraphAPIClient, RateLimiter, STRMigration, metrics
+
+    Config.GRAPH_BASE = graph_base
+    Config.SITE_ID, Config.DRIVE_ID, Config.LIST_ID = "bench-site", "bench-drive", "bench-list"
+    Config.MAX_WORKERS = workers
+    Config.BATCH_LIST_UPDATES = batch
+    Config.BATCH_CREATE_LINK = batch
+    Config.DEDUP_ENABLED = dedup
+    Config.SCHEDULE_ENABLED = schedule
+    if latency is not None:
+        Config.PLAN_REQUEST_LATENCY = latency
+    if bandwidth:
+        Config.PLAN_BANDWIDTH = bandwidth
+    Config.LOG_DIR.mkdir(exist_ok=True)
+
+    logger = logging.getLogger("STRBenchmark")
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+
+    with open(plan_path, 'r') as f:
+        plan = json.load(f)
+
+    migrator = STRMigration(logger=logger)
+    migrator.api_client = GraphAPIClient(
+        {"Authorization": "Bearer benchmark"}, logger,
+        pool_size=max(Config.HTTP_POOL_SIZE, workers),
+        limiter=RateLimiter(rate=BenchConfig.RATE_LIMIT, max_rate=BenchConfig.RATE_LIMIT,
+                            burst=max(Config.RATE_LIMIT_BURST, workers))
+    )
+    migrator.backup_mgr.api_client = migrator.api_client
+
+    started = time.perf_counter()
+    results = migrator.run_migration(plan, workers=workers)
+    elapsed = time.perf_counter() - started
+    migrator.shutdown()
+
+    snapshot = metrics.snapshot()
+    bytes_uploaded = snapshot["counters"].get("bytes_uploaded", 0)
+
+    return {
+        "files": len(plan),
+        "completed": results["completed"],
+        "failed": results["failed"],
+        "seconds": elapsed,
+        "files_per_s": results["completed"] / elapsed if elapsed else 0.0,
+        "bytes_uploaded": bytes_uploaded,
+        "bytes_per_s": bytes_uploaded / elapsed if elapsed else 0.0,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "steps": snapshot["steps"],
+        "counters": snapshot["counters"],
+        "errors": dict(Counter(error["error"] for error in results["errors"])),
+        "rate_limiter": results.get("rate_limiter", {}),
+        "dedup": results.get("dedup", {}),
+        "schedule": results.get("schedule", {})
+    }
+
+# ============================================================================
+# BENCHMARK DRIVER
+# ============================================================================
+
+def run_benchmark(count: int, args) -> Dict:
+    """Serve a synthetic plan from the mock server and replay it in a child process"""
+    from mock_graph_server import start_server
+
+    sources, plan = make_plan(count, args.seed, args.duplicate_ratio, args.size_scale)
+    server = start_server(sources, list_items={
+        entry["csv_row"]: {"Architecture_Diagram_Picture": entry["old_url"]} for entry in plan
+    })
+    graph_base = f"http://127.0.0.1:{server.server_port}/v1.0"
+
+    try:
+        with tempfile.TemporaryDirectory(prefix=f"str_bench_{count}_") as workdir:
+            plan_path = Path(workdir) / "plan.json"
+            result_path = Path(workdir) / "result.json"
+            with open(plan_path, 'w') as f:
+                json.dump(plan, f)
+
+            command = [
+                sys.executable, str(Path(__file__).resolve()), "--replay", str(plan_path),
+                "--graph-base", graph_base, "--workers", str(args.workers),
+                "--result", str(result_path)
+            ]
+            if args.batch:
+                command.append("--batch")
+            if args.no_dedup:
+                command.append("--no-dedup")
+            if args.no_schedule:
+                command.append("--no-schedule")
+            # Project with the conditions the mock server simulates
+            command += ["--plan-latency", str(args.latency_ms / 1000)]
+            if args.bandwidth:
+                command += ["--plan-bandwidth", str(args.bandwidth * args.workers)]
+
+            env = dict(os.environ)
+            env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(Path(__file__).resolve().parent),
+                                                              env.get("PYTHONPATH")]))
+            subprocess.run(command, cwd=workdir, env=env, check=True)
+
+            with open(result_path, 'r') as f:
+                return json.load(f)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def print_report(runs: List[Dict]):
+    """Print throughput and per-step latency tables"""
+    print(f"\n{'='*80}")
+    print("THROUGHPUT")
+    print(f"{'='*80}")
+    print(f"{'Files':>8} {'OK':>8} {'Failed':>7} {'Seconds':>9} {'Files/s':>9} {'MB/s':>8} "
+          f"{'Requests':>9} {'Throttled':>10} {'Peak RSS MB':>12}")
+    for run in runs:
+        limiter = run["rate_limiter"]
+        print(f"{run['files']:>8} {run['completed']:>8} {run['failed']:>7} {run['seconds']:>9.2f} "
+              f"{run['files_per_s']:>9.1f} {run['bytes_per_s'] / 1e6:>8.1f} "
+              f"{limiter.get('requests', 0):>9} {limiter.get('throttle_count', 0):>10} "
+              f"{run['peak_rss_mb']:>12.1f}")
+        for error, count in run["errors"].items():
+            print(f"{'':>8} {count} × {error}")
+
+    print(f"\n{'='*80}")
+    print("MAKESPAN (s)   projected from sizes / measured file times replayed")
+    print(f"{'='*80}")
+    print(f"{'Files':>8} {'Order':<10} {'Projected':>10} {'(plan)':>8} {'Actual':>8} "
+          f"{'Replayed':>9} {'(plan)':>8}")
+    for run in runs:
+        schedule = run["schedule"]
+        if schedule:
+            print(f"{run['files']:>8} {'scheduled' if schedule['enabled'] else 'plan':<10} "
+                  f"{schedule['projected_seconds']:>10.1f} {schedule['projected_plan_order_seconds']:>8.1f} "
+                  f"{schedule['actual_seconds']:>8.1f} {schedule['replayed_seconds']:>9.1f} "
+                  f"{schedule['replayed_plan_order_seconds']:>8.1f}")
+
+    print(f"\n{'='*80}")
+    print("STEP LATENCY (ms)")
+    print(f"{'='*80}")
+    print(f"{'Files':>8} {'Step':<14} {'Count':>7} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for run in runs:
+        for step in BenchConfig.STEPS:
+            stats = run["steps"].get(step)
+            if stats and stats["count"]:
+                print(f"{run['files']:>8} {step:<14} {stats['count']:>7} {stats['p50'] * 1000:>9.1f} "
+                      f"{stats['p95'] * 1000:>9.1f} {stats['p99'] * 1000:>9.1f}")
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def main():
+    import argparse
+    from mock_graph_server import MockConfig
+
+    parser = argparse.ArgumentParser(description="Benchmark run_migration against a local mock Graph server")
+    parser.add_argument("--files", default=",".join(str(n) for n in BenchConfig.FILE_COUNTS),
+                        help="Comma-separated plan sizes to replay")
+    parser.add_argument("--workers", type=int, default=BenchConfig.WORKERS)
+    parser.add_argument("--batch", action="store_true", help="Replay with --batch --batch-links")
+    parser.add_argument("--no-dedup", action="store_true", help="Replay with --no-dedup")
+    parser.add_argument("--no-schedule", action="store_true", help="Replay in plan order (--no-schedule)")
+    parser.add_argument("--seed", type=int, default=BenchConfig.SEED)
+    parser.add_argument("--size-scale", type=float, default=1.0,
+                        help="Multiply every synthetic file size (e.g. 0.01 for a quick run)")
+    parser.add_argument("--duplicate-ratio", type=float, default=BenchConfig.DUPLICATE_RATIO)
+    parser.add_argument("--latency-ms", type=float, default=MockConfig.LATENCY_MS,
+                        help="Mean added server latency per request")
+    parser.add_argument("--bandwidth", type=int, default=MockConfig.BANDWIDTH,
+                        help="Server response bandwidth in bytes/second (0 = unlimited)")
+    parser.add_argument("--throttle-rate", type=float, default=MockConfig.THROTTLE_RATE,
+                        help="Probability of an injected 429")
+    parser.add_argument("--retry-after", type=float, default=MockConfig.RETRY_AFTER)
+    parser.add_argument("--error-rate", type=float, default=MockConfig.ERROR_RATE,
+                        help="Probability of an injected 500/503")
+    parser.add_argument("--json", default=None, help="Also write the results to this JSON file")
+
+    # Internal: run one replay in this process
+    parser.add_argument("--replay", help=argparse.SUPPRESS)
+    parser.add_argument("--graph-base", help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    parser.add_argument("--plan-latency", type=float, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--plan-bandwidth", type=float, default=None, help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+
+    if args.replay:
+        result = replay(Path(args.replay), args.graph_base, args.workers, args.batch, not args.no_dedup,
+                        not args.no_schedule, args.plan_latency, args.plan_bandwidth)
+        with open(args.result, 'w') as f:
+            json.dump(result, f)
+        return
+
+    MockConfig.LATENCY_MS = args.latency_ms
+    MockConfig.BANDWIDTH = args.bandwidth
+    MockConfig.THROTTLE_RATE = args.throttle_rate
+    MockConfig.RETRY_AFTER = args.retry_after
+    MockConfig.ERROR_RATE = args.error_rate
+
+    runs = []
+    for count in (int(n) for n in args.files.split(",") if n.strip()):
+        print(f"Replaying {count} synthetic files with {args.workers} workers...", flush=True)
+        runs.append(run_benchmark(count, args))
+
+    print_report(runs)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({"config": vars(args), "runs": runs}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Microsoft Graph endpoints used by str_migration_robust.py
+- OneDrive content/metadata/delta, /shares resolution
+- SharePoint simple upload, upload sessions, createLink, drive item lookups
+- List item GET/PATCH, list item delta and JSON $batch
+- Configurable latency, bandwidth, 429/Retry-After, 5xx and corrupted-upload injection
+"""
+
+import sys
+import base64
+import json
+import re
+import time
+import random
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+from urllib.parse import unquote, urlsplit, parse_qs
+
+from str_migration_robust import QuickXorHash
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+class MockConfig:
+    LATENCY_MS = 0.0          # mean added latency per request (uniform ±50%)
+    BANDWIDTH = 0             # bytes/second per response body, 0 = unlimited
+    THROTTLE_RATE = 0.0       # probability of a 429
+    RETRY_AFTER = 1.0         # seconds advertised on injected 429s
+    ERROR_RATE = 0.0          # probability of a 503/500
+    CORRUPT_RATE = 0.0        # probability an upload is stored with one byte flipped
+    DELTA_PAGE_SIZE = 200
+
+Response = Tuple[int, Dict[str, str], object]  # (status, headers, JSON-able or bytes)
+
+# ============================================================================
+# STATE
+# ============================================================================
+
+class GraphState:
+    """In-memory OneDrive source, SharePoint drive and STR list"""
+
+    def __init__(self, sources: Dict[str, Dict], list_items: Dict[str, Dict] = None):
+        self.lock = threading.Lock()
+        self.sources = sources       # OneDrive item id → {"name", "size", "content_key", "share_token"}
+        self.shares = {s["share_token"]: item_id for item_id, s in sources.items() if s.get("share_token")}
+        self.drive = {}              # drive item id → {"id", "name", "size", "sha256"}
+        self.drive_names = {}        # name → drive item id
+        self.sessions = {}           # session id → {"name", "size", "data"}
+        self.list_items = {}         # list item id → fields
+        self.list_changes = {}       # list item id → change sequence number of its last write
+        self.list_seq = 0
+        for item_id, fields in (list_items or {}).items():
+            self.list_items[item_id] = dict(fields)
+            self.touch(item_id)
+        self.counter = 0
+
+    def next_id(self, prefix: str) -> str:
+        with self.lock:
+            self.counter += 1
+            return f"{prefix}{self.counter:08d}"
+
+    @staticmethod
+    def content(source: Dict) -> bytes:
+        """Deterministic bytes for a source item"""
+        block = hashlib.sha256(source["content_key"].encode()).digest() * 2048
+        repeats, remainder = divmod(source["size"], len(block))
+        return block * repeats + block[:remainder]
+
+    def list_item(self, item_id: str) -> Dict:
+        """Fields of a list item, created empty on first use (caller holds the lock)"""
+        if item_id not in self.list_items:
+            self.list_items[item_id] = {"Architecture_Diagram_Picture": ""}
+            self.touch(item_id)
+        return self.list_items[item_id]
+
+    def touch(self, item_id: str):
+        """Record a list item change for delta queries (caller holds the lock)"""
+        self.list_seq += 1
+        self.list_changes[item_id] = self.list_seq
+
+    def store(self, name: str, data: bytes) -> Dict:
+        """Create or replace a drive item by name"""
+        if data and random.random() < MockConfig.CORRUPT_RATE:
+            position = random.randrange(len(data))
+            data = data[:position] + bytes([data[position] ^ 0xFF]) + data[position + 1:]
+
+        quick_xor = QuickXorHash()
+        quick_xor.update(data)
+
+        with self.lock:
+            item_id = self.drive_names.get(name)
+        item_id = item_id or self.next_id("SP")
+
+        item = {
+            "id": item_id,
+            "name": name,
+            "size": len(data),
+            "eTag": f'"{item_id},{time.time()}"',
+            "file": {"hashes": {"sha256Hash": hashlib.sha256(data).hexdigest().upper(),
+                                "quickXorHash": quick_xor.base64digest()}}
+        }
+        with self.lock:
+            self.drive[item_id] = item
+            self.drive_names[name] = item_id
+        return item
+
+# ============================================================================
+# ROUTES
+# ============================================================================
+
+class GraphRouter:
+    """Maps (method, path) to handlers that return (status, headers, body)"""
+
+    def __init__(self, state: GraphState, base_url: str):
+        self.state = state
+        self.base_url = base_url
+        self.routes = [
+            ("GET", r'^/v1\.0/me/drive/items/([^/]+)/content$', self.get_content),
+            ("GET", r'^/v1\.0/me/drive/items/([^/]+)$', self.get_source),
+            ("GET", r'^/v1\.0/me/drive/root/delta$', self.get_delta),
+            ("GET", r'^/v1\.0/shares/([^/]+)/driveItem$', self.get_share),
+            ("PUT", r'^/v1\.0/drives/[^/]+/root:/(.+):/content$', self.put_content),
+            ("POST", r'^/v1\.0/drives/[^/]+/root:/(.+):/createUploadSession$', self.create_session),
+            ("GET", r'^/v1\.0/drives/[^/]+/root:/(.+)$', self.get_by_name),
+            ("GET", r'^/v1\.0/drives/[^/]+/root/children$', self.get_children),
+            ("POST", r'^/v1\.0/drives/[^/]+/items/([^/]+)/createLink$', self.create_link),
+            ("GET", r'^/v1\.0/drives/[^/]+/items/([^/]+)$', self.get_drive_item),
+            ("GET", r'^/v1\.0/sites/[^/]+/lists/[^/]+/items/delta$', self.get_list_delta),
+            ("GET", r'^/v1\.0/sites/[^/]+/lists/[^/]+/items/([^/]+)$', self.get_list_item),
+            ("PATCH", r'^/v1\.0/sites/[^/]+/lists/[^/]+/items/([^/]+)$', self.patch_list_item),
+            ("POST", r'^/v1\.0/\$batch$', self.batch),
+            ("PUT", r'^/upload/([^/]+)$', self.put_range),
+            ("GET", r'^/upload/([^/]+)$', self.get_session),
+            ("DELETE", r'^/upload/([^/]+)$', self.delete_session),
+        ]
+        self.routes = [(m, re.compile(p), h) for m, p, h in self.routes]
+
+    def dispatch(self, method: str, target: str, headers: Dict[str, str], body: bytes) -> Response:
+        """Route one request, with fault injection"""
+        roll = random.random()
+        if roll < MockConfig.THROTTLE_RATE:
+            return 429, {"Retry-After": str(MockConfig.RETRY_AFTER)}, {"error": {"code": "TooManyRequests"}}
+        if roll < MockConfig.THROTTLE_RATE + MockConfig.ERROR_RATE:
+            return random.choice([500, 503]), {}, {"error": {"code": "ServiceUnavailable"}}
+
+        parts = urlsplit(target)
+        path = unquote(parts.path)
+        query = parse_qs(parts.query)
+
+        for route_method, pattern, handler in self.routes:
+            match = pattern.match(path)
+            if match and route_method == method:
+                return handler(match, query, headers, body)
+
+        return 404, {}, {"error": {"code": "itemNotFound", "message": f"{method} {path}"}}
+
+    # OneDrive source -----------------------------------------------------------
+
+    def get_content(self, match, query, headers, body) -> Response:
+        source = self.state.sources.get(match.group(1))
+        if not source:
+            return 404, {}, {"error": {"code": "itemNotFound"}}
+
+        data = self.state.content(source)
+        range_header = headers.get("Range", "")
+        if range_header.startswith("bytes="):
+            start = int(range_header[6:].split("-")[0])
+            return 206, {"Content-Type": "application/octet-stream"}, data[start:]
+
+        return 200, {"Content-Type": "application/octet-stream"}, data
+
+    def get_source(self, match, query, headers, body) -> Response:
+        item_id = match.group(1)
+        source = self.state.sources.get(item_id)
+        if not source:
+            return 404, {}, {"error": {"code": "itemNotFound"}}
+        return 200, {}, self._source_item(item_id, source)
+
+    @staticmethod
+    def _source_item(item_id: str, source: Dict) -> Dict:
+        return {"id": item_id, "name": source["name"], "size": source["size"],
+                "eTag": f'"{item_id},1"', "file": {}}
+
+    def get_delta(self, match, query, headers, body) -> Response:
+        ids = sorted(self.state.sources)
+        offset = int(query.get("page", ["0"])[0])
+        if query.get("token"):
+            # No changes since any previously issued token
+            return 200, {}, {"value": [], "@odata.deltaLink": f"{self.base_url}/v1.0/me/drive/root/delta?token=1"}
+
+        page = ids[offset:offset + MockConfig.DELTA_PAGE_SIZE]
+        result = {"value": [self._source_item(i, self.state.sources[i]) for i in page]}
+        if offset + MockConfig.DELTA_PAGE_SIZE < len(ids):
+            result["@odata.nextLink"] = f"{self.base_url}/v1.0/me/drive/root/delta?page={offset + len(page)}"
+        else:
+            result["@odata.deltaLink"] = f"{self.base_url}/v1.0/me/drive/root/delta?token=1"
+        return 200, {}, result
+
+    def get_share(self, match, query, headers, body) -> Response:
+        encoded = match.group(1)[2:]
+        url = base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4)).decode()
+        item_id = self.state.shares.get(url.rstrip("/").rsplit("/", 1)[-1])
+        if not item_id:
+            return 404, {}, {"error": {"code": "itemNotFound"}}
+        return 200, {}, self._source_item(item_id, self.state.sources[item_id])
+
+    # SharePoint drive ----------------------------------------------------------
+
+    def put_content(self, match, query, headers, body) -> Response:
+        return 201, {}, self.state.store(match.group(1), body)
+
+    def create_session(self, match, query, headers, body) -> Response:
+        session_id = self.state.next_id("US")
+        with self.state.lock:
+            self.state.sessions[session_id] = {"name": match.group(1), "data": bytearray(), "size": None}
+        return 200, {}, {"uploadUrl": f"{self.base_url}/upload/{session_id}"}
+
+    def put_range(self, match, query, headers, body) -> Response:
+        with self.state.lock:
+            session = self.state.sessions.get(match.group(1))
+        if session is None:
+            return 404, {}, {"error": {"code": "itemNotFound"}}
+
+        span, total = headers.get("Content-Range", "bytes 0-0/0")[6:].split("/")
+        start, end = (int(x) for x in span.split("-"))
+        if start != len(session["data"]) or end - start + 1 != len(body):
+            return 416, {}, {"error": {"code": "invalidRange"},
+                             "nextExpectedRanges": [f"{len(session['data'])}-"]}
+
+        session["data"].extend(body)
+        if len(session["data"]) < int(total):
+            return 202, {}, {"nextExpectedRanges": [f"{len(session['data'])}-"]}
+
+        with self.state.lock:
+            del self.state.sessions[match.group(1)]
+        return 201, {}, self.state.store(session["name"], bytes(session["data"]))
+
+    def get_session(self, match, query, headers, body) -> Response:
+        session = self.state.sessions.get(match.group(1))
+        if session is None:
+            return 404, {}, {"error": {"code": "itemNotFound"}}
+        return 200, {}, {"nextExpectedRanges": [f"{len(session['data'])}-"]}
+
+    def delete_session(self, match, query, headers, body) -> Response:
+        with self.state.lock:
+            self.state.sessions.pop(match.group(1), None)
+        return 204, {}, b""
+
+    def get_by_name(self, match, query, headers, body) -> Response:
+        item_id = self.state.drive_names.get(match.group(1))
+        if not item_id:
+            return 404, {}, {"error": {"code": "itemNotFound"}}
+        return 200, {}, self.state.drive[item_id]
+
+    def get_children(self, match, query, headers, body) -> Response:
+        with self.state.lock:
+            names = sorted(self.state.drive_names)
+        offset = int(query.get("page", ["0"])[0])
+
+        page = names[offset:offset + MockConfig.DELTA_PAGE_SIZE]
+        result = {"value": [{"name": name} for name in page]}
+        if offset + MockConfig.DELTA_PAGE_SIZE < len(names):
+            result["@odata.nextLink"] = (f"{self.base_url}/v1.0/drives/{match.group(0).split('/')[3]}"
+                                         f"/root/children?page={offset + len(page)}")
+        return 200, {}, result
+
+    def get_drive_item(self, match, query, headers, body) -> Response:
+        item = self.state.drive.get(match.group(1))
+        if not item:
+            return 404, {}, {"error": {"code": "itemNotFound"}}
+        return 200, {}, item
+
+    def create_link(self, match, query, headers, body) -> Response:
+        item_id = match.group(1)
+        if item_id not in self.state.drive:
+            return 404, {}, {"error": {"code": "itemNotFound"}}
+        return 201, {}, {"link": {"type": "view", "scope": "organization",
+                                  "webUrl": f"https://mock.sharepoint.local/:b:/s/str/{item_id}"}}
+
+    # STR list ------------------------------------------------------------------
+
+    def get_list_item(self, match, query, headers, body) -> Response:
+        item_id = match.group(1)
+        with self.state.lock:
+            fields = self.state.list_item(item_id)
+            return 200, {}, {"id": item_id, "fields": dict(fields)}
+
+    def patch_list_item(self, match, query, headers, body) -> Response:
+        item_id = match.group(1)
+        updates = json.loads(body or b"{}").get("fields", {})
+        with self.state.lock:
+            fields = self.state.list_item(item_id)
+            fields.update(updates)
+            self.state.touch(item_id)
+            return 200, {}, {"id": item_id, "fields": dict(fields)}
+
+    def get_list_delta(self, match, query, headers, body) -> Response:
+        """Items changed after `token` (everything without one), paged by `page`"""
+        since = int(query.get("token", ["0"])[0])
+        offset = int(query.get("page", ["0"])[0])
+        top = int(query.get("$top", [str(MockConfig.DELTA_PAGE_SIZE)])[0])
+        selected = re.search(r'\$select=([^)]*)', query.get("$expand", [""])[0])
+        names = selected.group(1).split(",") if selected else None
+
+        with self.state.lock:
+            changed = sorted(i for i, seq in self.state.list_changes.items() if seq > since)
+            page = [(i, dict(self.state.list_items[i])) for i in changed[offset:offset + top]]
+            latest = self.state.list_seq
+
+        result = {"value": [
+            {"id": i, "eTag": f'"{i},{self.state.list_changes.get(i)}"',
+             "fields": {k: v for k, v in fields.items() if names is None or k in names}}
+            for i, fields in page
+        ]}
+        link = f"{self.base_url}{match.group(0)}?token={since}&$top={top}&$expand={query.get('$expand', [''])[0]}"
+        if offset + top < len(changed):
+            result["@odata.nextLink"] = f"{link}&page={offset + len(page)}"
+        else:
+            result["@odata.deltaLink"] = link.replace(f"token={since}", f"token={latest}", 1)
+        return 200, {}, result
+
+    def batch(self, match, query, headers, body) -> Response:
+        requests_in = json.loads(body).get("requests", [])
+        if len(requests_in) > 20:
+            return 400, {}, {"error": {"code": "BadRequest", "message": "Too many requests in batch"}}
+
+        responses = []
+        for sub in requests_in:
+            sub_body = json.dumps(sub["body"]).encode() if "body" in sub else b""
+            status, sub_headers, result = self.dispatch(
+                sub["method"], "/v1.0" + sub["url"], sub.get("headers", {}), sub_body
+            )
+            responses.append({"id": sub["id"], "status": status, "headers": sub_headers,
+                              "body": result if not isinstance(result, bytes) else None})
+
+        return 200, {}, {"responses": responses}
+
+# ============================================================================
+# HTTP SERVER
+# ============================================================================
+
+class GraphHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+    def _handle(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+
+        if MockConfig.LATENCY_MS:
+            time.sleep(MockConfig.LATENCY_MS / 1000 * random.uniform(0.5, 1.5))
+
+        status, headers, result = self.server.router.dispatch(self.command, self.path, dict(self.headers), body)
+
+        payload = result if isinstance(result, bytes) else json.dumps(result).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if not isinstance(result, bytes):
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self._write(payload)
+
+    def _write(self, payload: bytes):
+        """Write the body, paced to the configured bandwidth"""
+        if not MockConfig.BANDWIDTH:
+            self.wfile.write(payload)
+            return
+
+        chunk = max(1024, MockConfig.BANDWIDTH // 20)
+        for start in range(0, len(payload), chunk):
+            self.wfile.write(payload[start:start + chunk])
+            time.sleep(len(payload[start:start + chunk]) / MockConfig.BANDWIDTH)
+
+    do_GET = do_PUT = do_POST = do_PATCH = do_DELETE = _handle
+
+    def log_message(self, format, *args):
+        pass
+
+def start_server(sources: Dict[str, Dict], port: int = 0,
+                 list_items: Dict[str, Dict] = None) -> ThreadingHTTPServer:
+    """Start the mock server on a background thread, optionally with a pre-filled STR list.
+
+    Each server has its own router and state (server.router), so several
+    can run in one process.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), GraphHandler)
+    server.daemon_threads = True
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    server.router = GraphRouter(GraphState(sources, list_items), base_url)
+    threading.Thread(target=server.serve_forever, name="mock-graph", daemon=True).start()
+    return server
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Mock Microsoft Graph server for migration benchmarks")
+    parser.add_argument("--sources", required=True,
+                        help="JSON file mapping OneDrive item id → {name, size, content_key, share_token}")
+    parser.add_argument("--port", type=int, default=0, help="Port to listen on (0 = any free port)")
+    parser.add_argument("--latency-ms", type=float, default=MockConfig.LATENCY_MS)
+    parser.add_argument("--bandwidth", type=int, default=MockConfig.BANDWIDTH,
+                        help="Response bandwidth in bytes/second (0 = unlimited)")
+    parser.add_argument("--throttle-rate", type=float, default=MockConfig.THROTTLE_RATE)
+    parser.add_argument("--retry-after", type=float, default=MockConfig.RETRY_AFTER)
+    parser.add_argument("--error-rate", type=float, default=MockConfig.ERROR_RATE)
+    parser.add_argument("--corrupt-rate", type=float, default=MockConfig.CORRUPT_RATE,
+                        help="Probability an upload is stored with one byte flipped")
+
+    args = parser.parse_args()
+
+    MockConfig.LATENCY_MS = args.latency_ms
+    MockConfig.BANDWIDTH = args.bandwidth
+    MockConfig.THROTTLE_RATE = args.throttle_rate
+    MockConfig.RETRY_AFTER = args.retry_after
+    MockConfig.ERROR_RATE = args.error_rate
+    MockConfig.CORRUPT_RATE = args.corrupt_rate
+
+    with open(args.sources, 'r') as f:
+        sources = json.load(f)
+
+    server = start_server(sources, args.port)
+    print(f"Listening on http://127.0.0.1:{server.server_port}/v1.0", flush=True)
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        sys.exit(0)
+
+if __name__ == "__main__":
+    main()
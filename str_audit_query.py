@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+STR Migration Audit Log Query
+- Looks up audit.jsonl records by product, event type, status and time range
+- Keeps a sidecar offset index (audit.jsonl.idx) next to the log
+- The index is brought up to date incrementally on every query
+"""
+
+import sys
+import json
+import base64
+import hashlib
+import logging
+import os
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+class QueryConfig:
+    AUDIT_LOG = Path("migration_logs/audit.jsonl")
+    INDEX_SUFFIX = ".idx"
+    INDEX_VERSION = 1
+    HEAD_BYTES = 4096   # fingerprint of the log start, to notice a replaced log
+
+    # Indexed fields: name → how to read it from a record
+    FIELDS = {
+        "product": lambda record: (record.get("data") or {}).get("product"),
+        "event_type": lambda record: record.get("event_type"),
+        "status": lambda record: record.get("status"),
+    }
+
+def index_key(value) -> str:
+    """Case- and whitespace-insensitive posting key"""
+    return str(value).strip().casefold()
+
+def parse_time(value: str) -> float:
+    """ISO-8601 timestamp (UTC unless it says otherwise) → epoch seconds"""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+def _encode(values: array) -> str:
+    return base64.b64encode(values.tobytes()).decode()
+
+def _decode(typecode: str, text: str) -> array:
+    values = array(typecode)
+    values.frombytes(base64.b64decode(text))
+    return values
+
+# ============================================================================
+# INDEX
+# ============================================================================
+
+class AuditIndex:
+    """Byte offsets of audit records, with postings per indexed field.
+
+    Record i starts at offsets[i] and was logged at times[i]. Postings map
+    a field value to the record numbers that carry it, in log order.
+    """
+
+    def __init__(self, log_path: Path):
+        self.log_path = log_path
+        self.index_path = log_path.with_name(log_path.name + QueryConfig.INDEX_SUFFIX)
+        self._reset()
+
+    def _reset(self):
+        self.log_size = 0
+        self.head = None
+        self.head_length = 0   # bytes the fingerprint covers; fixed once taken
+        self.offsets = array('q')
+        self.times = array('d')
+        self.times_sorted = True
+        self.postings = {field: {} for field in QueryConfig.FIELDS}
+        self.skipped = 0
+
+    def _head(self, length: int) -> str:
+        with open(self.log_path, 'rb') as f:
+            return hashlib.sha256(f.read(length)).hexdigest()
+
+    def load(self):
+        """Read the sidecar index, discarding it if it no longer matches the log"""
+        self._reset()
+        if not self.index_path.exists():
+            return
+
+        try:
+            with open(self.index_path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        if data.get("version") != QueryConfig.INDEX_VERSION:
+            return
+
+        self.log_size = data["log_size"]
+        self.head = data["head"]
+        self.head_length = data["head_length"]
+        self.offsets = _decode('q', data["offsets"])
+        self.times = _decode('d', data["times"])
+        self.times_sorted = data["times_sorted"]
+        self.skipped = data.get("skipped", 0)
+        self.postings = {
+            field: {key: _decode('I', ids) for key, ids in data["postings"].get(field, {}).items()}
+            for field in QueryConfig.FIELDS
+        }
+
+    def save(self):
+        """Atomically write the sidecar index"""
+        data = {
+            "version": QueryConfig.INDEX_VERSION,
+            "log_size": self.log_size,
+            "head": self.head,
+            "head_length": self.head_length,
+            "offsets": _encode(self.offsets),
+            "times": _encode(self.times),
+            "times_sorted": self.times_sorted,
+            "skipped": self.skipped,
+            "postings": {
+                field: {key: _encode(ids) for key, ids in keys.items()}
+                for field, keys in self.postings.items()
+            }
+        }
+
+        tmp = self.index_path.with_name(self.index_path.name + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp, self.index_path)
+
+    def update(self) -> int:
+        """Index records appended since the last update; returns how many were added.
+
+        A log that shrank or whose start changed is re-indexed from scratch.
+        Only complete lines are indexed, so a record being written is
+        picked up next time.
+        """
+        size = self.log_path.stat().st_size
+
+        # The fingerprint covers the same bytes every time, so appends to a
+        # log shorter than HEAD_BYTES do not look like a replaced log
+        if size < self.log_size or (self.head_length and self._head(self.head_length) != self.head):
+            self._reset()
+        if not self.head_length and size:
+            self.head_length = min(size, QueryConfig.HEAD_BYTES)
+            self.head = self._head(self.head_length)
+
+        if size == self.log_size:
+            return 0
+
+        added = 0
+        with open(self.log_path, 'rb') as f:
+            f.seek(self.log_size)
+            offset = self.log_size
+
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+
+                try:
+                    record = json.loads(line)
+                    logged_at = parse_time(record["timestamp"])
+                except (ValueError, KeyError, TypeError):
+                    self.skipped += 1
+                    offset += len(line)
+                    continue
+
+                number = len(self.offsets)
+                if self.times and logged_at < self.times[-1]:
+                    self.times_sorted = False
+                self.offsets.append(offset)
+                self.times.append(logged_at)
+
+                for field, read in QueryConfig.FIELDS.items():
+                    value = read(record)
+                    if value is not None:
+                        self.postings[field].setdefault(index_key(value), array('I')).append(number)
+
+                offset += len(line)
+                added += 1
+
+        self.log_size = offset
+        return added
+
+    def _time_range(self, since: Optional[float], until: Optional[float]) -> range:
+        """Record numbers inside [since, until] when timestamps are in order"""
+        start = bisect_left(self.times, since) if since is not None else 0
+        end = bisect_right(self.times, until) if until is not None else len(self.times)
+        return range(start, end)
+
+    def find(self, product: str = None, event_type: str = None, status: str = None,
+             since: float = None, until: float = None) -> List[int]:
+        """Record numbers matching every given filter, in log order"""
+        selected = None
+
+        for field, value in (("product", product), ("event_type", event_type), ("status", status)):
+            if value is None:
+                continue
+            ids = self.postings[field].get(index_key(value), ())
+            selected = set(ids) if selected is None else selected.intersection(ids)
+            if not selected:
+                return []
+
+        if selected is None:
+            if self.times_sorted:
+                return list(self._time_range(since, until))
+            selected = range(len(self.offsets))
+
+        return sorted(
+            i for i in selected
+            if (since is None or self.times[i] >= since) and (until is None or self.times[i] <= until)
+        )
+
+    def read(self, numbers: List[int]) -> Iterator[Dict]:
+        """Load the given records from the log"""
+        with open(self.log_path, 'rb') as f:
+            for i in numbers:
+                f.seek(self.offsets[i])
+                yield json.loads(f.readline())
+
+    def values(self, field: str) -> Dict[str, int]:
+        """Distinct indexed values of a field with their record counts"""
+        return {key: len(ids) for key, ids in sorted(self.postings[field].items())}
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def main():
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Query the STR migration audit log")
+    parser.add_argument("--log", default=str(QueryConfig.AUDIT_LOG), help="Path to audit.jsonl")
+    parser.add_argument("--product", help="Product name (case-insensitive)")
+    parser.add_argument("--event", dest="event_type", help="Event type, e.g. file_migrated")
+    parser.add_argument("--status", help="Record status, e.g. success or error")
+    parser.add_argument("--since", help="Earliest timestamp (ISO-8601, UTC)")
+    parser.add_argument("--until", help="Latest timestamp (ISO-8601, UTC)")
+    parser.add_argument("--limit", type=int, default=None, help="Only print the last N matches")
+    parser.add_argument("--count", action="store_true", help="Print the number of matches only")
+    parser.add_argument("--list", choices=sorted(QueryConfig.FIELDS),
+                        help="List the distinct values of a field with record counts")
+    parser.add_argument("--rebuild", action="store_true", help="Discard the index and rebuild it")
+
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    logger = logging.getLogger("STRAuditQuery")
+
+    log_path = Path(args.log)
+    if not log_path.exists():
+        logger.error(f"✗ Audit log not found: {log_path}")
+        sys.exit(1)
+
+    started = time.monotonic()
+    index = AuditIndex(log_path)
+    if not args.rebuild:
+        index.load()
+
+    added = index.update()
+    if added or args.rebuild:
+        index.save()
+
+    if args.list:
+        for value, count in index.values(args.list).items():
+            print(f"{count:>8}  {value}")
+        return
+
+    try:
+        since = parse_time(args.since) if args.since else None
+        until = parse_time(args.until) if args.until else None
+    except ValueError as e:
+        logger.error(f"✗ Invalid time: {e}")
+        sys.exit(1)
+
+    numbers = index.find(args.product, args.event_type, args.status, since, until)
+    logger.info(f"✓ {len(numbers)} of {len(index.offsets)} records matched "
+                f"({added} newly indexed) in {(time.monotonic() - started) * 1000:.1f}ms")
+
+    if args.count:
+        print(len(numbers))
+        return
+
+    if args.limit is not None:
+        numbers = numbers[-args.limit:] if args.limit else []
+
+    for record in index.read(numbers):
+        print(json.dumps(record))
+
+if __name__ == "__main__":
+    main()
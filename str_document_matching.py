@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+STR Document to Product Matching
+- Matches STR intake attachments to products in the review log
+- Inverted character n-gram and token indexes over product names
+- Writes document_product_mapping.json and STR_Document_to_Product_Mapping.csv
+"""
+
+import sys
+import json
+import csv
+import re
+import logging
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+class MatchConfig:
+    REVIEW_LOG = Path("Software Technology Request (STR) Review Log (1).csv")
+    ONEDRIVE_INDEX = Path("migration_logs/onedrive_index.json")
+    MAPPING_JSON = Path("document_product_mapping.json")
+    MAPPING_CSV = Path("STR_Document_to_Product_Mapping.csv")
+
+    NGRAM = 3
+    MIN_SUBSTRING_LEN = 4        # shorter product names must match a whole token
+    PARTIAL_MIN_SCORE = 0.5      # share of a product's tokens found in the document
+    PARTIAL_MEDIUM_SCORE = 0.75
+
+    # Tokens too generic to suggest a product on their own
+    STOP_TOKENS = {
+        "a", "an", "and", "the", "of", "for", "to", "in", "on", "with", "by",
+        "architecture", "arch", "diagram", "diagrams", "design", "drawing", "drawings",
+        "flow", "data", "str", "form", "conceptual", "final", "draft", "copy", "new",
+        "v1", "v2", "v3", "png", "jpg", "jpeg", "pdf", "docx", "doc", "pptx", "vsdx",
+        "drawio", "svg", "xlsx", "inc", "llc", "tool", "tools", "system", "platform",
+        "ai", "app", "aws", "azure", "microsoft", "delta"
+    }
+
+UUID_PREFIX = re.compile(
+    r'^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}'
+)
+HEX_PREFIX = re.compile(r'^[0-9a-fA-F]{32}')
+EXTENSIONS = re.compile(r'(\.[A-Za-z0-9]{1,5})+$')
+NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+# ============================================================================
+# NORMALIZATION
+# ============================================================================
+
+def split_file_name(file_name: str) -> Optional[Tuple[str, str]]:
+    """Split an intake file name into (submission uuid, document name)"""
+    match = UUID_PREFIX.match(file_name)
+    if not match or len(file_name) == match.end():
+        return None
+    return match.group(0), file_name[match.end():]
+
+def normalize_document(document: str) -> str:
+    """Lowercase document name without embedded id prefixes or extensions"""
+    name = document
+    while True:
+        stripped = UUID_PREFIX.sub('', name, count=1)
+        stripped = HEX_PREFIX.sub('', stripped, count=1)
+        if stripped == name:
+            break
+        name = stripped
+
+    name = EXTENSIONS.sub('', name)
+    return NON_ALNUM.sub(' ', name.lower()).strip()
+
+def normalize_product(product: str) -> str:
+    """Lowercase product name with punctuation collapsed to spaces"""
+    return NON_ALNUM.sub(' ', product.lower()).strip()
+
+def ngrams(text: str, n: int = MatchConfig.NGRAM) -> Set[str]:
+    """Distinct character n-grams of a string"""
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+# ============================================================================
+# INPUTS
+# ============================================================================
+
+def load_products(csv_path: Path) -> List[Dict]:
+    """Read distinct products from the review log, in log order"""
+    products = {}
+
+    with open(csv_path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.DictReader(f)
+        for line, row in enumerate(reader, 2):
+            name = (row.get('Product Name') or '').replace('\u200b', '').strip()
+            if not name or name in products:
+                continue
+
+            products[name] = {
+                "name": name,
+                "info": {
+                    "row": line,
+                    "status": row.get('STR Approved', ''),
+                    "requestor": row.get('Requestor Name', ''),
+                    "notes": row.get('Notes', ''),
+                    "description": row.get('Description', ''),
+                    "id": row.get('ID', '')
+                }
+            }
+
+    return list(products.values())
+
+def load_file_names(source: Path) -> List[str]:
+    """Read intake file names from a OneDrive index or a one-per-line listing"""
+    if source.suffix == '.json':
+        with open(source, 'r') as f:
+            items = json.load(f).get('items', {})
+        return [item['name'] for item in items.values()]
+
+    with open(source, 'r', encoding='utf-8') as f:
+        return [line.rstrip('\n') for line in f if line.strip()]
+
+def group_documents(file_names: Iterable[str]) -> Tuple[Dict[str, List[List[str]]], int]:
+    """Group intake files by document name; returns (document → files, file count)"""
+    documents = defaultdict(list)
+    total = 0
+
+    for file_name in file_names:
+        parts = split_file_name(file_name)
+        if not parts:
+            continue
+        total += 1
+        documents[parts[1]].append([parts[0], file_name])
+
+    return dict(documents), total
+
+# ============================================================================
+# MATCHING
+# ============================================================================
+
+class ProductIndex:
+    """Inverted indexes over normalized product names.
+
+    Character n-grams find products whose whole name occurs inside a
+    document name; word tokens find products sharing distinctive words
+    with it. Only products hit by the index are ever compared.
+    """
+
+    def __init__(self, products: List[Dict]):
+        self.products = products
+        self.normalized = [normalize_product(p["name"]) for p in products]
+        self.gram_counts = []
+        self.grams = defaultdict(list)     # n-gram → product indexes
+        self.short_names = defaultdict(list)  # whole-token name → product indexes
+        self.tokens = defaultdict(list)    # distinctive token → product indexes
+        self.token_counts = []
+
+        for i, name in enumerate(self.normalized):
+            if len(name) < MatchConfig.MIN_SUBSTRING_LEN:
+                self.short_names[name].append(i)
+                self.gram_counts.append(0)
+            else:
+                grams = ngrams(name)
+                self.gram_counts.append(len(grams))
+                for gram in grams:
+                    self.grams[gram].append(i)
+
+            distinctive = self._distinctive_tokens(name)
+            self.token_counts.append(len(distinctive))
+            for token in distinctive:
+                self.tokens[token].append(i)
+
+    @staticmethod
+    def _distinctive_tokens(text: str) -> Set[str]:
+        return {
+            token for token in text.split()
+            if len(token) > 1 and token not in MatchConfig.STOP_TOKENS
+        }
+
+    def exact(self, document: str) -> Optional[int]:
+        """Most specific product whose name appears in the document name"""
+        hits = defaultdict(int)
+        for gram in ngrams(document):
+            for i in self.grams.get(gram, ()):
+                hits[i] += 1
+
+        # Every n-gram of a contained name must be present; confirm with `in`
+        candidates = [
+            i for i, count in hits.items()
+            if count == self.gram_counts[i] and self.normalized[i] in document
+        ]
+        for token in set(document.split()):
+            candidates.extend(self.short_names.get(token, ()))
+
+        if not candidates:
+            return None
+        return max(candidates, key=lambda i: (len(self.normalized[i]), -i))
+
+    def partial(self, document: str) -> Optional[Tuple[int, float]]:
+        """Best product by share of its distinctive tokens found in the document"""
+        hits = defaultdict(int)
+        for token in self._distinctive_tokens(document):
+            for i in self.tokens.get(token, ()):
+                hits[i] += 1
+
+        best = None
+        for i, count in hits.items():
+            score = count / self.token_counts[i]
+            if score >= MatchConfig.PARTIAL_MIN_SCORE and (
+                best is None or (score, count) > (best[1], hits[best[0]])
+            ):
+                best = (i, score)
+
+        return best
+
+def match_documents(products: List[Dict], documents: Dict[str, List[List[str]]],
+                    total_files: int) -> Dict:
+    """Match every document to at most one product"""
+    index = ProductIndex(products)
+    exact_matches = []
+    partial_matches = []
+    unmatched_documents = []
+    matched_products = set()
+
+    for document in sorted(documents):
+        normalized = normalize_document(document)
+        files = documents[document]
+
+        product = index.exact(normalized)
+        if product is not None:
+            matched_products.add(product)
+            exact_matches.append({
+                "product": products[product]["name"],
+                "document": document,
+                "files": files,
+                "match_type": "product_name_in_doc",
+                "product_info": products[product]["info"]
+            })
+            continue
+
+        partial = index.partial(normalized)
+        if partial is not None:
+            product, score = partial
+            matched_products.add(product)
+            partial_matches.append({
+                "product": products[product]["name"],
+                "document": document,
+                "files": files,
+                "match_type": "token_overlap",
+                "confidence": "medium" if score >= MatchConfig.PARTIAL_MEDIUM_SCORE else "low"
+            })
+            continue
+
+        unmatched_documents.append(document)
+
+    unmatched_products = [
+        p["name"] for i, p in enumerate(products) if i not in matched_products
+    ]
+
+    return {
+        "summary": {
+            "total_files": total_files,
+            "unique_document_names": len(documents),
+            "total_products": len(products),
+            "exact_matches": len(exact_matches),
+            "partial_matches": len(partial_matches),
+            "unmatched_documents": len(unmatched_documents),
+            "unmatched_products": len(unmatched_products)
+        },
+        "exact_matches": exact_matches,
+        "partial_matches": partial_matches,
+        "unmatched_documents": unmatched_documents,
+        "unmatched_products": unmatched_products
+    }
+
+# ============================================================================
+# OUTPUT
+# ============================================================================
+
+def write_mapping(mapping: Dict, json_path: Path, csv_path: Path):
+    """Write the mapping as JSON and as the flat review CSV"""
+    with open(json_path, 'w') as f:
+        json.dump(mapping, f, indent=2)
+
+    with open(csv_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["Product Name", "CSV Row", "Status", "Document Name",
+                         "UUID Files", "Match Type", "Confidence"])
+
+        for match in mapping["exact_matches"]:
+            info = match["product_info"]
+            writer.writerow([match["product"], info["row"], info["status"], match["document"],
+                             len(match["files"]), match["match_type"], "high"])
+
+        for match in mapping["partial_matches"]:
+            writer.writerow([match["product"], "", "", match["document"],
+                             len(match["files"]), match["match_type"], match["confidence"]])
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def main():
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Match STR intake documents to products")
+    parser.add_argument("--csv", default=str(MatchConfig.REVIEW_LOG),
+                        help="Path to STR review log CSV")
+    parser.add_argument("--files", default=str(MatchConfig.ONEDRIVE_INDEX),
+                        help="OneDrive index JSON or a text file with one intake file name per line")
+    parser.add_argument("--json", default=str(MatchConfig.MAPPING_JSON),
+                        help="Output mapping JSON")
+    parser.add_argument("--out-csv", default=str(MatchConfig.MAPPING_CSV),
+                        help="Output mapping CSV")
+
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    logger = logging.getLogger("STRMatching")
+
+    try:
+        started = time.monotonic()
+        products = load_products(Path(args.csv))
+        documents, total_files = group_documents(load_file_names(Path(args.files)))
+        mapping = match_documents(products, documents, total_files)
+        write_mapping(mapping, Path(args.json), Path(args.out_csv))
+    except Exception as e:
+        logger.error(f"✗ Matching failed: {e}")
+        sys.exit(1)
+
+    summary = mapping["summary"]
+    logger.info(f"✓ Matched {summary['unique_document_names']} documents "
+                f"({summary['total_files']} files) against {summary['total_products']} products "
+                f"in {time.monotonic() - started:.2f}s")
+    logger.info(f"  Exact: {summary['exact_matches']}  Partial: {summary['partial_matches']}  "
+                f"Unmatched: {summary['unmatched_documents']}")
+
+if __name__ == "__main__":
+    main()
@@ -9,17 +9,39 @@ STR Document Migration with Comprehensive Failsafes and Test Mode
 """
 
 import os
+import atexit
+import base64
 import sys
 import json
 import csv
+import gzip
+import heapq
 import logging
+import math
+import queue
 import time
 import hashlib
+import random
+import tempfile
+import threading
+import zlib
+from array import array
+from bisect import bisect_right
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import IO, Callable, Dict, Iterator, List, Optional, Tuple, Union
 import requests
-from azure.identity import InteractiveBrowserCredential
+from requests.adapters import HTTPAdapter
+from azure.identity import (
+    AuthenticationRecord,
+    AuthenticationRequiredError,
+    InteractiveBrowserCredential,
+    TokenCachePersistenceOptions,
+)
 import re
 
 # ============================================================================
@@ -35,19 +57,94 @@ class Config:
     # Azure/Graph API
     CLIENT_ID = "04b07795-8ddb-461a-bbee-02f9e1bf7b46"  # Microsoft Graph CLI
     GRAPH_BASE = "https://graph.microsoft.com/v1.0"
+    GRAPH_SCOPE = "https://graph.microsoft.com/.default"
+
+    # Token cache (encrypted by the OS credential store) and account record
+    TOKEN_CACHE_NAME = "str_migration"
+    AUTH_RECORD_FILE = Path("auth_record.json")
+    TOKEN_REFRESH_MARGIN = 300  # seconds before expiry to refresh
+    NON_INTERACTIVE = False
 
     # File paths
     LOG_DIR = Path("migration_logs")
     AUDIT_LOG = LOG_DIR / "audit.jsonl"
+    AUDIT_QUEUE_SIZE = 10000     # records buffered before audit_log blocks
+    AUDIT_BATCH_SIZE = 256       # records per write
+    AUDIT_FLUSH_INTERVAL = 1.0   # seconds a record may wait for its batch
     PROGRESS_FILE = LOG_DIR / "progress.json"
+    TEST_PROGRESS_FILE = LOG_DIR / "progress_test.json"   # --test runs only dry-run the list update
+    PROGRESS_COMPACT_EVERY = 500     # journal records between snapshots
+    PROGRESS_FSYNC = "interval"      # always | interval | never
+    PROGRESS_FSYNC_INTERVAL = 1.0    # seconds, for "interval"
     ERROR_LOG = LOG_DIR / "errors.log"
+    DEDUP_CACHE_FILE = LOG_DIR / "dedup_cache.jsonl"
+    ONEDRIVE_INDEX_FILE = LOG_DIR / "onedrive_index.json"
+    LIST_MIRROR_FILE = LOG_DIR / "list_mirror.json"
+    METRICS_FILE = LOG_DIR / "metrics.json"
+    PLAN_REPORT_FILE = LOG_DIR / "plan_report.json"
+    VERIFY_REPORT_FILE = LOG_DIR / "verification_report.json"
+    TRACE_FILE = LOG_DIR / "trace.jsonl"
     BACKUP_DIR = Path("migration_backups")
+    BACKUP_STORE_NAME = "list_backups.jsonl.gz"   # in BACKUP_DIR
+    BACKUP_INDEX_NAME = "list_backups.idx.jsonl"
     SHAREPOINT_IDS_FILE = Path("sharepoint_ids.json")
 
+    # Instrumentation (per-file traces and the Prometheus endpoint are opt-in)
+    TRACE_ENABLED = False
+    METRICS_PORT = None
+    METRICS_HOST = "127.0.0.1"
+
+    # Dry-run planner assumptions (--plan); each can be overridden on the command line
+    PLAN_REQUEST_LATENCY = 0.25            # seconds per Graph request
+    PLAN_BANDWIDTH = 20 * 1024 * 1024      # bytes/second across all transfers
+    PLAN_THROTTLE_RATE = 0.0               # share of requests answered with 429/503
+    PLAN_RETRY_AFTER = 5.0                 # seconds a throttled request stalls its worker
+
     # Test configuration
     TEST_MODE = False
     TEST_FILE_COUNT = 5
 
+    # Concurrency (1 = sequential)
+    MAX_WORKERS = 1
+
+    # HTTP connection pool and timeouts (seconds)
+    HTTP_POOL_SIZE = 16
+    HTTP_CONNECT_TIMEOUT = 10
+    HTTP_READ_TIMEOUT = 120
+
+    # Client-side rate limiting (requests/second, adapted to throttling)
+    RATE_LIMIT_INITIAL = 10.0
+    RATE_LIMIT_MIN = 0.5
+    RATE_LIMIT_MAX = 50.0
+    RATE_LIMIT_BURST = 10
+
+    # Content-hash deduplication (downloads spool to disk above this size)
+    DEDUP_ENABLED = True
+    SPOOL_MAX_MEMORY = 8 * 1024 * 1024
+
+    # Graph JSON batching for the list-update phase (links only batch with it)
+    BATCH_LIST_UPDATES = False
+    BATCH_CREATE_LINK = False
+
+    # Local copy of the STR list: backups read from it, no-op updates are skipped
+    LIST_MIRROR_ENABLED = True
+
+    # Work order (--no-schedule runs in plan order): priority tiers first, then
+    # largest first; small files get a lane of their own
+    SCHEDULE_ENABLED = True
+    SCHEDULE_PRIORITIES = [("status", "Approved")]   # (plan field, value), highest first
+    SMALL_FILE_MAX = 1024 * 1024     # bytes; PNG/drawio diagrams and screenshots
+    FAST_LANE_SHARE = 0.25           # share of workers preferring small files (at least 1 of 2+)
+    FAST_LANE_WORKERS = None         # fixed count instead of the share (0 = no fast lane)
+
+    # Sharding (--shard i/N): each shard keeps its state in its own
+    # subdirectory of LOG_DIR and BACKUP_DIR; --merge-shards combines them
+    SHARD = None                      # (index, count), index counted from 1
+    SHARD_STATE_FILES = ("AUDIT_LOG", "PROGRESS_FILE", "TEST_PROGRESS_FILE", "ERROR_LOG", "DEDUP_CACHE_FILE",
+                         "ONEDRIVE_INDEX_FILE", "LIST_MIRROR_FILE", "METRICS_FILE",
+                         "PLAN_REPORT_FILE", "VERIFY_REPORT_FILE", "TRACE_FILE")
+    SHARD_MERGE_DIR = LOG_DIR / "merged"
+
     @classmethod
     def load_from_file(cls, filepath: Path):
         """Load SharePoint IDs from sharepoint_ids.json"""
@@ -66,14 +163,29 @@ class Config:
         if not all([cls.SITE_ID, cls.DRIVE_ID, cls.LIST_ID]):
             raise ValueError("Missing required SharePoint IDs in config file")
 
+    @staticmethod
+    def shard_name(index: int, count: int) -> str:
+        return f"shard-{index}-of-{count}"
+
+    @classmethod
+    def use_shard(cls, index: int, count: int):
+        """Move every per-run state file and the backup store into the shard's directories"""
+        name = cls.shard_name(index, count)
+        log_dir = cls.LOG_DIR / name
+        for attr in cls.SHARD_STATE_FILES:
+            setattr(cls, attr, log_dir / getattr(cls, attr).name)
+        cls.LOG_DIR = log_dir
+        cls.BACKUP_DIR = cls.BACKUP_DIR / name
+        cls.SHARD = (index, count)
+
 # ============================================================================
 # LOGGING SETUP
 # ============================================================================
 
 def setup_logging(test_mode: bool = False) -> logging.Logger:
     """Configure comprehensive logging"""
-    Config.LOG_DIR.mkdir(exist_ok=True)
-    Config.BACKUP_DIR.mkdir(exist_ok=True)
+    Config.LOG_DIR.mkdir(parents=True, exist_ok=True)
+    Config.BACKUP_DIR.mkdir(parents=True, exist_ok=True)
 
     logger = logging.getLogger("STRMigration")
     logger.setLevel(logging.DEBUG)
@@ -97,102 +209,696 @@ def setup_logging(test_mode: bool = False) -> logging.Logger:
 
     return logger
 
+# ============================================================================
+# AUTHENTICATION
+# ============================================================================
+
+def create_credential(logger: logging.Logger, silent: bool = False) -> InteractiveBrowserCredential:
+    """Build a credential that reuses cached tokens across launches.
+
+    Tokens are kept in an OS-encrypted persistent cache, and the signed-in
+    account is remembered in AUTH_RECORD_FILE, so only the very first
+    launch opens a browser. With NON_INTERACTIVE set, or `silent` (for
+    background refreshes), anything that would need a browser fails instead.
+    """
+    silent = silent or Config.NON_INTERACTIVE
+    record = None
+    if Config.AUTH_RECORD_FILE.exists():
+        with open(Config.AUTH_RECORD_FILE, 'r') as f:
+            record = AuthenticationRecord.deserialize(f.read())
+
+    credential = InteractiveBrowserCredential(
+        client_id=Config.CLIENT_ID,
+        cache_persistence_options=TokenCachePersistenceOptions(name=Config.TOKEN_CACHE_NAME),
+        authentication_record=record,
+        disable_automatic_authentication=silent
+    )
+
+    if record is None:
+        if silent:
+            raise RuntimeError(
+                f"No saved sign-in ({Config.AUTH_RECORD_FILE}); run once interactively first"
+            )
+        logger.info("No saved sign-in; opening browser...")
+        record = credential.authenticate(scopes=[Config.GRAPH_SCOPE])
+        with open(Config.AUTH_RECORD_FILE, 'w') as f:
+            f.write(record.serialize())
+
+    return credential
+
+class TokenProvider:
+    """Keeps the shared Authorization header fresh for all workers.
+
+    The header dict is updated in place, so every client reading it picks
+    up a new token on its next request. A background thread refreshes the
+    token TOKEN_REFRESH_MARGIN seconds before it expires, through a silent
+    credential so it can never open a browser; a refresh that needs sign-in
+    is left to the next 401. refresh() is also single-flight, so a burst of
+    401s triggers one refresh.
+    """
+
+    def __init__(self, credential, logger: logging.Logger, background_credential=None):
+        self.credential = credential
+        self.background_credential = background_credential  # silent; no background refresh without it
+        self.logger = logger
+        self.headers = {}
+        self.expires_on = 0
+        self.lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.refresh()
+
+    def refresh(self, stale_header: str = None, credential=None) -> str:
+        """Fetch a new token, unless another thread already replaced `stale_header`"""
+        with self.lock:
+            current = self.headers.get("Authorization")
+            if stale_header is not None and current != stale_header:
+                return current
+
+            access = (credential or self.credential).get_token(Config.GRAPH_SCOPE)
+            self.headers["Authorization"] = f"Bearer {access.token}"
+            self.expires_on = access.expires_on
+            return self.headers["Authorization"]
+
+    def start(self):
+        """Start refreshing in the background"""
+        if self.background_credential is None:
+            return
+        self._thread = threading.Thread(target=self._run, name="token-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while True:
+            delay = self.expires_on - Config.TOKEN_REFRESH_MARGIN - time.time()
+            if self._stop.wait(max(delay, 0)):
+                return
+
+            try:
+                self.refresh(credential=self.background_credential)
+                self.logger.debug("Refreshed access token")
+            except AuthenticationRequiredError:
+                self.logger.warning("Token refresh needs interactive sign-in; "
+                                    "it will happen on the first request after the token expires")
+                return
+            except Exception as e:
+                self.logger.warning(f"Token refresh failed, retrying in 30s: {e}")
+                if self._stop.wait(30):
+                    return
+
 # ============================================================================
 # AUDIT LOGGING
 # ============================================================================
 
+class AuditWriter:
+    """Single background thread that owns audit.jsonl.
+
+    Callers only enqueue records (blocking if the bounded queue is full);
+    the writer serializes them and appends them in batches, once
+    AUDIT_BATCH_SIZE records are waiting or AUDIT_FLUSH_INTERVAL has
+    passed. close() writes everything still queued.
+    """
+
+    _STOP = object()
+
+    def __init__(self, queue_size: int = Config.AUDIT_QUEUE_SIZE,
+                 batch_size: int = Config.AUDIT_BATCH_SIZE,
+                 flush_interval: float = Config.AUDIT_FLUSH_INTERVAL):
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def put(self, record: Dict):
+        with self.lock:
+            if self.thread is None:
+                # Path read at start so a run can point Config.AUDIT_LOG elsewhere first
+                self.thread = threading.Thread(target=self._run, args=(Config.AUDIT_LOG,),
+                                               name="audit-writer", daemon=True)
+                self.thread.start()
+        self.queue.put(record)
+
+    def flush(self):
+        """Block until every record queued so far is on disk"""
+        self.queue.join()
+
+    def close(self):
+        """Write out the queue and stop the writer"""
+        with self.lock:
+            thread, self.thread = self.thread, None
+        if thread:
+            self.queue.put(self._STOP)
+            thread.join()
+
+    def _run(self, filepath: Path):
+        with open(filepath, 'a') as f:
+            while True:
+                batch = [self.queue.get()]
+                deadline = time.monotonic() + self.flush_interval
+
+                while batch[-1] is not self._STOP and len(batch) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(self.queue.get(timeout=remaining))
+                    except queue.Empty:
+                        break
+
+                stop = batch[-1] is self._STOP
+                records = batch[:-1] if stop else batch
+                if records:
+                    f.write(''.join(json.dumps(record) + '\n' for record in records))
+                    f.flush()
+
+                for _ in batch:
+                    self.queue.task_done()
+                if stop:
+                    return
+
+_audit_writer = AuditWriter()
+atexit.register(_audit_writer.close)
+
 def audit_log(event_type: str, data: Dict, status: str = "success"):
     """Log all operations for audit trail"""
-    record = {
+    _audit_writer.put({
         "timestamp": datetime.utcnow().isoformat(),
         "event_type": event_type,
         "status": status,
         "data": data
-    }
+    })
 
-    with open(Config.AUDIT_LOG, 'a') as f:
-        f.write(json.dumps(record) + '\n')
+def close_audit_log():
+    """Flush pending audit records and stop the writer thread"""
+    _audit_writer.close()
+
+# ============================================================================
+# METRICS & TRACING
+# ============================================================================
+
+class Histogram:
+    """Duration samples for one step (exact quantiles; buckets for Prometheus)"""
+
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+    def __init__(self):
+        self.samples = array('d')
+
+    def observe(self, seconds: float):
+        self.samples.append(seconds)
+
+    def summary(self) -> Dict:
+        """Count, total and mean/p50/p95/p99/max in seconds"""
+        ordered = sorted(self.samples)
+        count = len(ordered)
+        if not count:
+            return {"count": 0, "sum": 0.0}
+
+        def quantile(q: float) -> float:
+            return ordered[max(0, math.ceil(count * q) - 1)]
+
+        total = sum(ordered)
+        return {
+            "count": count,
+            "sum": round(total, 6),
+            "mean": round(total / count, 6),
+            "p50": round(quantile(0.50), 6),
+            "p95": round(quantile(0.95), 6),
+            "p99": round(quantile(0.99), 6),
+            "max": round(ordered[-1], 6)
+        }
+
+    def buckets(self) -> List[Tuple[float, int]]:
+        """Cumulative (upper bound, count) pairs"""
+        ordered = sorted(self.samples)
+        return [(bound, bisect_right(ordered, bound)) for bound in self.BUCKETS]
+
+class Span:
+    """One file's trip through the pipeline"""
+
+    def __init__(self, file_id: str, product: str):
+        self.file_id = file_id
+        self.product = product
+        self.started_at = datetime.utcnow().isoformat()
+        self.start = time.perf_counter()
+        self.events = []
+        self.status = None
+
+    def add(self, step: str, start: float, seconds: float):
+        self.events.append({
+            "step": step,
+            "offset_ms": round((start - self.start) * 1000, 1),
+            "duration_ms": round(seconds * 1000, 1)
+        })
+
+    def to_record(self, seconds: float) -> Dict:
+        return {
+            "file_id": self.file_id,
+            "product": self.product,
+            "started": self.started_at,
+            "duration_ms": round(seconds * 1000, 1),
+            "status": self.status,
+            "steps": self.events
+        }
+
+class Metrics:
+    """Process-wide step timers, byte/retry counters and optional per-file traces.
+
+    Steps are timed with `timer()`; a timer running inside `span()` is also
+    added to that file's trace. Everything is safe to call from workers.
+    """
+
+    PROMETHEUS_PREFIX = "str_migration"
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = defaultdict(Histogram)
+        self.counters = defaultdict(float)
+        self.started = time.monotonic()
+        self.trace_file = None  # per-file spans are written here when set
+        self._local = threading.local()
+        self._server = None
+
+    def inc(self, name: str, amount: float = 1):
+        with self.lock:
+            self.counters[name] += amount
+
+    def observe(self, step: str, seconds: float, start: float = None):
+        with self.lock:
+            self.histograms[step].observe(seconds)
+
+        span = getattr(self._local, "span", None)
+        if span is not None and start is not None:
+            span.add(step, start, seconds)
+
+    @contextmanager
+    def timer(self, step: str):
+        """Time a block as one sample of `step`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(step, time.perf_counter() - start, start)
+
+    @contextmanager
+    def span(self, file_id: str, product: str):
+        """Trace one file; the caller sets span.status before it ends"""
+        span = Span(file_id, product)
+        self._local.span = span
+        try:
+            yield span
+        finally:
+            self._local.span = None
+            seconds = time.perf_counter() - span.start
+            self.observe("file", seconds)
+
+            if self.trace_file:
+                line = json.dumps(span.to_record(seconds)) + '\n'
+                with self.lock:
+                    with open(self.trace_file, 'a') as f:
+                        f.write(line)
+
+    def snapshot(self) -> Dict:
+        """Counters and step summaries"""
+        with self.lock:
+            return {
+                "timestamp": datetime.utcnow().isoformat(),
+                "uptime_seconds": round(time.monotonic() - self.started, 3),
+                "counters": {name: round(value, 6) for name, value in sorted(self.counters.items())},
+                "steps": {step: h.summary() for step, h in sorted(self.histograms.items())}
+            }
+
+    def write(self, filepath: Path):
+        """Atomically write the snapshot as JSON"""
+        tmp = filepath.with_suffix(filepath.suffix + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp, filepath)
+
+    def prometheus_text(self) -> str:
+        """Render counters and step histograms in the Prometheus text format"""
+        prefix = self.PROMETHEUS_PREFIX
+        lines = []
+
+        with self.lock:
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"# TYPE {prefix}_{name}_total counter")
+                lines.append(f"{prefix}_{name}_total {value}")
+
+            lines.append(f"# TYPE {prefix}_step_seconds histogram")
+            for step, histogram in sorted(self.histograms.items()):
+                for bound, count in histogram.buckets():
+                    lines.append(f'{prefix}_step_seconds_bucket{{step="{step}",le="{bound}"}} {count}')
+                lines.append(f'{prefix}_step_seconds_bucket{{step="{step}",le="+Inf"}} {len(histogram.samples)}')
+                lines.append(f'{prefix}_step_seconds_sum{{step="{step}"}} {sum(histogram.samples)}')
+                lines.append(f'{prefix}_step_seconds_count{{step="{step}"}} {len(histogram.samples)}')
+
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port: int, host: str = "127.0.0.1"):
+        """Expose prometheus_text() at http://host:port/metrics"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="metrics-endpoint", daemon=True).start()
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+metrics = Metrics()
 
 # ============================================================================
 # PROGRESS TRACKING
 # ============================================================================
 
 class ProgressTracker:
-    """Track migration progress for resumption capability"""
+    """Track migration progress for resumption capability.
+
+    Status changes are appended to a journal next to the snapshot file and
+    folded into the snapshot every PROGRESS_COMPACT_EVERY records, so each
+    mark_file costs one short append instead of a full rewrite. Snapshots
+    are replaced atomically; on startup the state is rebuilt from the
+    snapshot plus any journal records newer than it.
+    """
 
     def __init__(self, filepath: Path = Config.PROGRESS_FILE):
         self.filepath = filepath
+        self.journal_path = filepath.with_suffix('.journal.jsonl')
+        self.lock = threading.RLock()
         self.data = self._load()
+        self._journal = None
+        self._pending = 0          # journal records since the last compaction
+        self._last_fsync = time.monotonic()
 
     def _load(self) -> Dict:
-        """Load progress from file"""
+        """Load progress from the snapshot, then replay the journal on top"""
         if self.filepath.exists():
             with open(self.filepath, 'r') as f:
-                return json.load(f)
-        return {
-            "started": datetime.utcnow().isoformat(),
-            "total": 0,
-            "completed": 0,
-            "failed": 0,
-            "files": {}
-        }
+                data = json.load(f)
+        else:
+            data = {
+                "started": datetime.utcnow().isoformat(),
+                "total": 0,
+                "completed": 0,
+                "failed": 0,
+                "files": {}
+            }
+        data.setdefault("journal_seq", 0)
 
-    def save(self):
-        """Save progress"""
-        with open(self.filepath, 'w') as f:
-            json.dump(self.data, f, indent=2)
+        if self.journal_path.exists():
+            with open(self.journal_path, 'r') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        break  # torn final write from a crash
+                    # Records already folded into the snapshot are skipped
+                    if record["seq"] > data["journal_seq"]:
+                        self._apply(data, record)
 
-    def mark_file(self, file_id: str, status: str, details: Dict = None):
-        """Mark a file as processed"""
-        self.data["files"][file_id] = {
-            "status": status,  # pending, processing, completed, failed
-            "timestamp": datetime.utcnow().isoformat(),
-            "details": details or {}
-        }
+        return data
 
-        if status == "completed":
-            self.data["completed"] += 1
-        elif status == "failed":
-            self.data["failed"] += 1
+    @staticmethod
+    def _apply(data: Dict, record: Dict):
+        """Apply one journal record to the in-memory state"""
+        data["journal_seq"] = record["seq"]
+
+        if "total" in record:
+            data["total"] = record["total"]
+            return
+
+        data["files"][record["id"]] = {
+            "status": record["status"],  # pending, processing, completed, failed, rolled_back
+            "timestamp": record["timestamp"],
+            "details": record["details"]
+        }
 
-        self.save()
+        if record["status"] == "completed":
+            data["completed"] += 1
+        elif record["status"] == "failed":
+            data["failed"] += 1
+
+    def _append(self, record: Dict):
+        """Apply a record and append it to the journal (caller holds the lock)"""
+        record["seq"] = self.data["journal_seq"] + 1
+        self._apply(self.data, record)
+
+        if self._journal is None:
+            self._journal = open(self.journal_path, 'a')
+        self._journal.write(json.dumps(record) + '\n')
+        self._journal.flush()
+
+        now = time.monotonic()
+        if Config.PROGRESS_FSYNC == "always" or (
+            Config.PROGRESS_FSYNC == "interval"
+            and now - self._last_fsync >= Config.PROGRESS_FSYNC_INTERVAL
+        ):
+            os.fsync(self._journal.fileno())
+            self._last_fsync = now
+
+        self._pending += 1
+        if self._pending >= Config.PROGRESS_COMPACT_EVERY:
+            self.save()
 
-    def get_unprocessed(self, total_files: int) -> List[str]:
-        """Get list of files not yet processed"""
-        self.data["total"] = total_files
+    def save(self):
+        """Compact the journal into an atomically replaced snapshot"""
+        with self.lock:
+            tmp_path = self.filepath.with_suffix('.json.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump(self.data, f, indent=2)
+                f.flush()
+                if Config.PROGRESS_FSYNC != "never":
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, self.filepath)
+
+            # The snapshot's journal_seq makes a stale journal harmless, so a
+            # crash between the rename and the truncate loses nothing
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            if self.journal_path.exists():
+                open(self.journal_path, 'w').close()
+            self._pending = 0
+
+    def close(self):
+        """Compact and release the journal"""
         self.save()
 
-        processed = set(self.data["files"].keys())
-        all_files = {f"file_{i}" for i in range(total_files)}
-        return list(all_files - processed)
+    def mark_file(self, file_id: str, status: str, details: Dict = None):
+        """Mark a file as processed"""
+        with self.lock:
+            self._append({
+                "id": file_id,
+                "status": status,
+                "timestamp": datetime.utcnow().isoformat(),
+                "details": details or {}
+            })
+
+    def get_file(self, file_id: str) -> Optional[Dict]:
+        """Get the recorded state of a file, or None if it was never seen"""
+        with self.lock:
+            return self.data["files"].get(file_id)
+
+    def set_total(self, total: int):
+        """Record the size of the plan being worked on"""
+        with self.lock:
+            self._append({"total": total})
 
 # ============================================================================
 # BACKUP & ROLLBACK
 # ============================================================================
 
 class BackupManager:
-    """Manage backups for rollback capability"""
+    """Manage backups for rollback capability.
+
+    List item backups go to a single append-only store in which every
+    record is its own gzip member: `zcat` reads the whole store as JSON
+    lines, and one record can be decompressed alone from its offset. An
+    uncompressed sidecar index maps item ids to those offsets.
+    """
 
     def __init__(self, backup_dir: Path = Config.BACKUP_DIR):
         self.backup_dir = backup_dir
-        self.backup_dir.mkdir(exist_ok=True)
+        self.backup_dir.mkdir(parents=True, exist_ok=True)
+        self.store_path = backup_dir / Config.BACKUP_STORE_NAME
+        self.index_path = backup_dir / Config.BACKUP_INDEX_NAME
+        self.api_client = None  # GraphAPIClient once authenticated; backups GET through its retries
+        self.run_id = None   # set by run_migration; recorded with every backup
+        self.lock = threading.Lock()
+        self.entries = []    # index entries in store order
+        self._load_index()
+
+    def _load_index(self):
+        """Read the index, then recover records written after it and drop a torn tail"""
+        end = 0
+        torn = False
+        if self.index_path.exists():
+            with open(self.index_path, 'r') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        torn = True  # torn final line
+                        break
+                    self.entries.append(entry)
+                    end = entry["offset"] + entry["length"]
+
+        if not self.store_path.exists():
+            # Nothing to point into; an index without its store is stale
+            self.entries = []
+            if self.index_path.exists():
+                self.index_path.unlink()
+            return
+
+        size = self.store_path.stat().st_size
+        if end > size:
+            # Index ahead of the store: rebuild it from the records that exist
+            self.entries = []
+            end = 0
+            self.index_path.unlink()
+
+        recovered = []
+        for offset, length, record in self._scan(end):
+            recovered.append(self._index_entry(record, offset, length))
+            end = offset + length
+
+        if end < size:
+            with open(self.store_path, 'r+b') as f:
+                f.truncate(end)
+
+        if torn:
+            # Rewrite rather than append, or recovered entries would follow the torn line
+            self.entries.extend(recovered)
+            with open(self.index_path, 'w') as f:
+                f.write(''.join(json.dumps(entry) + '\n' for entry in self.entries))
+        elif recovered:
+            with open(self.index_path, 'a') as f:
+                f.write(''.join(json.dumps(entry) + '\n' for entry in recovered))
+            self.entries.extend(recovered)
+
+    def _scan(self, start: int) -> Iterator[Tuple[int, int, Dict]]:
+        """Yield (offset, length, record) for complete store records from `start`"""
+        with open(self.store_path, 'rb') as f:
+            f.seek(start)
+            data = memoryview(f.read())
+
+        pos = 0
+        while pos < len(data):
+            member = zlib.decompressobj(wbits=31)  # gzip framing
+            try:
+                payload = member.decompress(data[pos:])
+            except zlib.error:
+                return
+            if not member.eof:
+                return
 
-    def backup_sharepoint_item(self, item_id: str, headers: Dict) -> str:
-        """Backup SharePoint item before updating"""
-        url = f"{Config.GRAPH_BASE}/sites/{Config.SITE_ID}/lists/{Config.LIST_ID}/items/{item_id}"
+            length = len(data) - pos - len(member.unused_data)
+            yield start + pos, length, json.loads(payload)
+            pos += length
 
-        response = requests.get(url, headers=headers)
-        if response.status_code == 200:
-            backup_data = response.json()
-            backup_file = self.backup_dir / f"backup_{item_id}_{datetime.utcnow().timestamp()}.json"
+    @staticmethod
+    def _index_entry(record: Dict, offset: int, length: int) -> Dict:
+        entry = {key: record.get(key) for key in ("item_id", "run_id", "timestamp", "product", "file_id")}
+        entry.update(offset=offset, length=length)
+        return entry
 
-            with open(backup_file, 'w') as f:
-                json.dump(backup_data, f, indent=2)
+    def backup_sharepoint_item(self, item_id: str, headers: Dict,
+                               product: str = None, file_id: str = None) -> str:
+        """Backup SharePoint item before updating"""
+        url = f"{Config.GRAPH_BASE}/sites/{Config.SITE_ID}/lists/{Config.LIST_ID}/items/{item_id}"
 
-            return str(backup_file)
+        response = self.api_client._retry_request("GET", url, headers=headers)
+        if response is not None and response.status_code == 200:
+            return self.save_item_backup(item_id, response.json(), product=product, file_id=file_id)
 
         return None
 
+    def save_item_backup(self, item_id: str, backup_data: Dict,
+                         product: str = None, file_id: str = None) -> str:
+        """Append an already-fetched list item to the backup store; returns its reference"""
+        record = {
+            "item_id": item_id,
+            "run_id": self.run_id,
+            "timestamp": datetime.utcnow().isoformat(),
+            "product": product,
+            "file_id": file_id,
+            "data": backup_data
+        }
+        blob = gzip.compress((json.dumps(record) + '\n').encode(), mtime=0)
+
+        with self.lock:
+            with open(self.store_path, 'ab') as f:
+                offset = f.tell()
+                f.write(blob)
+
+            entry = self._index_entry(record, offset, len(blob))
+            with open(self.index_path, 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+            self.entries.append(entry)
+
+        return f"{self.store_path}#{offset}"
+
+    def read_backup(self, entry: Dict) -> Dict:
+        """Load one backup record from the store"""
+        with open(self.store_path, 'rb') as f:
+            f.seek(entry["offset"])
+            return json.loads(gzip.decompress(f.read(entry["length"])))
+
+    def select_backups(self, run_id: str = None, products: List[str] = None,
+                       since: datetime = None, until: datetime = None) -> List[Dict]:
+        """Earliest matching backup of every item, in store order.
+
+        The earliest backup holds the value from before the first update
+        in the selection, which is what a rollback should put back.
+        """
+        wanted = {p.strip().casefold() for p in products} if products else None
+        earliest = {}
+
+        with self.lock:
+            entries = list(self.entries)
+
+        for entry in entries:
+            if run_id and entry["run_id"] != run_id:
+                continue
+            if wanted is not None and (entry["product"] or '').strip().casefold() not in wanted:
+                continue
+            taken = datetime.fromisoformat(entry["timestamp"])
+            if (since and taken < since) or (until and taken > until):
+                continue
+            earliest.setdefault(entry["item_id"], entry)
+
+        return list(earliest.values())
+
+    def runs(self) -> Dict[str, int]:
+        """Backup count per run id"""
+        counts = {}
+        with self.lock:
+            for entry in self.entries:
+                counts[entry["run_id"]] = counts.get(entry["run_id"], 0) + 1
+        return counts
+
     def create_migration_snapshot(self, migration_data: Dict) -> str:
         """Create snapshot of entire migration plan"""
         snapshot_file = self.backup_dir / f"snapshot_{datetime.utcnow().isoformat()}.json"
@@ -202,6 +908,561 @@ class BackupManager:
 
         return str(snapshot_file)
 
+# ============================================================================
+# CONTENT HASHING
+# ============================================================================
+
+class QuickXorHash:
+    """OneDrive/SharePoint quickXorHash, computed incrementally.
+
+    Byte i of the input is XORed into a 160-bit circular register at bit
+    (11 * i) mod 160, and the input length into the top 64 bits. Bytes 160
+    apart land on the same bits, so input is first XOR-folded into one
+    160-byte block with big-integer arithmetic and only that block is
+    spread over the register.
+    """
+
+    WIDTH = 160                      # register bits, and bytes per fold block
+    SHIFT = 11
+    MASK = (1 << WIDTH) - 1
+
+    def __init__(self):
+        self.length = 0
+        self._folded = 0             # XOR of all complete 160-byte blocks (little-endian)
+        self._tail = b''
+
+    def update(self, data: bytes):
+        self.length += len(data)
+        data = self._tail + bytes(data)
+        aligned = len(data) - len(data) % self.WIDTH
+        self._folded ^= self._fold(data[:aligned])
+        self._tail = data[aligned:]
+
+    def update_at(self, offset: int, data: bytes):
+        """Feed bytes found at `offset` of the input, skipping any already hashed.
+
+        Lets a resumed transfer replay ranges without corrupting the hash.
+        """
+        if offset > self.length:
+            raise ValueError(f"Hash input skipped bytes {self.length}-{offset - 1}")
+        if offset + len(data) > self.length:
+            self.update(data[self.length - offset:])
+
+    @classmethod
+    def _fold(cls, data: bytes) -> int:
+        """XOR of the 160-byte blocks of `data` (a whole number of blocks)"""
+        blocks = len(data) // cls.WIDTH
+        value = int.from_bytes(data, 'little')
+
+        while blocks > 1:
+            low = blocks // 2
+            bits = low * cls.WIDTH * 8
+            value = (value & ((1 << bits) - 1)) ^ (value >> bits)
+            blocks -= low
+
+        return value
+
+    def digest(self) -> bytes:
+        block = (self._folded ^ int.from_bytes(self._tail, 'little')).to_bytes(self.WIDTH, 'little')
+        register = 0
+
+        for position, byte in enumerate(block):
+            if byte:
+                shifted = byte << (position * self.SHIFT % self.WIDTH)
+                register ^= (shifted & self.MASK) ^ (shifted >> self.WIDTH)
+
+        register ^= (self.length & 0xFFFFFFFFFFFFFFFF) << (self.WIDTH - 64)
+        return register.to_bytes(self.WIDTH // 8, 'little')
+
+    def base64digest(self) -> str:
+        """The digest as Graph reports it in file.hashes.quickXorHash"""
+        return base64.b64encode(self.digest()).decode()
+
+def quick_xor_hash(item: Optional[Dict]) -> Optional[str]:
+    """quickXorHash from a drive item's metadata, if the service reported one"""
+    return ((item or {}).get('file') or {}).get('hashes', {}).get('quickXorHash')
+
+# ============================================================================
+# DEDUPLICATION
+# ============================================================================
+
+class DedupCache:
+    """Content-addressed cache of uploaded files and their share links.
+
+    Keyed on the sha256 of the downloaded bytes, so identical attachments
+    are uploaded and linked once. OneDrive item ids are aliased to their
+    hash, which lets repeats of the same source file skip the download too.
+    Persisted as append-only JSON lines so it carries across runs.
+    """
+
+    def __init__(self, filepath: Path = Config.DEDUP_CACHE_FILE):
+        self.filepath = filepath
+        self.lock = threading.Lock()
+        self.entries = {}    # content hash → {"item_id", "share_url", "quick_xor_hash"}
+        self.sources = {}    # OneDrive item id → content hash
+        self.items = {}      # SharePoint item id → content hash it currently holds
+        self._key_locks = {}
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self):
+        """Rebuild the cache from its journal"""
+        if not self.filepath.exists():
+            return
+
+        with open(self.filepath, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # torn final write from a crash
+                self._apply(record)
+
+    def _apply(self, record: Dict):
+        """Merge one record into the in-memory maps"""
+        if record.get("discarded"):
+            entry = self.entries.pop(record["hash"], None)
+            if entry and self.items.get(entry.get("item_id")) == record["hash"]:
+                del self.items[entry["item_id"]]
+            return
+
+        item_id = record.get("item_id")
+        if item_id:
+            # An upload replaces whatever the drive item held; other content
+            # cached against it would now link the wrong file
+            previous = self.items.get(item_id)
+            if previous and previous != record["hash"] \
+                    and self.entries.get(previous, {}).get("item_id") == item_id:
+                del self.entries[previous]
+            self.items[item_id] = record["hash"]
+
+        entry = self.entries.setdefault(record["hash"], {})
+        for field in ("item_id", "share_url", "quick_xor_hash"):
+            if record.get(field):
+                entry[field] = record[field]
+
+        if record.get("source"):
+            self.sources[record["source"]] = record["hash"]
+
+    def key_lock(self, content_hash: str) -> threading.Lock:
+        """Lock held while a given content hash is being uploaded"""
+        with self.lock:
+            return self._key_locks.setdefault(content_hash, threading.Lock())
+
+    def lookup_source(self, source_id: str, count: bool = True) -> Optional[Tuple[str, Dict]]:
+        """Find an uploaded copy of a OneDrive item; only hits are counted"""
+        with self.lock:
+            content_hash = self.sources.get(source_id)
+            entry = self.entries.get(content_hash)
+            if not entry or not entry.get("item_id"):
+                return None
+
+            if count:
+                self.hits += 1
+            return content_hash, dict(entry)
+
+    def lookup(self, content_hash: str) -> Optional[Dict]:
+        """Find an uploaded copy of some content, counting the hit or miss"""
+        with self.lock:
+            entry = self.entries.get(content_hash)
+            if entry and entry.get("item_id"):
+                self.hits += 1
+                return dict(entry)
+
+            self.misses += 1
+            return None
+
+    def record(self, content_hash: str, source_id: str = None, item_id: str = None,
+               share_url: str = None, quick_xor_hash: str = None):
+        """Remember where some content was uploaded and/or linked"""
+        record = {"hash": content_hash}
+        if source_id:
+            record["source"] = source_id
+        if item_id:
+            record["item_id"] = item_id
+        if share_url:
+            record["share_url"] = share_url
+        if quick_xor_hash:
+            record["quick_xor_hash"] = quick_xor_hash
+
+        with self.lock:
+            self._apply(record)
+            with open(self.filepath, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+
+    def discard(self, item_id: str) -> int:
+        """Stop reusing an upload (e.g. one that failed verification); returns entries dropped"""
+        with self.lock:
+            stale = [content_hash for content_hash, entry in self.entries.items()
+                     if entry.get("item_id") == item_id]
+            if not stale:
+                return 0
+
+            with open(self.filepath, 'a') as f:
+                for content_hash in stale:
+                    record = {"hash": content_hash, "discarded": True}
+                    self._apply(record)
+                    f.write(json.dumps(record) + '\n')
+
+        return len(stale)
+
+    def stats(self) -> Dict:
+        """Hit/miss counters for reporting"""
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self.entries)
+            }
+
+# ============================================================================
+# ONEDRIVE ITEM RESOLUTION
+# ============================================================================
+
+def normalize_name(name: str) -> str:
+    """Case- and punctuation-insensitive form of a file name"""
+    return re.sub(r'[^a-z0-9.]+', ' ', name.lower()).strip()
+
+class OneDriveIndex:
+    """On-disk index of the source OneDrive, kept current with delta queries.
+
+    Maps item metadata (name, normalized name, size, eTag) to drive item
+    ids, plus sharing-link tokens from the review log to the items they
+    point at, so plan entries resolve with dictionary lookups instead of a
+    Graph search per file.
+    """
+
+    def __init__(self, filepath: Path = Config.ONEDRIVE_INDEX_FILE):
+        self.filepath = filepath
+        self.delta_link = None
+        self.items = {}     # item id → {"name", "size", "eTag", "quickXorHash"}
+        self.shares = {}    # sharing-link token → item id
+        self._load()
+
+    def _load(self):
+        """Load the persisted index and build the lookup maps"""
+        if self.filepath.exists():
+            with open(self.filepath, 'r') as f:
+                data = json.load(f)
+            self.delta_link = data.get("delta_link")
+            self.items = data.get("items", {})
+            self.shares = data.get("shares", {})
+
+        self._build_maps()
+
+    def _build_maps(self):
+        """Rebuild the secondary maps in one pass over the items"""
+        self.by_name = {}
+        self.by_normalized = {}
+        self.by_etag = {}
+
+        for item_id, item in self.items.items():
+            self._add_to_maps(item_id, item)
+
+    def _add_to_maps(self, item_id: str, item: Dict):
+        self.by_name.setdefault(item["name"], []).append(item_id)
+        self.by_normalized.setdefault(normalize_name(item["name"]), []).append(item_id)
+        if item.get("eTag"):
+            self.by_etag[item["eTag"]] = item_id
+
+    def save(self):
+        """Atomically write the index"""
+        tmp_path = self.filepath.with_name(self.filepath.name + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                "delta_link": self.delta_link,
+                "items": self.items,
+                "shares": self.shares
+            }, f)
+        os.replace(tmp_path, self.filepath)
+
+    def refresh(self, api_client: "GraphAPIClient", logger: logging.Logger) -> int:
+        """Apply changes since the last refresh (or enumerate everything once).
+
+        Returns the number of changed items.
+        """
+        try:
+            changed = self._apply_delta(api_client, self.delta_link)
+        except LookupError:
+            logger.warning("OneDrive delta token expired; re-enumerating")
+            self.delta_link = None
+            self.items = {}
+            changed = self._apply_delta(api_client, None)
+
+        self._build_maps()
+        self.save()
+        return changed
+
+    def _apply_delta(self, api_client: "GraphAPIClient", delta_link: Optional[str]) -> int:
+        changed = 0
+
+        for page in api_client.iter_onedrive_delta(delta_link):
+            for item in page.get('value', []):
+                changed += 1
+                if 'deleted' in item or 'file' not in item:
+                    self.items.pop(item['id'], None)
+                    continue
+
+                self.items[item['id']] = {
+                    "name": item.get('name', ''),
+                    "size": item.get('size', 0),
+                    "eTag": item.get('eTag'),
+                    "quickXorHash": quick_xor_hash(item)
+                }
+
+            if '@odata.deltaLink' in page:
+                self.delta_link = page['@odata.deltaLink']
+
+        return changed
+
+    def find_by_name(self, name: str, size: int = None) -> Optional[str]:
+        """Item id for a file name, exact first, then normalized; None if ambiguous"""
+        candidates = self.by_name.get(name) or self.by_normalized.get(normalize_name(name), [])
+
+        if size is not None and len(candidates) > 1:
+            candidates = [i for i in candidates if self.items[i]["size"] == size]
+
+        return candidates[0] if len(candidates) == 1 else None
+
+    def find_by_etag(self, etag: str) -> Optional[str]:
+        return self.by_etag.get(etag)
+
+    def get(self, item_id: str) -> Optional[Dict]:
+        """Indexed metadata for an item"""
+        return self.items.get(item_id)
+
+    def resolve_plan(self, migration_files: List[Dict], api_client: "GraphAPIClient") -> int:
+        """Fill in each entry's onedrive_item_id; returns how many stayed unresolved.
+
+        Entries carrying a document name resolve by name. The rest resolve
+        through their sharing-link token; tokens not yet in the index are
+        looked up once via batched /shares requests and remembered.
+        """
+        unknown = {}
+        for file_info in migration_files:
+            token = file_info['sharepoint_id']
+            if not file_info.get('document') and token not in self.shares:
+                unknown[token] = file_info['old_url']
+
+        if unknown:
+            resolved = api_client.resolve_sharing_links_batched(list(unknown.values()))
+            for token, url in unknown.items():
+                item = resolved.get(url)
+                if item:
+                    self.shares[token] = item['id']
+            self.save()
+
+        unresolved = 0
+        for file_info in migration_files:
+            if file_info.get('document'):
+                item_id = self.find_by_name(file_info['document'])
+            else:
+                item_id = self.shares.get(file_info['sharepoint_id'])
+
+            file_info['onedrive_item_id'] = item_id
+            if not item_id:
+                unresolved += 1
+
+        return unresolved
+
+# ============================================================================
+# STR LIST MIRROR
+# ============================================================================
+
+class ListMirror:
+    """On-disk copy of the STR list's migrated column, kept current with delta queries.
+
+    Items are stored as Graph returns them ({"id", "eTag",
+    "lastModifiedDateTime", "fields"}) with only FIELDS expanded, so a
+    mirrored item can stand in for the per-item GET when backing up.
+    Lookups only answer once the mirror was synced in this process.
+    """
+
+    FIELDS = ("Architecture_Diagram_Picture",)
+
+    def __init__(self, filepath: Path = Config.LIST_MIRROR_FILE):
+        self.filepath = filepath
+        self.lock = threading.Lock()
+        self.delta_link = None
+        self.items = {}      # list item id → item
+        self.synced = False
+        self._load()
+
+    def _load(self):
+        """Load the persisted mirror if it is of this list and these fields"""
+        if not self.filepath.exists():
+            return
+
+        with open(self.filepath, 'r') as f:
+            data = json.load(f)
+
+        if data.get("list_id") != Config.LIST_ID or tuple(data.get("fields", ())) != self.FIELDS:
+            return
+
+        self.delta_link = data.get("delta_link")
+        self.items = data.get("items", {})
+
+    def save(self):
+        """Atomically write the mirror"""
+        with self.lock:
+            data = {
+                "list_id": Config.LIST_ID,
+                "fields": list(self.FIELDS),
+                "delta_link": self.delta_link,
+                "items": self.items
+            }
+
+        tmp_path = self.filepath.with_name(self.filepath.name + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.filepath)
+
+    def refresh(self, api_client: "GraphAPIClient", logger: logging.Logger) -> int:
+        """Apply list changes since the last sync (or page through the whole list once).
+
+        Returns the number of changed items.
+        """
+        try:
+            changed = self._apply_delta(api_client, self.delta_link)
+        except LookupError:
+            logger.warning("STR list delta token expired; re-reading the list")
+            self.delta_link = None
+            self.items = {}
+            changed = self._apply_delta(api_client, None)
+
+        self.synced = True
+        self.save()
+        return changed
+
+    def _apply_delta(self, api_client: "GraphAPIClient", delta_link: Optional[str]) -> int:
+        changed = 0
+
+        for page in api_client.iter_list_delta(self.FIELDS, delta_link):
+            with self.lock:
+                for item in page.get('value', []):
+                    changed += 1
+                    # Without its fields an item cannot serve as a backup; fetch it when needed
+                    if 'deleted' in item or 'fields' not in item:
+                        self.items.pop(item['id'], None)
+                        continue
+
+                    self.items[item['id']] = {
+                        "id": item['id'],
+                        "eTag": item.get('eTag'),
+                        "lastModifiedDateTime": item.get('lastModifiedDateTime'),
+                        "fields": {name: item['fields'].get(name) for name in self.FIELDS}
+                    }
+
+            if '@odata.deltaLink' in page:
+                self.delta_link = page['@odata.deltaLink']
+
+        return changed
+
+    def get(self, item_id: str) -> Optional[Dict]:
+        """Mirrored copy of a list item, or None if it is unknown or the mirror is stale"""
+        with self.lock:
+            item = self.items.get(str(item_id)) if self.synced else None
+            return json.loads(json.dumps(item)) if item else None
+
+    def set_field(self, item_id: str, name: str, value):
+        """Record a value this process wrote to the list"""
+        with self.lock:
+            item = self.items.get(str(item_id))
+            if item:
+                item["fields"][name] = value
+
+# ============================================================================
+# RATE LIMITING
+# ============================================================================
+
+class RateLimiter:
+    """Token bucket shared by all workers whose rate adapts to Graph throttling.
+
+    Successful calls raise the rate additively; 429/503 responses halve it
+    (at most once per second, so a burst of throttled workers does not
+    collapse it) and a Retry-After pauses every caller until it elapses.
+    """
+
+    INCREASE_STEP = 0.1   # requests/second added per success
+    DECREASE_FACTOR = 0.5
+    DECREASE_COOLDOWN = 1.0  # seconds
+
+    def __init__(self, rate: float = Config.RATE_LIMIT_INITIAL,
+                 min_rate: float = Config.RATE_LIMIT_MIN,
+                 max_rate: float = Config.RATE_LIMIT_MAX,
+                 burst: int = Config.RATE_LIMIT_BURST):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self.lock = threading.Lock()
+
+        # Statistics for the run summary
+        self.requests = 0
+        self.throttle_count = 0
+        self.wait_time = 0.0
+
+    def acquire(self):
+        """Block until a request may be sent"""
+        waited = 0.0
+
+        while True:
+            with self.lock:
+                now = time.monotonic()
+
+                if now < self.paused_until:
+                    delay = self.paused_until - now
+                else:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        self.requests += 1
+                        self.wait_time += waited
+                        break
+
+                    delay = (1 - self.tokens) / self.rate
+
+            time.sleep(delay)
+            waited += delay
+
+        if waited:
+            metrics.inc("rate_limit_wait_seconds", waited)
+
+    def on_success(self):
+        """Additive increase after a successful response"""
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.INCREASE_STEP)
+
+    def on_throttle(self, retry_after: Optional[float] = None):
+        """Multiplicative decrease, plus a global pause if the service asked for one"""
+        with self.lock:
+            now = time.monotonic()
+            self.throttle_count += 1
+
+            if now - self.last_decrease >= self.DECREASE_COOLDOWN:
+                self.rate = max(self.min_rate, self.rate * self.DECREASE_FACTOR)
+                self.last_decrease = now
+
+            if retry_after:
+                self.paused_until = max(self.paused_until, now + retry_after)
+
+    def stats(self) -> Dict:
+        """Current limiter state for reporting"""
+        with self.lock:
+            return {
+                "rate": round(self.rate, 2),
+                "requests": self.requests,
+                "throttle_count": self.throttle_count,
+                "wait_time": round(self.wait_time, 2)
+            }
+
 # ============================================================================
 # GRAPH API OPERATIONS
 # ============================================================================
@@ -209,43 +1470,142 @@ class BackupManager:
 class GraphAPIClient:
     """Microsoft Graph API operations with retry logic"""
 
-    MAX_RETRIES = 3
-    RETRY_DELAY = 2  # seconds
+    MAX_RETRIES = 3            # transport errors and 5xx responses
+    MAX_THROTTLE_RETRIES = 8   # 429/503 responses, counted separately
+    RETRY_DELAY = 2            # seconds, base of the exponential backoff
+    MAX_BACKOFF = 60           # seconds
+
+    THROTTLE_STATUSES = (429, 503)
+    TRANSIENT_STATUSES = (500, 502, 504)
+
+    # Upload sessions (range size must be a multiple of 320 KiB)
+    SIMPLE_UPLOAD_LIMIT = 4 * 1024 * 1024
+    UPLOAD_CHUNK_SIZE = 10 * 320 * 1024
+    MAX_SESSION_RESUMES = 3
 
-    def __init__(self, headers: Dict, logger: logging.Logger):
+    SUPPORTED_METHODS = ("GET", "PUT", "POST", "PATCH", "DELETE")
+
+    # JSON batching (Graph accepts at most 20 sub-requests per envelope)
+    BATCH_LIMIT = 20
+
+    def __init__(self, headers: Dict, logger: logging.Logger,
+                 pool_size: int = Config.HTTP_POOL_SIZE,
+                 limiter: RateLimiter = None,
+                 token_provider: TokenProvider = None):
         self.headers = headers
         self.logger = logger
+        self.token_provider = token_provider
+        self.timeout = (Config.HTTP_CONNECT_TIMEOUT, Config.HTTP_READ_TIMEOUT)
+        self.session = self._create_session(pool_size)
+        self.limiter = limiter or RateLimiter()
+
+    @staticmethod
+    def _create_session(pool_size: int) -> requests.Session:
+        """Create a keep-alive session whose pool can serve every worker at once"""
+        session = requests.Session()
+
+        # Retries are handled by _retry_request, so the adapter must not retry
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=pool_size,
+                              max_retries=0, pool_block=True)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+
+        return session
+
+    def close(self):
+        """Release pooled connections"""
+        self.session.close()
 
     def _retry_request(self, method: str, url: str, **kwargs) -> Optional[requests.Response]:
         """Make request with retry logic"""
-        for attempt in range(self.MAX_RETRIES):
-            try:
-                if method == "GET":
-                    response = requests.get(url, headers=self.headers, **kwargs)
-                elif method == "PUT":
-                    response = requests.put(url, headers=self.headers, **kwargs)
-                elif method == "POST":
-                    response = requests.post(url, headers=self.headers, **kwargs)
-                elif method == "PATCH":
-                    response = requests.patch(url, headers=self.headers, **kwargs)
-                else:
-                    raise ValueError(f"Unsupported method: {method}")
+        if method not in self.SUPPORTED_METHODS:
+            raise ValueError(f"Unsupported method: {method}")
 
-                # Check for rate limiting
-                if response.status_code == 429:
-                    wait_time = int(response.headers.get('Retry-After', self.RETRY_DELAY))
-                    self.logger.warning(f"Rate limited. Waiting {wait_time}s")
-                    time.sleep(wait_time)
-                    continue
+        headers = kwargs.pop('headers', self.headers)
+        kwargs.setdefault('timeout', self.timeout)
+
+        failures = 0
+        throttles = 0
+        reauthenticated = False
 
-                return response
+        while True:
+            self.limiter.acquire()
+            metrics.inc("requests")
+
+            try:
+                with metrics.timer("http_request"):
+                    response = self.session.request(method, url, headers=headers, **kwargs)
 
             except requests.RequestException as e:
-                self.logger.warning(f"Request failed (attempt {attempt+1}/{self.MAX_RETRIES}): {e}")
-                if attempt < self.MAX_RETRIES - 1:
-                    time.sleep(self.RETRY_DELAY)
+                failures += 1
+                metrics.inc("transport_errors")
+                self.logger.warning(f"Request failed (attempt {failures}/{self.MAX_RETRIES}): {e}")
+                if failures >= self.MAX_RETRIES:
+                    return None
+                self._sleep_before_retry(self._backoff(failures))
+                continue
+
+            # Expired token: refresh once (shared with other workers) and resend
+            sent = headers.get("Authorization")
+            if response.status_code == 401 and self.token_provider and sent and not reauthenticated:
+                reauthenticated = True
+                metrics.inc("reauthentications")
+                response.close()
+                headers = {**headers, "Authorization": self.token_provider.refresh(stale_header=sent)}
+                continue
+
+            # Throttling: slow every worker down and retry on its own budget
+            if response.status_code in self.THROTTLE_STATUSES:
+                throttles += 1
+                metrics.inc("throttles")
+                retry_after = self._retry_after(response)
+                self.limiter.on_throttle(retry_after)
+
+                if throttles > self.MAX_THROTTLE_RETRIES:
+                    return response
+
+                # With Retry-After the limiter holds all callers until it elapses
+                wait_time = retry_after if retry_after else self._backoff(throttles)
+                self.logger.warning(f"Throttled ({response.status_code}). Waiting {wait_time:.1f}s")
+                response.close()
+                if not retry_after:
+                    self._sleep_before_retry(wait_time)
+                continue
+
+            # Transient server errors share the transport error budget
+            if response.status_code in self.TRANSIENT_STATUSES:
+                failures += 1
+                metrics.inc("server_errors")
+                self.logger.warning(
+                    f"Server error {response.status_code} (attempt {failures}/{self.MAX_RETRIES})"
+                )
+                if failures >= self.MAX_RETRIES:
+                    return response
+                response.close()
+                self._sleep_before_retry(self._backoff(failures))
+                continue
 
-        return None
+            self.limiter.on_success()
+            return response
+
+    @staticmethod
+    def _sleep_before_retry(seconds: float):
+        """Back off before a retry, counting the time spent"""
+        metrics.inc("retries")
+        metrics.inc("retry_sleep_seconds", seconds)
+        time.sleep(seconds)
+
+    def _backoff(self, attempt: int) -> float:
+        """Exponential backoff with full jitter"""
+        return random.uniform(0, min(self.MAX_BACKOFF, self.RETRY_DELAY * 2 ** (attempt - 1)))
+
+    @staticmethod
+    def _retry_after(response: requests.Response) -> Optional[float]:
+        """Parse a Retry-After header given in seconds"""
+        try:
+            return float(response.headers.get('Retry-After'))
+        except (TypeError, ValueError):
+            return None
 
     def download_onedrive_file(self, item_id: str) -> Optional[bytes]:
         """Download file from OneDrive"""
@@ -267,9 +1627,305 @@ class GraphAPIClient:
         headers = self.headers.copy()
         headers["Content-Type"] = "application/octet-stream"
 
-        response = self._retry_request("PUT", url, data=file_content)
+        response = self._retry_request("PUT", url, data=file_content, headers=headers)
 
         if response and response.status_code in [200, 201]:
+            metrics.inc("bytes_uploaded", len(file_content))
+            return response.json()
+
+        return None
+
+    # ------------------------------------------------------------------------
+    # Streaming transfer (OneDrive download piped into an upload session)
+    # ------------------------------------------------------------------------
+
+    def open_onedrive_stream(self, item_id: str, offset: int = 0) -> Optional[requests.Response]:
+        """Open a streaming download of a OneDrive file, optionally from a byte offset"""
+        url = f"{Config.GRAPH_BASE}/me/drive/items/{item_id}/content"
+
+        headers = self.headers.copy()
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+
+        response = self._retry_request("GET", url, stream=True, headers=headers)
+
+        if response and response.status_code in [200, 206]:
+            return response
+
+        if response:
+            response.close()
+        return None
+
+    def get_onedrive_item_size(self, item_id: str) -> Optional[int]:
+        """Get a OneDrive file's size from its metadata"""
+        url = f"{Config.GRAPH_BASE}/me/drive/items/{item_id}?$select=size"
+        response = self._retry_request("GET", url)
+
+        if response and response.status_code == 200:
+            return response.json().get('size')
+
+        return None
+
+    def create_upload_session(self, filename: str) -> Optional[str]:
+        """Create a resumable upload session in SharePoint, returning its upload URL"""
+        filename = self._sanitize_filename(filename)
+
+        url = f"{Config.GRAPH_BASE}/drives/{Config.DRIVE_ID}/root:/{filename}:/createUploadSession"
+
+        payload = {
+            "item": {"@microsoft.graph.conflictBehavior": "replace"}
+        }
+
+        response = self._retry_request("POST", url, json=payload)
+
+        if response and response.status_code == 200:
+            return response.json().get('uploadUrl')
+
+        return None
+
+    def get_upload_session_offset(self, upload_url: str) -> Optional[int]:
+        """Ask the upload session for the first byte it has not yet acknowledged"""
+        # Upload URLs are pre-authenticated; the bearer token must not be sent
+        response = self._retry_request("GET", upload_url, headers={})
+
+        if response and response.status_code == 200:
+            ranges = response.json().get('nextExpectedRanges') or ["0-"]
+            return int(ranges[0].split('-')[0])
+
+        return None
+
+    def cancel_upload_session(self, upload_url: str):
+        """Discard an upload session and any ranges already uploaded"""
+        self._retry_request("DELETE", upload_url, headers={})
+
+    def _upload_range(self, upload_url: str, chunk: bytes, start: int, total: int) -> Optional[requests.Response]:
+        """PUT a single byte range to an upload session"""
+        headers = {
+            "Content-Length": str(len(chunk)),
+            "Content-Range": f"bytes {start}-{start + len(chunk) - 1}/{total}"
+        }
+
+        return self._retry_request("PUT", upload_url, data=chunk, headers=headers)
+
+    @staticmethod
+    def _iter_fixed_chunks(response: requests.Response, chunk_size: int, skip: int = 0):
+        """Re-slice a streaming response into fixed-size chunks, dropping the first `skip` bytes"""
+        buffer = bytearray()
+
+        for piece in response.iter_content(chunk_size=64 * 1024):
+            metrics.inc("bytes_downloaded", len(piece))
+            if skip:
+                dropped = min(skip, len(piece))
+                piece = piece[dropped:]
+                skip -= dropped
+
+            buffer.extend(piece)
+            while len(buffer) >= chunk_size:
+                yield bytes(buffer[:chunk_size])
+                del buffer[:chunk_size]
+
+        if buffer:
+            yield bytes(buffer)
+
+    def _iter_response_chunks(self, response: Optional[requests.Response], offset: int):
+        """Fixed-size chunks of a download opened at `offset`; closes the response when done"""
+        if not response:
+            return
+
+        try:
+            # A server that ignores the Range header replies 200 with the whole file
+            skip = offset if response.status_code == 200 else 0
+            yield from self._iter_fixed_chunks(response, self.UPLOAD_CHUNK_SIZE, skip)
+        finally:
+            response.close()
+
+    def _iter_file_chunks(self, fileobj: IO[bytes], offset: int):
+        """Fixed-size chunks of a local file starting at `offset`"""
+        fileobj.seek(offset)
+
+        while True:
+            chunk = fileobj.read(self.UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+    def _pump_ranges(self, chunks: Iterator[bytes], upload_url: str,
+                     offset: int, total: int) -> Tuple[Optional[Dict], int]:
+        """Copy chunks into the upload session, starting at `offset`.
+
+        Returns (drive item, offset); the drive item is None if the transfer
+        stopped early, in which case the caller should resume.
+        """
+        try:
+            for chunk in chunks:
+                result = self._upload_range(upload_url, chunk, offset, total)
+
+                if not result or result.status_code not in [200, 201, 202]:
+                    return None, offset
+
+                offset += len(chunk)
+                metrics.inc("bytes_uploaded", len(chunk))
+
+                if result.status_code in [200, 201]:
+                    return result.json(), offset
+
+        except requests.RequestException as e:
+            self.logger.warning(f"Stream interrupted at byte {offset}/{total}: {e}")
+
+        finally:
+            chunks.close()
+
+        return None, offset
+
+    def _run_upload_session(self, filename: str, total: int, chunks: Iterator[bytes],
+                            reopen: Callable[[int], Iterator[bytes]]) -> Optional[Dict]:
+        """Drive an upload session to completion.
+
+        After a failure the session is asked for its next expected range
+        and `reopen(offset)` supplies the chunks from there on.
+        """
+        upload_url = self.create_upload_session(filename)
+        if not upload_url:
+            chunks.close()
+            return None
+
+        offset = 0
+        for resume in range(self.MAX_SESSION_RESUMES + 1):
+            uploaded, offset = self._pump_ranges(chunks, upload_url, offset, total)
+            if uploaded:
+                return uploaded
+
+            if resume == self.MAX_SESSION_RESUMES:
+                break
+
+            acknowledged = self.get_upload_session_offset(upload_url)
+            if acknowledged is None:
+                break
+
+            offset = acknowledged
+            self.logger.warning(f"Resuming upload of {filename} at byte {offset}/{total}")
+            chunks = reopen(offset)
+
+        self.cancel_upload_session(upload_url)
+        return None
+
+    def stream_to_sharepoint(self, item_id: str, filename: str,
+                             hasher: QuickXorHash = None) -> Optional[Dict]:
+        """Stream a OneDrive file into SharePoint without buffering it in memory.
+
+        Small files go through a single simple upload; anything larger is
+        piped range by range into an upload session, resuming from the last
+        acknowledged range if the download or an upload range fails.
+        The bytes sent are fed to `hasher` on the way through.
+        """
+        response = self.open_onedrive_stream(item_id)
+        if not response:
+            return None
+
+        total = int(response.headers.get('Content-Length') or 0) or self.get_onedrive_item_size(item_id)
+        if total is None:
+            response.close()
+            return None
+
+        if total <= self.SIMPLE_UPLOAD_LIMIT:
+            try:
+                file_content = response.content
+            finally:
+                response.close()
+            metrics.inc("bytes_downloaded", len(file_content))
+            if hasher:
+                hasher.update(file_content)
+            return self.upload_to_sharepoint(filename, file_content)
+
+        def chunks_from(offset: int, chunks: Iterator[bytes]) -> Iterator[bytes]:
+            for chunk in chunks:
+                if hasher:
+                    hasher.update_at(offset, chunk)
+                offset += len(chunk)
+                yield chunk
+
+        return self._run_upload_session(
+            filename, total,
+            chunks_from(0, self._iter_response_chunks(response, 0)),
+            lambda offset: chunks_from(
+                offset, self._iter_response_chunks(self.open_onedrive_stream(item_id, offset), offset)
+            )
+        )
+
+    def download_to_spool(self, item_id: str) -> Optional[Tuple[IO[bytes], str, int, str]]:
+        """Download a OneDrive file into a spooled temp file, hashing it on the way.
+
+        Memory use is capped at SPOOL_MAX_MEMORY; larger files spill to
+        disk. An interrupted download resumes with a Range request.
+        Returns (file positioned at 0, sha256 hex digest, size, quickXorHash).
+        """
+        spool = tempfile.SpooledTemporaryFile(max_size=Config.SPOOL_MAX_MEMORY)
+        digest = hashlib.sha256()
+        quick_xor = QuickXorHash()
+
+        for attempt in range(self.MAX_SESSION_RESUMES + 1):
+            offset = spool.tell()
+            response = self.open_onedrive_stream(item_id, offset)
+            if not response:
+                break
+
+            # Range ignored: the whole file is coming again
+            if offset and response.status_code == 200:
+                spool.seek(0)
+                spool.truncate()
+                digest = hashlib.sha256()
+                quick_xor = QuickXorHash()
+
+            try:
+                for piece in response.iter_content(chunk_size=64 * 1024):
+                    digest.update(piece)
+                    quick_xor.update(piece)
+                    spool.write(piece)
+                    metrics.inc("bytes_downloaded", len(piece))
+
+                size = spool.tell()
+                spool.seek(0)
+                return spool, digest.hexdigest(), size, quick_xor.base64digest()
+
+            except requests.RequestException as e:
+                self.logger.warning(f"Download interrupted at byte {spool.tell()}: {e}")
+
+            finally:
+                response.close()
+
+        spool.close()
+        return None
+
+    def upload_from_file(self, filename: str, fileobj: IO[bytes], size: int) -> Optional[Dict]:
+        """Upload a local file, through an upload session if it is large"""
+        if size <= self.SIMPLE_UPLOAD_LIMIT:
+            fileobj.seek(0)
+            return self.upload_to_sharepoint(filename, fileobj.read())
+
+        return self._run_upload_session(
+            filename, size,
+            self._iter_file_chunks(fileobj, 0),
+            lambda offset: self._iter_file_chunks(fileobj, offset)
+        )
+
+    def get_drive_item(self, item_id: str) -> Optional[Dict]:
+        """Get a SharePoint drive item's metadata, or None if it does not exist"""
+        url = f"{Config.GRAPH_BASE}/drives/{Config.DRIVE_ID}/items/{item_id}"
+        response = self._retry_request("GET", url)
+
+        if response and response.status_code == 200:
+            return response.json()
+
+        return None
+
+    def get_drive_item_by_name(self, filename: str) -> Optional[Dict]:
+        """Get the metadata of an uploaded file by name, or None if it does not exist"""
+        filename = self._sanitize_filename(filename)
+
+        url = f"{Config.GRAPH_BASE}/drives/{Config.DRIVE_ID}/root:/{filename}"
+        response = self._retry_request("GET", url)
+
+        if response and response.status_code == 200:
             return response.json()
 
         return None
@@ -312,6 +1968,313 @@ class GraphAPIClient:
 
         return False
 
+    # ------------------------------------------------------------------------
+    # JSON batching
+    # ------------------------------------------------------------------------
+
+    def execute_batch(self, sub_requests: List[Dict]) -> Dict[str, Dict]:
+        """Send sub-requests through /$batch, retrying throttled and failed ones.
+
+        Each sub-request is a dict with "id", "method", "url" (relative to
+        GRAPH_BASE) and optionally "body". Returns a mapping of id to the
+        sub-response ({"status", "headers", "body"}); sub-requests whose
+        envelope could not be delivered are reported with status 0.
+        Throttled and transient 5xx sub-responses are re-sent on the same
+        budgets _retry_request uses for unbatched requests.
+        """
+        results = {}
+        pending = list(sub_requests)
+        throttles = 0
+        failures = Counter()   # transient server errors per sub-request id
+
+        while pending:
+            retry = []
+            throttled = errors = 0
+            retry_after = 0.0
+
+            for start in range(0, len(pending), self.BATCH_LIMIT):
+                envelope = pending[start:start + self.BATCH_LIMIT]
+                by_id = {sub['id']: sub for sub in envelope}
+
+                response = self._retry_request(
+                    "POST", f"{Config.GRAPH_BASE}/$batch",
+                    json={"requests": [self._batch_entry(sub) for sub in envelope]}
+                )
+
+                if not response or response.status_code != 200:
+                    for sub_id in by_id:
+                        results[sub_id] = {"status": 0, "headers": {}, "body": None}
+                    continue
+
+                for sub_response in response.json().get('responses', []):
+                    sub_id = sub_response.get('id')
+                    if sub_id not in by_id:
+                        continue
+                    status = sub_response.get('status')
+
+                    if status in self.THROTTLE_STATUSES and throttles + 1 < self.MAX_THROTTLE_RETRIES:
+                        headers = sub_response.get('headers') or {}
+                        try:
+                            retry_after = max(retry_after, float(headers.get('Retry-After')))
+                        except (TypeError, ValueError):
+                            pass
+                        throttled += 1
+                        retry.append(by_id[sub_id])
+                    elif status in self.TRANSIENT_STATUSES and failures[sub_id] + 1 < self.MAX_RETRIES:
+                        failures[sub_id] += 1
+                        errors += 1
+                        retry.append(by_id[sub_id])
+                    else:
+                        results[sub_id] = sub_response
+
+                # Sub-requests the service silently dropped count as undelivered
+                for sub_id in by_id:
+                    if sub_id not in results and by_id[sub_id] not in retry:
+                        results[sub_id] = {"status": 0, "headers": {}, "body": None}
+
+            pending = retry
+            if not retry:
+                break
+
+            if errors:
+                metrics.inc("server_errors", errors)
+            if throttled:
+                throttles += 1
+                metrics.inc("throttles", throttled)
+                self.limiter.on_throttle(retry_after)
+                wait_time = retry_after or self._backoff(throttles)
+                self.logger.warning(f"{throttled} batched requests throttled. Waiting {wait_time:.1f}s")
+                if not retry_after:
+                    self._sleep_before_retry(wait_time)
+            else:
+                wait_time = self._backoff(max(failures[sub['id']] for sub in retry))
+                self.logger.warning(f"{errors} batched requests hit server errors. Retrying in {wait_time:.1f}s")
+                self._sleep_before_retry(wait_time)
+
+        return results
+
+    @staticmethod
+    def _batch_entry(sub: Dict) -> Dict:
+        """Build a single /$batch request entry"""
+        entry = {"id": sub['id'], "method": sub['method'], "url": sub['url']}
+
+        if sub.get('body') is not None:
+            entry["body"] = sub['body']
+            entry["headers"] = {"Content-Type": "application/json"}
+
+        return entry
+
+    @staticmethod
+    def list_item_path(item_id: str) -> str:
+        """Graph path of a STR list item, relative to GRAPH_BASE"""
+        return f"/sites/{Config.SITE_ID}/lists/{Config.LIST_ID}/items/{item_id}"
+
+    def backup_list_items_batched(self, item_ids: List[str], backup_mgr: "BackupManager",
+                                  labels: Dict[str, Dict] = None) -> Dict[str, Optional[str]]:
+        """Back up many list items with batched GETs; returns item id → backup reference.
+
+        `labels` optionally maps an item id to the product/file_id to record with it.
+        """
+        responses = self.execute_batch([
+            {"id": str(i), "method": "GET", "url": self.list_item_path(item_id)}
+            for i, item_id in enumerate(item_ids)
+        ])
+
+        backups = {}
+        for i, item_id in enumerate(item_ids):
+            sub_response = responses.get(str(i), {})
+            if sub_response.get('status') == 200:
+                backups[item_id] = backup_mgr.save_item_backup(
+                    item_id, sub_response['body'], **(labels or {}).get(item_id, {})
+                )
+            else:
+                backups[item_id] = None
+
+        return backups
+
+    def update_list_items_batched(self, updates: List[Tuple[str, str]],
+                                  test_mode: bool = False) -> Dict[str, bool]:
+        """Set Architecture_Diagram_Picture on many items; returns item id → success"""
+        if test_mode:
+            for item_id, architecture_url in updates:
+                self.logger.info(f"[TEST MODE] Would update item {item_id} with URL: {architecture_url}")
+            return {item_id: True for item_id, _ in updates}
+
+        responses = self.execute_batch([
+            {
+                "id": str(i),
+                "method": "PATCH",
+                "url": self.list_item_path(item_id),
+                "body": {"fields": {"Architecture_Diagram_Picture": architecture_url}}
+            }
+            for i, (item_id, architecture_url) in enumerate(updates)
+        ])
+
+        return {
+            item_id: responses.get(str(i), {}).get('status') == 200
+            for i, (item_id, _) in enumerate(updates)
+        }
+
+    def create_sharing_links_batched(self, item_ids: List[str]) -> Dict[str, Optional[str]]:
+        """Create organization view links for many drive items; returns item id → URL"""
+        responses = self.execute_batch([
+            {
+                "id": str(i),
+                "method": "POST",
+                "url": f"/drives/{Config.DRIVE_ID}/items/{item_id}/createLink",
+                "body": {"type": "organizationView", "scope": "organization"}
+            }
+            for i, item_id in enumerate(item_ids)
+        ])
+
+        links = {}
+        for i, item_id in enumerate(item_ids):
+            sub_response = responses.get(str(i), {})
+            if sub_response.get('status') in [200, 201]:
+                links[item_id] = sub_response['body']['link']['webUrl']
+            else:
+                links[item_id] = None
+
+        return links
+
+    # ------------------------------------------------------------------------
+    # OneDrive enumeration
+    # ------------------------------------------------------------------------
+
+    ONEDRIVE_DELTA_SELECT = "id,name,size,eTag,file,folder,deleted"
+
+    def iter_onedrive_delta(self, delta_link: str = None) -> Iterator[Dict]:
+        """Yield pages of the OneDrive delta feed.
+
+        Starts a full enumeration, or continues from a previous deltaLink.
+        The last page carries the new "@odata.deltaLink". Raises
+        LookupError if the service says the delta token has expired.
+        """
+        url = delta_link or f"{Config.GRAPH_BASE}/me/drive/root/delta?$select={self.ONEDRIVE_DELTA_SELECT}"
+
+        while url:
+            response = self._retry_request("GET", url)
+
+            if response is not None and response.status_code == 410:
+                raise LookupError("OneDrive delta token expired")
+            if not response or response.status_code != 200:
+                raise Exception(f"OneDrive delta query failed: {url}")
+
+            page = response.json()
+            yield page
+            url = page.get('@odata.nextLink')
+
+    # ------------------------------------------------------------------------
+    # STR list enumeration
+    # ------------------------------------------------------------------------
+
+    LIST_PAGE_SIZE = 999
+
+    def iter_list_delta(self, fields: Tuple[str, ...], delta_link: str = None) -> Iterator[Dict]:
+        """Yield pages of the STR list's item delta feed with `fields` expanded.
+
+        Without a deltaLink this pages through every item; the last page
+        carries the new "@odata.deltaLink". Raises LookupError if the
+        service says the delta token has expired.
+        """
+        url = delta_link or (
+            f"{Config.GRAPH_BASE}{self.list_item_path('delta')}"
+            f"?$expand=fields($select={','.join(fields)})&$top={self.LIST_PAGE_SIZE}"
+        )
+
+        while url:
+            response = self._retry_request("GET", url)
+
+            if response is not None and response.status_code == 410:
+                raise LookupError("STR list delta token expired")
+            if not response or response.status_code != 200:
+                raise Exception(f"STR list delta query failed: {url}")
+
+            page = response.json()
+            yield page
+            url = page.get('@odata.nextLink')
+
+    @staticmethod
+    def encode_sharing_url(url: str) -> str:
+        """Encode a sharing URL for the /shares endpoint"""
+        return "u!" + base64.urlsafe_b64encode(url.encode()).decode().rstrip('=')
+
+    def resolve_sharing_links_batched(self, urls: List[str]) -> Dict[str, Optional[Dict]]:
+        """Resolve sharing URLs to drive item metadata; returns URL → item"""
+        responses = self.execute_batch([
+            {
+                "id": str(i),
+                "method": "GET",
+                "url": f"/shares/{self.encode_sharing_url(url)}/driveItem?$select=id,name,size,eTag"
+            }
+            for i, url in enumerate(urls)
+        ])
+
+        items = {}
+        for i, url in enumerate(urls):
+            sub_response = responses.get(str(i), {})
+            items[url] = sub_response['body'] if sub_response.get('status') == 200 else None
+
+        return items
+
+    def get_drive_items_batched(self, item_ids: List[str]) -> Dict[str, Optional[Dict]]:
+        """SharePoint drive item metadata (id, size, hashes) by id.
+
+        Items that no longer exist map to None; items whose sub-request
+        failed for another reason are left out.
+        """
+        responses = self.execute_batch([
+            {
+                "id": str(i),
+                "method": "GET",
+                "url": f"/drives/{Config.DRIVE_ID}/items/{item_id}?$select=id,name,size,file"
+            }
+            for i, item_id in enumerate(item_ids)
+        ])
+
+        items = {}
+        for i, item_id in enumerate(item_ids):
+            sub_response = responses.get(str(i), {})
+            if sub_response.get('status') == 200:
+                items[item_id] = sub_response['body']
+            elif sub_response.get('status') == 404:
+                items[item_id] = None
+
+        return items
+
+    def get_onedrive_items_batched(self, item_ids: List[str]) -> Dict[str, Optional[Dict]]:
+        """OneDrive source item metadata (id, size) by id; missing items map to None"""
+        responses = self.execute_batch([
+            {"id": str(i), "method": "GET", "url": f"/me/drive/items/{item_id}?$select=id,size"}
+            for i, item_id in enumerate(item_ids)
+        ])
+
+        items = {}
+        for i, item_id in enumerate(item_ids):
+            sub_response = responses.get(str(i), {})
+            if sub_response.get('status') == 200:
+                items[item_id] = sub_response['body']
+            elif sub_response.get('status') == 404:
+                items[item_id] = None
+
+        return items
+
+    def list_drive_root_names(self) -> List[str]:
+        """Names of the files in the SharePoint drive root, paging through children"""
+        url = f"{Config.GRAPH_BASE}/drives/{Config.DRIVE_ID}/root/children?$select=name&$top=999"
+        names = []
+
+        while url:
+            response = self._retry_request("GET", url)
+            if not response or response.status_code != 200:
+                raise Exception("Failed to list SharePoint drive root")
+
+            page = response.json()
+            names.extend(item['name'] for item in page.get('value', []))
+            url = page.get('@odata.nextLink')
+
+        return names
+
     @staticmethod
     def _sanitize_filename(filename: str) -> str:
         """Remove invalid characters from filename"""
@@ -321,6 +2284,333 @@ class GraphAPIClient:
             filename = filename.replace(char, '_')
         return filename
 
+# ============================================================================
+# SHARDING
+# ============================================================================
+
+SHARD_DIR_PATTERN = re.compile(r'^shard-(\d+)-of-(\d+)$')
+
+def shard_of(sharepoint_id: str, count: int) -> int:
+    """Shard (counted from 1) that owns a plan entry; the same in every process and on every host"""
+    digest = hashlib.sha256(sharepoint_id.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % count + 1
+
+def select_shard(migration_files: List[Dict], index: int, count: int) -> List[Dict]:
+    """The plan entries shard `index` of `count` is responsible for, in plan order"""
+    return [f for f in migration_files if shard_of(f['sharepoint_id'], count) == index]
+
+def _read_audit(filepath: Path, shard: str) -> Iterator[Dict]:
+    """Audit records of one shard, tagged with it; a torn final line is skipped"""
+    if not filepath.exists():
+        return
+    with open(filepath, 'r') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            record["shard"] = shard
+            yield record
+
+def merge_shards(log_root: Path, backup_root: Path, output_dir: Path,
+                 logger: logging.Logger) -> Dict:
+    """Combine the state of every shard under `log_root` into one view.
+
+    Writes to `output_dir`:
+    - progress.json: every file's latest status across shards, in the
+      ProgressTracker snapshot format
+    - audit.jsonl: all shard audit logs interleaved by timestamp, each
+      record tagged with its shard (str_audit_query.py --log reads it)
+    - shard_summary.json: per-shard and overall counts, missing shards
+      and failed files
+
+    Shard state is only read, so this is safe while shards are running.
+    Directories from different shard counts (a re-sharded migration) are
+    merged too; a file's newest record wins.
+    """
+    shards = []
+    for path in sorted(log_root.iterdir()) if log_root.exists() else []:
+        match = SHARD_DIR_PATTERN.match(path.name)
+        if path.is_dir() and match:
+            shards.append((int(match.group(2)), int(match.group(1)), path))
+    shards.sort()
+
+    summary = {
+        "merged_at": datetime.utcnow().isoformat(),
+        "shards": {},
+        "missing_shards": [],
+        "totals": {},
+        "failed_files": []
+    }
+    if not shards:
+        logger.error(f"✗ No shard directories under {log_root}")
+        return summary
+
+    present = {(count, index) for count, index, _ in shards}
+    for count in sorted({count for count, _, _ in shards}):
+        summary["missing_shards"].extend(
+            Config.shard_name(index, count) for index in range(1, count + 1)
+            if (count, index) not in present
+        )
+
+    files = {}
+    owners = {}
+    started = []
+    for count, index, path in shards:
+        name = path.name
+        data = ProgressTracker(path / Config.PROGRESS_FILE.name).data
+        started.append(data["started"])
+
+        for file_id, entry in data["files"].items():
+            if file_id not in files or entry["timestamp"] > files[file_id]["timestamp"]:
+                files[file_id] = entry
+                owners[file_id] = name
+
+        backup_index = backup_root / name / Config.BACKUP_INDEX_NAME
+        backups = 0
+        if backup_index.exists():
+            with open(backup_index, 'r') as f:
+                backups = sum(1 for _ in f)
+
+        summary["shards"][name] = {
+            "planned": data["total"],
+            "statuses": dict(Counter(entry["status"] for entry in data["files"].values())),
+            "backups": backups
+        }
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    # Global audit view: shard logs are each in time order, so a k-way merge suffices
+    audit_counts = Counter()
+    audit_path = output_dir / Config.AUDIT_LOG.name
+    tmp_path = audit_path.with_name(audit_path.name + '.tmp')
+    with open(tmp_path, 'w') as f:
+        streams = [_read_audit(path / Config.AUDIT_LOG.name, path.name) for _, _, path in shards]
+        for record in heapq.merge(*streams, key=lambda record: record.get("timestamp", "")):
+            audit_counts[record["shard"]] += 1
+            f.write(json.dumps(record) + '\n')
+    os.replace(tmp_path, audit_path)
+
+    statuses = Counter(entry["status"] for entry in files.values())
+    progress = {
+        "started": min(started),
+        "total": sum(shard["planned"] for shard in summary["shards"].values()),
+        "completed": statuses["completed"],
+        "failed": statuses["failed"],
+        "files": files,
+        "journal_seq": 0
+    }
+    progress_path = output_dir / Config.PROGRESS_FILE.name
+    tmp_path = progress_path.with_name(progress_path.name + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(progress, f, indent=2)
+    os.replace(tmp_path, progress_path)
+
+    for name, shard in summary["shards"].items():
+        shard["audit_records"] = audit_counts[name]
+    summary["totals"] = {
+        "planned": progress["total"],
+        "files": len(files),
+        "statuses": dict(statuses),
+        "audit_records": sum(audit_counts.values()),
+        "backups": sum(shard["backups"] for shard in summary["shards"].values())
+    }
+    summary["failed_files"] = [
+        {"file_id": file_id, "shard": owners[file_id], "error": entry["details"].get("error")}
+        for file_id, entry in files.items() if entry["status"] == "failed"
+    ]
+
+    with open(output_dir / "shard_summary.json", 'w') as f:
+        json.dump(summary, f, indent=2)
+
+    logger.info(f"\n{'='*80}")
+    logger.info("SHARD MERGE")
+    logger.info(f"{'='*80}")
+    for name, shard in summary["shards"].items():
+        counts = ", ".join(f"{count} {status}" for status, count in sorted(shard["statuses"].items()))
+        logger.info(f"{name}: {shard['planned']} planned ({counts or 'no files recorded'}), "
+                    f"{shard['audit_records']} audit records, {shard['backups']} backups")
+    totals = summary["totals"]
+    logger.info(f"Total: {totals['planned']} planned, {statuses['completed']} completed, "
+                f"{statuses['failed']} failed, {totals['audit_records']} audit records")
+    if summary["missing_shards"]:
+        logger.warning(f"Missing shards: {', '.join(summary['missing_shards'])}")
+    for failed in summary["failed_files"]:
+        logger.error(f"  - {failed['file_id']} ({failed['shard']}): {failed['error']}")
+    logger.info(f"✓ Merged progress: {progress_path}")
+    logger.info(f"✓ Global audit log: {audit_path}")
+    logger.info(f"✓ Summary: {output_dir / 'shard_summary.json'}")
+
+    return summary
+
+# ============================================================================
+# SCHEDULING
+# ============================================================================
+
+class Scheduler:
+    """Execution order for a migration: priority tiers, longest first, and a small-file lane.
+
+    Every entry gets a tier from the first priority override it matches
+    (entries matching none come last) and an estimated duration from the
+    bytes it has to move. Entries up to SMALL_FILE_MAX form the fast lane,
+    the rest the main lane; each lane runs in tier order and, within a
+    tier, longest first (LPT), so large uploads start early instead of
+    setting the tail of the run. Some workers prefer the fast lane so
+    small diagrams never queue behind multi-MB uploads. An idle worker
+    takes the lower-tier head of the two lanes (its own on ties), so no
+    worker waits while either lane has work.
+
+    Disabled, every worker takes entries in plan order.
+    """
+
+    FAST, MAIN = "fast", "main"
+
+    def __init__(self, workers: int, enabled: bool = True,
+                 priorities: List[Tuple[str, str]] = None, small_file_max: int = None,
+                 fast_lane_workers: int = None, latency: float = None, bandwidth: float = None):
+        workers = max(1, workers)
+        self.enabled = enabled
+        self.priorities = [
+            (field, str(value).strip())
+            for field, value in (Config.SCHEDULE_PRIORITIES if priorities is None else priorities)
+        ]
+        self.small_file_max = Config.SMALL_FILE_MAX if small_file_max is None else small_file_max
+        self.latency = Config.PLAN_REQUEST_LATENCY if latency is None else latency
+        self.bandwidth = Config.PLAN_BANDWIDTH if bandwidth is None else bandwidth
+
+        fast = 0
+        if enabled and workers > 1:
+            if fast_lane_workers is None:
+                fast_lane_workers = Config.FAST_LANE_WORKERS
+            if fast_lane_workers is None:
+                fast_lane_workers = max(1, round(workers * Config.FAST_LANE_SHARE))
+            fast = max(0, min(fast_lane_workers, workers - 1))
+        self.worker_lanes = [self.FAST] * fast + [self.MAIN] * (workers - fast)
+
+        self.sizes = []
+        self.tiers = []
+        self.estimates = []
+        self.lanes = {self.FAST: [], self.MAIN: []}
+
+    def tier(self, file_info: Dict) -> int:
+        """Index of the first priority override the entry matches"""
+        for rank, (field, value) in enumerate(self.priorities):
+            if str(file_info.get(field) or '').strip().casefold() == value.casefold():
+                return rank
+        return len(self.priorities)
+
+    def estimate(self, size: int) -> float:
+        """Seconds one worker needs for an entry moving `size` bytes (download + upload)"""
+        request_count = 5   # download, upload, link, backup, update
+        if size > GraphAPIClient.SIMPLE_UPLOAD_LIMIT:
+            request_count += math.ceil(size / GraphAPIClient.UPLOAD_CHUNK_SIZE)
+        return request_count * self.latency + 2 * size / self.bandwidth
+
+    def build(self, migration_files: List[Dict], sizes: List[int]):
+        """Assign tiers, estimates and lanes; positions refer to `migration_files`"""
+        self.sizes = list(sizes)
+        self.tiers = [self.tier(file_info) for file_info in migration_files]
+        self.estimates = [self.estimate(size) for size in sizes]
+
+        if not self.enabled:
+            self.lanes = {self.FAST: [], self.MAIN: list(range(len(migration_files)))}
+            return
+
+        self.lanes = {self.FAST: [], self.MAIN: []}
+        for position, size in enumerate(sizes):
+            self.lanes[self.FAST if size <= self.small_file_max else self.MAIN].append(position)
+        for lane in self.lanes.values():
+            lane.sort(key=lambda position: (self.tiers[position], -self.estimates[position], position))
+
+    def _queues(self, plan_order: bool = False) -> Dict[str, deque]:
+        if plan_order:
+            return {self.FAST: deque(), self.MAIN: deque(range(len(self.tiers)))}
+        return {lane: deque(positions) for lane, positions in self.lanes.items()}
+
+    def _take(self, queues: Dict[str, deque], lane: str) -> Optional[int]:
+        """Next position for a worker of `lane`, or None when both lanes are empty"""
+        own = queues[lane]
+        other = queues[self.FAST if lane == self.MAIN else self.MAIN]
+        if own and (not other or self.tiers[own[0]] <= self.tiers[other[0]]):
+            return own.popleft()
+        if other:
+            return other.popleft()
+        return None
+
+    def simulate(self, durations: List[float], plan_order: bool = False) -> float:
+        """Makespan of dispatching entries with these durations (plan order: one FIFO for all workers)"""
+        queues = self._queues(plan_order)
+        lanes = [self.MAIN] * len(self.worker_lanes) if plan_order else self.worker_lanes
+        free = [(0.0, worker) for worker in range(len(lanes))]
+        makespan = 0.0
+
+        while queues[self.FAST] or queues[self.MAIN]:
+            now, worker = heapq.heappop(free)
+            end = now + durations[self._take(queues, lanes[worker])]
+            makespan = max(makespan, end)
+            heapq.heappush(free, (end, worker))
+
+        return makespan
+
+    def project(self, plan_order: bool = False) -> float:
+        """Estimated makespan; never less than moving every byte at full bandwidth"""
+        return max(self.simulate(self.estimates, plan_order), 2 * sum(self.sizes) / self.bandwidth)
+
+    def run(self, work: Callable[[int, int], object]) -> Tuple[List, List[float]]:
+        """Call work(seq, position) for every entry on the scheduled workers.
+
+        seq counts dispatches from 1. Returns the outcomes and the seconds
+        each entry took, both in plan order.
+        """
+        queues = self._queues()
+        outcomes = [None] * len(self.tiers)
+        seconds = [0.0] * len(self.tiers)
+        lock = threading.Lock()
+        dispatched = 0
+
+        def drain(lane: str):
+            nonlocal dispatched
+            while True:
+                with lock:
+                    position = self._take(queues, lane)
+                    if position is None:
+                        return
+                    dispatched += 1
+                    seq = dispatched
+                started = time.monotonic()
+                outcomes[position] = work(seq, position)
+                seconds[position] = time.monotonic() - started
+
+        if len(self.worker_lanes) == 1:
+            drain(self.worker_lanes[0])
+        else:
+            with ThreadPoolExecutor(max_workers=len(self.worker_lanes)) as pool:
+                for future in [pool.submit(drain, lane) for lane in self.worker_lanes]:
+                    future.result()
+
+        return outcomes, seconds
+
+    def report(self, actual: float = None, seconds: List[float] = None) -> Dict:
+        """Lane sizes and projected makespans, plus measured ones after a run.
+
+        The replayed figures dispatch the measured per-file times again, in
+        this order and in plan order, which isolates what the ordering gained
+        from how good the estimates were.
+        """
+        report = {
+            "enabled": self.enabled,
+            "priorities": [f"{field}={value}" for field, value in self.priorities],
+            "lanes": {lane: len(positions) for lane, positions in self.lanes.items()},
+            "lane_workers": dict(Counter(self.worker_lanes)),
+            "projected_seconds": round(self.project(), 1),
+            "projected_plan_order_seconds": round(self.project(plan_order=True), 1)
+        }
+        if actual is not None:
+            report["actual_seconds"] = round(actual, 1)
+            report["replayed_seconds"] = round(self.simulate(seconds), 1)
+            report["replayed_plan_order_seconds"] = round(self.simulate(seconds, plan_order=True), 1)
+        return report
+
 # ============================================================================
 # MAIN MIGRATION CLASS
 # ============================================================================
@@ -331,20 +2621,38 @@ class STRMigration:
     def __init__(self, test_mode: bool = False, logger: logging.Logger = None):
         self.test_mode = test_mode
         self.logger = logger or setup_logging(test_mode)
-        self.progress = ProgressTracker()
-        self.backup_mgr = BackupManager()
+        # Paths come from Config at construction, so --shard can move them first
+        self.progress = ProgressTracker(self._progress_file(test_mode))
+        self.backup_mgr = BackupManager(Config.BACKUP_DIR)
+        self.dedup = DedupCache(Config.DEDUP_CACHE_FILE)
+        self.list_mirror = ListMirror(Config.LIST_MIRROR_FILE)
         self.credential = None
+        self.token_provider = None
         self.api_client = None
+        self.onedrive_index = None  # set by resolve_onedrive_items
+
+    @staticmethod
+    def _progress_file(test_mode: bool) -> Path:
+        """Test runs never update the list, so their files must not count as done for production"""
+        return Config.TEST_PROGRESS_FILE if test_mode else Config.PROGRESS_FILE
 
     def initialize(self):
         """Initialize Azure credentials and API client"""
         self.logger.info("Initializing authentication...")
 
         try:
-            self.credential = InteractiveBrowserCredential(client_id=Config.CLIENT_ID)
-            token = self.credential.get_token("https://graph.microsoft.com/.default").token
-            headers = {"Authorization": f"Bearer {token}"}
-            self.api_client = GraphAPIClient(headers, self.logger)
+            self.credential = create_credential(self.logger)
+            self.token_provider = TokenProvider(
+                self.credential, self.logger,
+                background_credential=create_credential(self.logger, silent=True)
+            )
+            self.api_client = GraphAPIClient(
+                self.token_provider.headers, self.logger,
+                pool_size=max(Config.HTTP_POOL_SIZE, Config.MAX_WORKERS),
+                token_provider=self.token_provider
+            )
+            self.backup_mgr.api_client = self.api_client
+            self.token_provider.start()
 
             self.logger.info("✓ Authentication successful")
             return True
@@ -353,92 +2661,1153 @@ class STRMigration:
             self.logger.error(f"✗ Authentication failed: {e}")
             return False
 
-    def load_migration_plan(self, csv_path: Path) -> List[Dict]:
-        """Load and parse migration plan from CSV"""
-        self.logger.info(f"Loading migration plan from {csv_path}")
+    # Columns the plan needs, and the patterns used on them
+    PLAN_COLUMNS = {
+        'arch': 'Architecture Diagram/Picture',
+        'product': 'Product Name',
+        'status': 'STR Approved',
+        'csv_row': 'ID'
+    }
+    PRIORITY_FIELDS = ('status', 'product', 'csv_row')   # PLAN_COLUMNS copied verbatim into entries
+    SOURCE_OWNER_PATTERN = re.compile(r'joseph_brashear', re.IGNORECASE)
+    SOURCE_ID_PATTERN = re.compile(r'/([A-Za-z0-9_-]+)$')
+
+    def _iter_plan_columns(self, csv_path: Path) -> Iterator[Dict[str, str]]:
+        """Yield the PLAN_COLUMNS of every CSV row, keyed like PLAN_COLUMNS.
+
+        Reads the columnar cache from str_review_log_cache.py when one was
+        built from this exact CSV. Otherwise column positions are resolved
+        once from the header and only those columns are looked at per row.
+        """
+        cached = self._open_review_log_cache(csv_path)
+        if cached:
+            yield from self._iter_cached_plan_columns(cached)
+            return
+
+        with open(csv_path, 'r', encoding='utf-8-sig', newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+
+            index = {key: header.index(name) if name in header else None
+                     for key, name in self.PLAN_COLUMNS.items()}
+            if index['arch'] is None:
+                raise ValueError(f"Column not found: {self.PLAN_COLUMNS['arch']}")
+
+            present = [(key, i) for key, i in index.items() if i is not None]
+            missing = {key: '' for key, i in index.items() if i is None}
+            width = max(i for _, i in present) + 1
+
+            for row in reader:
+                if len(row) < width:
+                    row = row + [''] * (width - len(row))
+
+                values = {key: row[i] for key, i in present}
+                values.update(missing)
+                yield values
+
+    def _open_review_log_cache(self, csv_path: Path):
+        """The review log's columnar cache, if present, current and holding the plan columns as text"""
+        try:
+            from str_review_log_cache import ReviewLog
+        except ImportError:
+            return None
+
+        cached = ReviewLog.open_current(csv_path)
+        if not cached or any(cached.specs.get(name, {}).get("kind") == "date"
+                             for name in self.PLAN_COLUMNS.values()):
+            return None
+
+        self.logger.info(f"✓ Reading plan columns from {cached.cache_dir}")
+        return cached
+
+    def _iter_cached_plan_columns(self, cached) -> Iterator[Dict[str, str]]:
+        if self.PLAN_COLUMNS['arch'] not in cached.specs:
+            raise ValueError(f"Column not found: {self.PLAN_COLUMNS['arch']}")
+
+        columns = {key: cached.column(name) for key, name in self.PLAN_COLUMNS.items() if name in cached.specs}
+        missing = {key: '' for key in self.PLAN_COLUMNS if key not in columns}
+
+        for row in range(cached.rows):
+            values = {key: column.value(row) for key, column in columns.items()}
+            values.update(missing)
+            yield values
+
+    def iter_migration_plan(self, csv_path: Path) -> Iterator[Dict]:
+        """Yield migration entries from the CSV as it is read"""
+        for row in self._iter_plan_columns(csv_path):
+            arch_value = row['arch'].strip()
+
+            # Extract file ID from SharePoint URL
+            if not arch_value or not self.SOURCE_OWNER_PATTERN.search(arch_value):
+                continue
+
+            match = self.SOURCE_ID_PATTERN.search(arch_value)
+            if not match:
+                continue
+
+            sharepoint_id = match.group(1)
+            yield {
+                'product': row['product'],
+                'sharepoint_id': sharepoint_id,
+                'old_url': arch_value,
+                'status': row['status'],
+                'csv_row': row['csv_row'],
+                'onedrive_item_id': None  # filled in by resolve_onedrive_items
+            }
 
-        migration_files = []
+    @staticmethod
+    def _row_fingerprint(arch_value: str) -> str:
+        """Fingerprint of the part of a row the plan depends on"""
+        return hashlib.blake2b(arch_value.strip().encode(), digest_size=8).hexdigest()
+
+    def export_fingerprints(self, csv_path: Path) -> Dict[str, str]:
+        """Map each ID in a review-log export to its row fingerprint"""
+        return {
+            row['csv_row']: self._row_fingerprint(row['arch'])
+            for row in self._iter_plan_columns(csv_path)
+            if row['csv_row']
+        }
+
+    def diff_migration_plan(self, migration_files: List[Dict], previous_csv: Path) -> List[Dict]:
+        """Keep only entries added or changed since an earlier export.
+
+        Rows are matched by ID; a row counts as changed when the
+        fingerprint of its Architecture Diagram/Picture value differs.
+        """
+        previous = self.export_fingerprints(previous_csv)
+        added = changed = 0
+        selected = []
+
+        for file_info in migration_files:
+            fingerprint = previous.get(file_info['csv_row'])
+            if fingerprint is None:
+                added += 1
+            elif fingerprint != self._row_fingerprint(file_info['old_url']):
+                changed += 1
+            else:
+                continue
+            selected.append(file_info)
+
+        self.logger.info(
+            f"✓ Diff against {previous_csv}: {added} added, {changed} changed, "
+            f"{len(migration_files) - len(selected)} unchanged"
+        )
+        return selected
+
+    def shutdown(self):
+        """Stop background threads (token refresh, metrics, audit writer) and release connections"""
+        if self.token_provider:
+            self.token_provider.stop()
+        if self.api_client:
+            self.api_client.close()
+        metrics.stop()
+        close_audit_log()
+
+    def load_migration_plan(self, csv_path: Path, cache_path: Path = None,
+                            mapping_path: Path = None, previous_csv: Path = None) -> List[Dict]:
+        """Load and parse migration plan from CSV, via the plan cache if given.
+
+        With a document mapping (from str_document_matching.py), products
+        that have no diagram link in the log but an exact document match
+        are added too. With a previous export, only rows added or changed
+        since it are then kept.
+        """
+        self.logger.info(f"Loading migration plan from {csv_path}")
 
         try:
-            with open(csv_path, 'r', encoding='utf-8-sig') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    arch_value = row.get('Architecture Diagram/Picture', '').strip()
-
-                    # Extract file ID from SharePoint URL
-                    if arch_value and 'joseph_brashear' in arch_value.lower():
-                        match = re.search(r'/([A-Za-z0-9_-]+)$', arch_value)
-                        if match:
-                            sharepoint_id = match.group(1)
-
-                            migration_files.append({
-                                'product': row.get('Product Name', ''),
-                                'sharepoint_id': sharepoint_id,
-                                'old_url': arch_value,
-                                'status': row.get('STR Approved', ''),
-                                'csv_row': row.get('ID', ''),
-                                'onedrive_item_id': sharepoint_id  # Placeholder - will be mapped
-                            })
-
-            self.logger.info(f"✓ Loaded {len(migration_files)} files for migration")
+            migration_files = None
+            if cache_path:
+                migration_files = self._read_plan_cache(csv_path, cache_path)
+                if migration_files is not None:
+                    self.logger.info(f"✓ Loaded {len(migration_files)} files from plan cache {cache_path}")
+
+            if migration_files is None:
+                migration_files = list(self.iter_migration_plan(csv_path))
+
+                if cache_path:
+                    self._write_plan_cache(csv_path, cache_path, migration_files)
+
+                self.logger.info(f"✓ Loaded {len(migration_files)} files for migration")
+
+            # Mapped documents only fill rows the full plan leaves without a link,
+            # so they are added before the diff narrows the plan down
+            if mapping_path:
+                added = self._add_mapped_documents(migration_files, mapping_path, csv_path)
+                self.logger.info(f"✓ Added {added} matched documents from {mapping_path}")
+
+            if previous_csv:
+                migration_files = self.diff_migration_plan(migration_files, previous_csv)
+
             return migration_files
 
         except Exception as e:
             self.logger.error(f"✗ Failed to load migration plan: {e}")
             return []
 
-    def test_single_file(self, file_info: Dict) -> bool:
-        """Test migration with single file"""
+    @staticmethod
+    def _mapping_key(name: str) -> str:
+        return (name or '').replace('\u200b', '').strip().casefold()
+
+    def _add_mapped_documents(self, migration_files: List[Dict], mapping_path: Path,
+                              csv_path: Path) -> int:
+        """Append exact document matches for list items the log plan does not cover.
+
+        Matches carry the list item ID; mappings written before it was
+        recorded are placed through their CSV row number (checked against
+        the product name), else the product's first row in the log.
+        """
+        with open(mapping_path, 'r') as f:
+            mapping = json.load(f)
+
+        covered = {file_info['csv_row'] for file_info in migration_files}
+        added = skipped = 0
+
+        rows = None   # read from the CSV only if some match lacks an ID
+        by_name = {}
+
+        for match in mapping.get("exact_matches", []):
+            info = match["product_info"]
+            row_id = info.get("id")
+
+            if not row_id:
+                if rows is None:
+                    rows = list(self._iter_plan_columns(csv_path))
+                    for row in rows:
+                        by_name.setdefault(self._mapping_key(row['product']), row['csv_row'])
+
+                # "row" counts CSV records from 2 (the header is row 1)
+                number = info.get("row")
+                if isinstance(number, int) and 0 <= number - 2 < len(rows) \
+                        and self._mapping_key(rows[number - 2]['product']) == self._mapping_key(match["product"]):
+                    row_id = rows[number - 2]['csv_row']
+                else:
+                    row_id = by_name.get(self._mapping_key(match["product"]))
+
+            if not row_id:
+                skipped += 1
+                self.logger.warning(f"  Mapping match for '{match['product']}' has no list item in {csv_path}; skipped")
+                continue
+            if row_id in covered or not match["files"]:
+                continue
+
+            # One document per list item; it becomes the item's diagram link
+            file_name = match["files"][0][1]
+            covered.add(row_id)
+            migration_files.append({
+                'product': match["product"],
+                'sharepoint_id': file_name,
+                'old_url': '',
+                'status': info.get("status", ''),
+                'csv_row': row_id,
+                'document': file_name,
+                'onedrive_item_id': None  # filled in by resolve_onedrive_items
+            })
+            added += 1
+
+        if skipped:
+            self.logger.warning(f"{skipped} mapping matches could not be placed on a list item")
+
+        return added
+
+    @staticmethod
+    def _file_sha256(path: Path) -> str:
+        """Hash a file in fixed-size blocks"""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _read_plan_cache(self, csv_path: Path, cache_path: Path) -> Optional[List[Dict]]:
+        """Return the cached plan if it was parsed from this exact CSV"""
+        if not cache_path.exists():
+            return None
+
+        try:
+            with open(cache_path, 'r') as f:
+                cache = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+        stat = csv_path.stat()
+        if cache.get("size") != stat.st_size:
+            return None
+
+        # Unchanged mtime is trusted; otherwise fall back to comparing content
+        if cache.get("mtime_ns") != stat.st_mtime_ns:
+            if cache.get("sha256") != self._file_sha256(csv_path):
+                return None
+            self._write_plan_cache(csv_path, cache_path, cache["files"], cache["sha256"])
+
+        return cache["files"]
+
+    def _write_plan_cache(self, csv_path: Path, cache_path: Path,
+                          migration_files: List[Dict], sha256: str = None):
+        """Atomically store a parsed plan keyed on the CSV's size, mtime and hash"""
+        stat = csv_path.stat()
+        cache = {
+            "source": str(csv_path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": sha256 or self._file_sha256(csv_path),
+            "files": migration_files
+        }
+
+        # Per-process temp name: shards may share one plan cache
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, cache_path)
+
+    def resolve_onedrive_items(self, migration_files: List[Dict]) -> int:
+        """Map plan entries to real OneDrive item ids; returns the unresolved count"""
+        self.logger.info("Resolving OneDrive items...")
+
+        index = OneDriveIndex(Config.ONEDRIVE_INDEX_FILE)
+        changed = index.refresh(self.api_client, self.logger)
+        unresolved = index.resolve_plan(migration_files, self.api_client)
+        self.onedrive_index = index
+
+        self.logger.info(
+            f"✓ OneDrive index: {len(index.items)} files ({changed} changed), "
+            f"{len(migration_files) - unresolved}/{len(migration_files)} plan entries resolved"
+        )
+        if unresolved:
+            self.logger.warning(f"{unresolved} plan entries could not be matched to a OneDrive item")
+
+        return unresolved
+
+    def plan_migration(self, migration_files: List[Dict], mode: str = "all", workers: int = None,
+                       latency: float = Config.PLAN_REQUEST_LATENCY,
+                       bandwidth: float = Config.PLAN_BANDWIDTH,
+                       throttle_rate: float = Config.PLAN_THROTTLE_RATE,
+                       retry_after: float = Config.PLAN_RETRY_AFTER) -> Dict:
+        """Check the plan against item metadata and project the run, without transferring anything.
+
+        Uses the OneDrive index from resolve_onedrive_items for existence
+        and sizes, and one listing of the SharePoint drive root for name
+        collisions. Request counts follow the pipeline step by step,
+        counting steps that recorded progress or the dedup cache let a
+        real run skip.
+        """
+        workers = max(1, workers or Config.MAX_WORKERS)
+        index = self.onedrive_index or OneDriveIndex(Config.ONEDRIVE_INDEX_FILE)
+        client = self.api_client
+
+        selected = self._select_files(migration_files, mode)
+        existing = {name.casefold() for name in client.list_drive_root_names()}
+
+        missing = []
+        files = []       # (file_info, size, target name, requests before the link step, needs link, transfers)
+        seen_sources = set()
+        transfer_bytes = 0
+        sessions = 0
+        reused = 0
+
+        for file_info in selected:
+            source_id = file_info.get('onedrive_item_id')
+            item = index.get(source_id) if source_id else None
+            if not item:
+                missing.append(file_info['product'])
+                continue
+
+            size = item.get('size') or 0
+            target = client._sanitize_filename(self._target_filename(file_info))
+            entry = self.progress.get_file(file_info['sharepoint_id'])
+            details = entry.get("details", {}) if entry else {}
+
+            requests_before = 0
+            needs_link = True
+            transfers = False
+
+            if details.get("sharepoint_id"):
+                requests_before += 0 if details.get("share_url") else 1   # get_drive_item
+                needs_link = not details.get("share_url")
+            else:
+                if entry and entry["status"] == "processing":
+                    requests_before += 1                                   # get_drive_item_by_name
+
+                cached = Config.DEDUP_ENABLED and (
+                    source_id in seen_sources or self.dedup.lookup_source(source_id, count=False)
+                )
+                if cached:
+                    reused += 1
+                    needs_link = not (isinstance(cached, tuple) and cached[1].get("share_url"))
+                else:
+                    transfers = True
+
+            if transfers:
+                seen_sources.add(source_id)
+                transfer_bytes += 2 * size
+                requests_before += 2                                       # download + upload
+                if size > client.SIMPLE_UPLOAD_LIMIT:
+                    sessions += 1
+                    requests_before += math.ceil(size / client.UPLOAD_CHUNK_SIZE)  # session + further ranges
+
+            files.append((file_info, size, target, requests_before, needs_link, transfers))
+
+        # Distinct sources landing on the same SharePoint name overwrite each other
+        by_name = defaultdict(set)
+        products_by_name = defaultdict(list)
+        for file_info, _, target, *_ in files:
+            by_name[target.casefold()].add(file_info['onedrive_item_id'])
+            products_by_name[target.casefold()].append(file_info['product'])
+        collisions = {name: products_by_name[name] for name, sources in by_name.items() if len(sources) > 1}
+        already_there = sorted({target for _, _, target, *_ in files if target.casefold() in existing})
+
+        links = sum(1 for *_, needs_link, _ in files if needs_link)
+        transfer_requests = sum(requests_before for _, _, _, requests_before, *_ in files)
+        unbatched = transfer_requests + links + 2 * len(files)              # link, backup, update
+        batched = (transfer_requests + math.ceil(links / client.BATCH_LIMIT)
+                   + 2 * math.ceil(len(files) / client.BATCH_LIMIT))
+
+        def project(request_count: int) -> float:
+            """Seconds for the run: request- or transfer-bound, plus throttle stalls"""
+            sent = request_count / (1 - throttle_rate) if throttle_rate < 1 else float('inf')
+            request_time = sent / min(Config.RATE_LIMIT_MAX, workers / latency)
+            transfer_time = transfer_bytes / bandwidth
+            stalls = request_count * throttle_rate * retry_after / workers
+            longest = max(
+                (n + needs_link + 2) * latency + (2 * size / bandwidth if transfers else 0.0)
+                for _, size, _, n, needs_link, transfers in files
+            ) if files else 0.0
+            return max(request_time, transfer_time, longest) + stalls
+
+        report = {
+            "planned": len(migration_files),
+            "selected": len(selected),
+            "skipped": len(migration_files) - len(selected),
+            "missing": missing,
+            "files": len(files),
+            "transfers": sum(1 for *_, transfers in files if transfers),
+            "reused_uploads": reused,
+            "source_bytes": sum(size for _, size, *_ in files),
+            "transfer_bytes": transfer_bytes,
+            "upload_sessions": sessions,
+            "name_collisions": collisions,
+            "already_in_sharepoint": already_there,
+            "requests": {"unbatched": unbatched, "batched": batched},
+            "projected_seconds": {"unbatched": round(project(unbatched), 1),
+                                  "batched": round(project(batched), 1)},
+            "assumptions": {
+                "workers": workers,
+                "rate_limit": Config.RATE_LIMIT_MAX,
+                "request_latency": latency,
+                "bandwidth": bandwidth,
+                "throttle_rate": throttle_rate,
+                "retry_after": retry_after
+            }
+        }
+
+        with open(Config.PLAN_REPORT_FILE, 'w') as f:
+            json.dump(report, f, indent=2)
+
+        self._log_plan_report(report)
+        return report
+
+    @staticmethod
+    def _format_duration(seconds: float) -> str:
+        minutes, secs = divmod(int(round(seconds)), 60)
+        hours, minutes = divmod(minutes, 60)
+        return f"{hours}h {minutes:02d}m {secs:02d}s" if hours else f"{minutes}m {secs:02d}s"
+
+    def _log_plan_report(self, report: Dict):
+        """Log the dry-run plan summary"""
+        assumptions = report["assumptions"]
+
         self.logger.info(f"\n{'='*80}")
-        self.logger.info(f"TEST: {file_info['product']}")
+        self.logger.info("MIGRATION PLAN (metadata only, nothing transferred)")
         self.logger.info(f"{'='*80}")
+        self.logger.info(f"Plan entries: {report['planned']} ({report['skipped']} already handled)")
+        self.logger.info(f"To migrate: {report['files']} "
+                         f"({report['transfers']} transfers, {report['reused_uploads']} reused uploads)")
+        self.logger.info(f"Missing in OneDrive: {len(report['missing'])}")
+        self.logger.info(f"Source size: {report['source_bytes'] / 1e6:.1f} MB "
+                         f"({report['transfer_bytes'] / 1e6:.1f} MB moved, "
+                         f"{report['upload_sessions']} upload sessions)")
+        self.logger.info(f"Name collisions after sanitizing: {len(report['name_collisions'])}")
+        self.logger.info(f"Target names already in SharePoint: {len(report['already_in_sharepoint'])}")
+        self.logger.info(f"Requests: {report['requests']['unbatched']} "
+                         f"({report['requests']['batched']} with --batch --batch-links)")
+        self.logger.info(
+            f"Projected time with {assumptions['workers']} workers, {assumptions['request_latency']}s/request, "
+            f"{assumptions['bandwidth'] / (1024 * 1024):.0f} MB/s, {assumptions['throttle_rate']:.0%} throttled: "
+            f"{self._format_duration(report['projected_seconds']['unbatched'])} "
+            f"({self._format_duration(report['projected_seconds']['batched'])} batched)"
+        )
+
+        for product in report["missing"][:10]:
+            self.logger.warning(f"  Missing: {product}")
+        for name, products in list(report["name_collisions"].items())[:10]:
+            self.logger.warning(f"  Collision on '{name}': {', '.join(products)}")
+        self.logger.info(f"✓ Full report: {Config.PLAN_REPORT_FILE}")
+
+    def verify_migration(self, migration_files: List[Dict], workers: int = None) -> Dict:
+        """Check migrated files against their sources by hash, downloading nothing.
+
+        The expected quickXorHash is the one computed while the file was
+        transferred (kept in progress), else the one OneDrive reports for the
+        source. SharePoint's hashes come from $batch metadata requests, several
+        envelopes in flight at once. Uploads that mismatch or have gone are
+        marked failed with their checkpoints cleared, so --retry-failed
+        migrates them again.
+        """
+        workers = max(1, workers or Config.MAX_WORKERS)
+        index = self.onedrive_index or OneDriveIndex(Config.ONEDRIVE_INDEX_FILE)
+        client = self.api_client
+
+        migrated = []
+        for file_info in migration_files:
+            entry = self.progress.get_file(file_info['sharepoint_id'])
+            if entry and entry["status"] == "completed" and entry.get("details", {}).get("sharepoint_id"):
+                migrated.append((file_info, entry["details"]))
+
+        self.logger.info(f"Verifying {len(migrated)} migrated files...")
+
+        item_ids = sorted({details["sharepoint_id"] for _, details in migrated})
+        envelopes = [item_ids[i:i + client.BATCH_LIMIT] for i in range(0, len(item_ids), client.BATCH_LIMIT)]
+        targets = {}
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for items in pool.map(client.get_drive_items_batched, envelopes):
+                targets.update(items)
+
+        counts = {"verified": 0, "mismatched": 0, "missing": 0, "unverified": 0}
+        problems = []
+
+        for file_info, details in migrated:
+            item_id = details["sharepoint_id"]
+            source = index.get(file_info.get('onedrive_item_id')) or {}
+            expected = details.get("quick_xor_hash") or source.get("quickXorHash")
+            target = targets.get(item_id)
+            actual = quick_xor_hash(target)
+
+            if item_id in targets and target is None:
+                result = "missing"
+            elif expected and actual:
+                result = "verified" if expected == actual else "mismatched"
+            elif target and source.get("size") is not None and target.get("size") != source["size"]:
+                result = "mismatched"
+            else:
+                result = "unverified"   # no hash on one side, or the lookup failed
+
+            counts[result] += 1
+            if result not in ("mismatched", "missing"):
+                continue
+
+            problems.append({
+                "product": file_info['product'],
+                "file_id": file_info['sharepoint_id'],
+                "sharepoint_item": item_id,
+                "result": result,
+                "expected": expected,
+                "actual": actual
+            })
+            self.logger.warning(f"  ✗ {file_info['product']}: upload {result}")
+
+            self.progress.mark_file(file_info['sharepoint_id'], "failed", {"error": f"Verification: upload {result}"})
+            self.dedup.discard(item_id)
+            audit_log("file_verification_failed", {
+                "product": file_info['product'],
+                "sharepoint_item": item_id,
+                "result": result
+            }, status="error")
+
+        report = {
+            "timestamp": datetime.utcnow().isoformat(),
+            "checked": len(migrated),
+            **counts,
+            "problems": problems
+        }
+        with open(Config.VERIFY_REPORT_FILE, 'w') as f:
+            json.dump(report, f, indent=2)
+
+        self.logger.info(f"\n{'='*80}")
+        self.logger.info("VERIFICATION COMPLETE")
+        self.logger.info(f"{'='*80}")
+        self.logger.info(f"Checked: {len(migrated)}")
+        self.logger.info(f"Verified: {counts['verified']}")
+        self.logger.info(f"Mismatched: {counts['mismatched']}")
+        self.logger.info(f"Missing in SharePoint: {counts['missing']}")
+        self.logger.info(f"Unverified (no hash available): {counts['unverified']}")
+        if problems:
+            self.logger.info(f"→ Re-migrate the {len(problems)} problem files with --retry-failed")
+        self.logger.info(f"✓ Full report: {Config.VERIFY_REPORT_FILE}")
+
+        return report
+
+    def _migrate_file(self, idx: int, total: int, file_info: Dict) -> Union[None, str, Dict]:
+        """Run the download → upload → link → update pipeline for one file.
+
+        Returns None on success, or the error message on failure. Safe to
+        call from worker threads; the four steps always run in order. When
+        list updates are batched, the file stops before the list step (or
+        before the link step, if links are batched too) and a staged entry
+        is returned for _flush_list_updates instead.
+        """
+        with metrics.span(file_info['sharepoint_id'], file_info['product']) as span:
+            outcome = self._run_pipeline(f"[{idx}/{total}]", file_info)
+
+            if isinstance(outcome, dict):
+                span.status = "staged"
+            else:
+                span.status = "failed" if outcome else "completed"
+
+        return outcome
+
+    def _run_pipeline(self, tag: str, file_info: Dict) -> Union[None, str, Dict]:
+        """The steps of _migrate_file, inside the file's trace span"""
+        self.logger.info(f"\n{tag} Processing: {file_info['product']}")
+
+        staged = {
+            "tag": tag,
+            "file_info": file_info,
+            "item_id": None,
+            "share_url": None,
+            "content_hash": None,
+            "quick_xor_hash": None
+        }
 
         try:
-            # Step 1: Download
-            self.logger.info("1. Downloading from OneDrive...")
-            file_content = self.api_client.download_onedrive_file(
-                file_info['sharepoint_id']
-            )
+            # Pick up whatever an interrupted earlier attempt already finished
+            with metrics.timer("reconcile"):
+                checkpoint = self._reconcile(tag, file_info)
+            staged["item_id"] = checkpoint.get("sharepoint_id")
+            staged["share_url"] = checkpoint.get("share_url")
+            staged["quick_xor_hash"] = checkpoint.get("quick_xor_hash")
 
-            if not file_content:
-                self.logger.error("✗ Download failed")
-                return False
+            self.progress.mark_file(file_info['sharepoint_id'], "processing", checkpoint)
 
-            self.logger.info(f"✓ Downloaded {len(file_content)} bytes")
+            if not staged["item_id"]:
+                # Steps 1-2: Download from OneDrive and upload to SharePoint
+                self._transfer(staged)
+                self._checkpoint(staged)
 
-            # Step 2: Upload (TEST MODE)
-            filename = f"TEST_{file_info['product'][:50]}.bin"
-            self.logger.info(f"2. [TEST MODE] Would upload as: {filename}")
+            if Config.BATCH_LIST_UPDATES and Config.BATCH_CREATE_LINK and not staged["share_url"]:
+                return staged
 
-            if not self.test_mode:
-                uploaded = self.api_client.upload_to_sharepoint(filename, file_content)
-                if not uploaded:
-                    self.logger.error("✗ Upload failed")
-                    return False
-                self.logger.info(f"✓ Uploaded: {uploaded.get('id')}")
+            if not staged["share_url"]:
+                # Step 3: Create sharing link
+                self.logger.info(f"  {tag} → Creating sharing link...")
+                with metrics.timer("link"):
+                    share_url = self.api_client.create_sharing_link(staged["item_id"])
 
-            # Step 3: Create link (TEST MODE)
-            self.logger.info(f"3. [TEST MODE] Would create sharing link")
+                if not share_url:
+                    raise Exception("Failed to create sharing link")
 
-            # Step 4: Update list (TEST MODE)
-            self.logger.info(f"4. [TEST MODE] Would update list item {file_info['csv_row']}")
+                staged["share_url"] = share_url
+                self._checkpoint(staged)
+                self._remember_link(staged)
+
+            if Config.BATCH_LIST_UPDATES:
+                return staged
+
+            mirrored = self.list_mirror.get(file_info['csv_row'])
+            if self._list_up_to_date(mirrored, staged["share_url"]):
+                self.logger.info(f"  {tag} ↺ List item already holds the new link; skipping update")
+                return self._complete_file(staged)
+
+            # Step 4: Back up, then update list
+            self.logger.info(f"  {tag} → Backing up list item...")
+            with metrics.timer("backup"):
+                if mirrored:
+                    backup = self.backup_mgr.save_item_backup(
+                        file_info['csv_row'], mirrored,
+                        product=file_info['product'],
+                        file_id=file_info['sharepoint_id']
+                    )
+                else:
+                    backup = self.backup_mgr.backup_sharepoint_item(
+                        file_info['csv_row'],
+                        self.api_client.headers,
+                        product=file_info['product'],
+                        file_id=file_info['sharepoint_id']
+                    )
+
+            if not backup:
+                raise Exception("Failed to back up list item")
+
+            self.logger.info(f"  {tag} → Updating SharePoint list...")
+            with metrics.timer("update"):
+                updated = self.api_client.update_list_item(
+                    file_info['csv_row'],
+                    staged["share_url"],
+                    test_mode=self.test_mode
+                )
 
-            self.logger.info("✓ Test completed successfully")
-            return True
+            if not updated:
+                raise Exception("Failed to update list item")
+
+            self._mirror_update(file_info['csv_row'], staged["share_url"])
+            return self._complete_file(staged)
 
         except Exception as e:
-            self.logger.error(f"✗ Test failed: {e}")
+            return self._fail_file(tag, file_info, str(e), staged)
+
+    @staticmethod
+    def _list_up_to_date(mirrored: Optional[Dict], share_url: str) -> bool:
+        """Whether a mirrored list item already points at the new link"""
+        if mirrored and mirrored["fields"].get("Architecture_Diagram_Picture") == share_url:
+            metrics.inc("list_updates_skipped")
+            return True
+        return False
+
+    def _mirror_update(self, item_id: str, share_url: str):
+        """Keep the list mirror in step with an update this run made"""
+        if not self.test_mode:
+            self.list_mirror.set_field(item_id, "Architecture_Diagram_Picture", share_url)
+
+    @staticmethod
+    def _target_filename(file_info: Dict) -> str:
+        """Name the file is uploaded under in SharePoint.
+
+        Product names repeat across rows, so the row ID (or, without one, a
+        digest of the source link) keeps entries from overwriting each other.
+        """
+        suffix = file_info.get('csv_row') or hashlib.blake2b(
+            file_info['sharepoint_id'].encode(), digest_size=4
+        ).hexdigest()
+        return f"{file_info['product'][:50]} ({suffix}).bin"
+
+    def _transfer(self, staged: Dict):
+        """Get the file into SharePoint, reusing an earlier upload of identical content.
+
+        Fills in staged["item_id"] (and "share_url" when the cached copy was
+        already linked). Raises on failure.
+        """
+        tag = staged["tag"]
+        file_info = staged["file_info"]
+        source_id = file_info.get('onedrive_item_id')
+        filename = self._target_filename(file_info)
+
+        if not source_id:
+            raise Exception("No OneDrive item found for this entry")
+
+        if not Config.DEDUP_ENABLED:
+            self.logger.info(f"  {tag} → Streaming from OneDrive to SharePoint...")
+            hasher = QuickXorHash()
+            with metrics.timer("transfer"):
+                uploaded = self.api_client.stream_to_sharepoint(source_id, filename, hasher)
+
+            if not uploaded:
+                raise Exception("Failed to transfer file from OneDrive to SharePoint")
+
+            staged["quick_xor_hash"] = hasher.base64digest()
+            self._check_upload(uploaded, staged["quick_xor_hash"])
+            staged["item_id"] = uploaded.get('id')
+            # Not hashed for the cache, so whatever it had for this item is stale now
+            self.dedup.discard(staged["item_id"])
+            return
+
+        # Same OneDrive item as an earlier file: no download needed
+        cached = self.dedup.lookup_source(source_id)
+        if cached:
+            staged["content_hash"], entry = cached
+            staged["item_id"] = entry["item_id"]
+            staged["share_url"] = entry.get("share_url")
+            staged["quick_xor_hash"] = entry.get("quick_xor_hash")
+            self.logger.info(f"  {tag} ↺ Source already migrated; reusing upload")
+            return
+
+        self.logger.info(f"  {tag} → Downloading from OneDrive...")
+        with metrics.timer("download"):
+            downloaded = self.api_client.download_to_spool(source_id)
+
+        if not downloaded:
+            raise Exception("Failed to download file from OneDrive")
+
+        spool, content_hash, size, staged["quick_xor_hash"] = downloaded
+        staged["content_hash"] = content_hash
+
+        # Workers holding the same content queue here so only one uploads it
+        with spool, self.dedup.key_lock(content_hash):
+            entry = self.dedup.lookup(content_hash)
+            if entry:
+                staged["item_id"] = entry["item_id"]
+                staged["share_url"] = entry.get("share_url")
+                self.dedup.record(content_hash, source_id=source_id)
+                self.logger.info(f"  {tag} ↺ Identical content already migrated; reusing upload")
+                return
+
+            self.logger.info(f"  {tag} → Uploading to SharePoint...")
+            with metrics.timer("upload"):
+                uploaded = self.api_client.upload_from_file(filename, spool, size)
+
+            if not uploaded:
+                raise Exception("Failed to upload to SharePoint")
+
+            self._check_upload(uploaded, staged["quick_xor_hash"])
+            staged["item_id"] = uploaded.get('id')
+            self.dedup.record(content_hash, source_id=source_id, item_id=staged["item_id"],
+                              quick_xor_hash=staged["quick_xor_hash"])
+
+    @staticmethod
+    def _check_upload(uploaded: Dict, expected: str):
+        """Compare the hash SharePoint reports for an upload with the source's.
+
+        Raises on a mismatch. Uploads the service reports no hash for yet
+        are left to --verify.
+        """
+        actual = quick_xor_hash(uploaded)
+        if not actual:
+            return
+
+        if actual != expected:
+            metrics.inc("integrity_mismatches")
+            raise Exception(f"Uploaded content does not match the source "
+                            f"(quickXorHash {actual}, expected {expected})")
+
+        metrics.inc("integrity_verified")
+
+    def _remember_link(self, staged: Dict):
+        """Cache a new share link against the file's content"""
+        if staged["content_hash"]:
+            self.dedup.record(staged["content_hash"], share_url=staged["share_url"])
+
+    def _checkpoint(self, staged: Dict):
+        """Record how far a file got, so a restart can skip finished steps"""
+        details = {"sharepoint_id": staged["item_id"]}
+        if staged["share_url"]:
+            details["share_url"] = staged["share_url"]
+        if staged["quick_xor_hash"]:
+            details["quick_xor_hash"] = staged["quick_xor_hash"]
+
+        self.progress.mark_file(staged["file_info"]['sharepoint_id'], "processing", details)
+
+    def _reconcile(self, tag: str, file_info: Dict) -> Dict:
+        """Work out which steps of an interrupted or failed attempt still hold.
+
+        Returns checkpoint details ({"sharepoint_id", "share_url"}) for the
+        steps that can be skipped; empty if the file must start over.
+        """
+        entry = self.progress.get_file(file_info['sharepoint_id'])
+        if not entry or entry["status"] == "completed":
+            return {}
+
+        details = entry.get("details", {})
+
+        # Link creation is the last step before the (idempotent) list PATCH
+        if details.get("sharepoint_id") and details.get("share_url"):
+            self.logger.info(f"  {tag} ↺ Reusing upload and link from previous attempt")
+            return {
+                "sharepoint_id": details["sharepoint_id"],
+                "share_url": details["share_url"],
+                "quick_xor_hash": details.get("quick_xor_hash")
+            }
+
+        # Otherwise check whether the upload landed before the interruption.
+        # Without a recorded item id, look under the entry's own (unique)
+        # target name, and only adopt a file that holds the source's content
+        if details.get("sharepoint_id"):
+            uploaded = self.api_client.get_drive_item(details["sharepoint_id"])
+        elif entry["status"] == "processing":
+            uploaded = self.api_client.get_drive_item_by_name(self._target_filename(file_info))
+            if uploaded and not self._matches_source(uploaded, file_info):
+                self.logger.info(f"  {tag} → File under the target name differs from the source; uploading again")
+                uploaded = None
+        else:
+            uploaded = None
+
+        if uploaded:
+            self.logger.info(f"  {tag} ↺ Reusing upload from previous attempt")
+            return {"sharepoint_id": uploaded['id'],
+                    "quick_xor_hash": details.get("quick_xor_hash") or quick_xor_hash(uploaded)}
+
+        return {}
+
+    def _matches_source(self, uploaded: Dict, file_info: Dict) -> bool:
+        """Whether an uploaded item holds the entry's source, by quickXorHash, else size.
+
+        Needs the source's metadata from the OneDrive index; without it
+        there is nothing to compare and the upload is not trusted.
+        """
+        source_id = file_info.get('onedrive_item_id')
+        source = self.onedrive_index.get(source_id) if self.onedrive_index and source_id else None
+        if not source:
             return False
 
-    def run_migration(self, migration_files: List[Dict], test_mode: bool = None):
-        """Execute migration"""
-        if test_mode is not None:
+        expected, actual = source.get("quickXorHash"), quick_xor_hash(uploaded)
+        if expected and actual:
+            return expected == actual
+        return source.get('size') is not None and source.get('size') == uploaded.get('size')
+
+    def _complete_file(self, staged: Dict) -> None:
+        """Record a fully migrated file"""
+        file_info = staged["file_info"]
+
+        self.logger.info(f"  {staged['tag']} ✓ Success! Share URL: {staged['share_url']}")
+        self.progress.mark_file(file_info['sharepoint_id'], "completed", {
+            "share_url": staged["share_url"],
+            "sharepoint_id": staged["item_id"],
+            "quick_xor_hash": staged["quick_xor_hash"]
+        })
+
+        audit_log("file_migrated", {
+            "product": file_info['product'],
+            "share_url": staged["share_url"]
+        })
+
+        return None
+
+    def _fail_file(self, tag: str, file_info: Dict, error: str, staged: Dict = None) -> str:
+        """Record a failed file and return its error message"""
+        self.logger.error(f"  {tag} ✗ Failed: {error}")
+
+        # Keep finished steps so --retry-failed can pick up where this stopped
+        details = {"error": error}
+        if staged and staged["item_id"]:
+            details["sharepoint_id"] = staged["item_id"]
+            if staged["share_url"]:
+                details["share_url"] = staged["share_url"]
+            if staged["quick_xor_hash"]:
+                details["quick_xor_hash"] = staged["quick_xor_hash"]
+
+        self.progress.mark_file(file_info['sharepoint_id'], "failed", details)
+
+        audit_log("file_migration_failed", {
+            "product": file_info['product'],
+            "error": error
+        }, status="error")
+
+        return error
+
+    def _flush_list_updates(self, staged: List[Dict]) -> List[Optional[str]]:
+        """Finish staged files with batched link, backup and update requests.
+
+        Returns one outcome per staged entry: None on success, or the error.
+        """
+        self.logger.info(f"\n→ Batching list updates for {len(staged)} files...")
+        outcomes = [None] * len(staged)
+
+        def fail(i: int, error: str):
+            outcomes[i] = self._fail_file(staged[i]["tag"], staged[i]["file_info"], error, staged[i])
+
+        done = set()   # finished without a list update
+
+        def live() -> List[int]:
+            return [i for i in range(len(staged)) if outcomes[i] is None and i not in done]
+
+        # Step 3: Create sharing links
+        need_links = [i for i in live() if not staged[i]["share_url"]]
+        if need_links:
+            with metrics.timer("batch_link"):
+                links = self.api_client.create_sharing_links_batched(
+                    [staged[i]["item_id"] for i in need_links]
+                )
+            for i in need_links:
+                staged[i]["share_url"] = links.get(staged[i]["item_id"])
+                if staged[i]["share_url"]:
+                    self._checkpoint(staged[i])
+                    self._remember_link(staged[i])
+                else:
+                    fail(i, "Failed to create sharing link")
+
+        # List items that already hold their new link need neither backup nor update
+        mirrored = {}
+        for i in live():
+            item = self.list_mirror.get(staged[i]["file_info"]['csv_row'])
+            if self._list_up_to_date(item, staged[i]["share_url"]):
+                self._complete_file(staged[i])
+                done.add(i)
+            elif item:
+                mirrored[i] = item
+
+        # Step 4a: Back up list items, from the mirror where possible
+        pending = live()
+        labels = {
+            staged[i]["file_info"]['csv_row']: {
+                "product": staged[i]["file_info"]['product'],
+                "file_id": staged[i]["file_info"]['sharepoint_id']
+            }
+            for i in pending
+        }
+        with metrics.timer("batch_backup"):
+            backups = {
+                staged[i]["file_info"]['csv_row']: self.backup_mgr.save_item_backup(
+                    staged[i]["file_info"]['csv_row'], mirrored[i],
+                    **labels[staged[i]["file_info"]['csv_row']]
+                )
+                for i in pending if i in mirrored
+            }
+            fetch = [staged[i]["file_info"]['csv_row'] for i in pending if i not in mirrored]
+            if fetch:
+                backups.update(self.api_client.backup_list_items_batched(fetch, self.backup_mgr, labels=labels))
+        for i in pending:
+            if not backups.get(staged[i]["file_info"]['csv_row']):
+                fail(i, "Failed to back up list item")
+
+        # Step 4b: Update list items
+        pending = live()
+        with metrics.timer("batch_update"):
+            updated = self.api_client.update_list_items_batched(
+                [(staged[i]["file_info"]['csv_row'], staged[i]["share_url"]) for i in pending],
+                test_mode=self.test_mode
+            )
+        for i in pending:
+            if updated.get(staged[i]["file_info"]['csv_row']):
+                self._mirror_update(staged[i]["file_info"]['csv_row'], staged[i]["share_url"])
+                self._complete_file(staged[i])
+            else:
+                fail(i, "Failed to update list item")
+
+        return outcomes
+
+    @staticmethod
+    def _record_outcome(results: Dict, file_info: Dict, error: Optional[str]):
+        """Fold a single file outcome into the run summary (main thread only)"""
+        if error is None:
+            results["completed"] += 1
+        else:
+            results["failed"] += 1
+            results["errors"].append({
+                "product": file_info['product'],
+                "error": error
+            })
+
+    def _select_files(self, migration_files: List[Dict], mode: str) -> List[Dict]:
+        """Pick the plan entries to work on from recorded progress.
+
+        all:          everything not yet completed
+        resume:       new and interrupted files; failed files are left alone
+        retry-failed: only files whose last attempt failed
+        """
+        selected = []
+
+        for file_info in migration_files:
+            entry = self.progress.get_file(file_info['sharepoint_id'])
+            status = entry["status"] if entry else None
+
+            if status == "completed":
+                continue
+            if mode == "resume" and status == "failed":
+                continue
+            if mode == "retry-failed" and status != "failed":
+                continue
+
+            selected.append(file_info)
+
+        return selected
+
+    # Summary table order; "file" is the whole pipeline for one file
+    BREAKDOWN_STEPS = ("reconcile", "transfer", "download", "upload", "link", "backup", "update",
+                       "batch_link", "batch_backup", "batch_update", "http_request", "file")
+
+    def _log_step_breakdown(self, snapshot: Dict):
+        """Log per-step timings and transfer/retry counters"""
+        steps = snapshot["steps"]
+        counters = snapshot["counters"]
+
+        self.logger.info("\nStep breakdown:")
+        self.logger.info(f"  {'Step':<14} {'Count':>7} {'Total s':>9} {'Mean ms':>9} "
+                         f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for step in self.BREAKDOWN_STEPS:
+            stats = steps.get(step)
+            if not stats or not stats["count"]:
+                continue
+            self.logger.info(
+                f"  {step:<14} {stats['count']:>7} {stats['sum']:>9.2f} {stats['mean'] * 1000:>9.1f} "
+                f"{stats['p50'] * 1000:>9.1f} {stats['p95'] * 1000:>9.1f} {stats['p99'] * 1000:>9.1f}"
+            )
+
+        self.logger.info(
+            f"Transferred: {counters.get('bytes_downloaded', 0) / 1e6:.1f} MB down, "
+            f"{counters.get('bytes_uploaded', 0) / 1e6:.1f} MB up"
+        )
+        self.logger.info(
+            f"Retries: {int(counters.get('retries', 0))} "
+            f"({counters.get('retry_sleep_seconds', 0):.1f}s backing off), "
+            f"{int(counters.get('throttles', 0))} throttled, "
+            f"{int(counters.get('server_errors', 0))} server errors, "
+            f"{int(counters.get('transport_errors', 0))} transport errors, "
+            f"{counters.get('rate_limit_wait_seconds', 0):.1f}s in rate limiter"
+        )
+        self.logger.info(
+            f"List updates skipped (already up to date): {int(counters.get('list_updates_skipped', 0))}"
+        )
+        self.logger.info(
+            f"Integrity: {int(counters.get('integrity_verified', 0))} uploads matched their source hash, "
+            f"{int(counters.get('integrity_mismatches', 0))} mismatched"
+        )
+
+    def _transfer_sizes(self, migration_files: List[Dict]) -> List[int]:
+        """Bytes each plan entry still has to move, for the scheduler.
+
+        Entries whose upload already exists (recorded in progress, or a
+        dedup hit on the source) move nothing. Sizes come from the OneDrive
+        index, else from batched metadata requests.
+        """
+        index = self.onedrive_index
+        sizes = {}
+        for file_info in migration_files:
+            source_id = file_info.get('onedrive_item_id')
+            item = index.get(source_id) if index and source_id else None
+            if item:
+                sizes[source_id] = item.get('size') or 0
+
+        unknown = sorted({
+            file_info['onedrive_item_id'] for file_info in migration_files
+            if file_info.get('onedrive_item_id') and file_info['onedrive_item_id'] not in sizes
+        })
+        if unknown and self.api_client:
+            for source_id, item in self.api_client.get_onedrive_items_batched(unknown).items():
+                sizes[source_id] = (item or {}).get('size') or 0
+
+        transfer = []
+        for file_info in migration_files:
+            source_id = file_info.get('onedrive_item_id')
+            entry = self.progress.get_file(file_info['sharepoint_id'])
+            uploaded = entry and entry.get("details", {}).get("sharepoint_id")
+            cached = Config.DEDUP_ENABLED and source_id and self.dedup.lookup_source(source_id, count=False)
+            transfer.append(0 if uploaded or cached else sizes.get(source_id, 0))
+
+        return transfer
+
+    def _log_schedule(self, schedule: Dict):
+        """Log how the run will be ordered and its projected makespan"""
+        if not schedule["enabled"]:
+            self.logger.info(f"Schedule: plan order, projected makespan "
+                             f"{self._format_duration(schedule['projected_seconds'])}")
+            return
+
+        lanes, lane_workers = schedule["lanes"], schedule["lane_workers"]
+        self.logger.info(
+            f"Schedule: {lanes['main']} files largest first on {lane_workers.get('main', 0)} workers, "
+            f"{lanes['fast']} small files on {lane_workers.get('fast', 0)} fast-lane workers"
+            + (f"; first {', then '.join(schedule['priorities'])}" if schedule["priorities"] else "")
+        )
+        self.logger.info(
+            f"Projected makespan: {self._format_duration(schedule['projected_seconds'])} "
+            f"({self._format_duration(schedule['projected_plan_order_seconds'])} in plan order)"
+        )
+
+    def run_migration(self, migration_files: List[Dict], test_mode: bool = None,
+                      workers: int = None, mode: str = "all"):
+        """Execute migration, optionally with a bounded pool of concurrent workers"""
+        if test_mode is not None and test_mode != self.test_mode:
             self.test_mode = test_mode
+            self.progress.close()
+            self.progress = ProgressTracker(self._progress_file(test_mode))
 
         self.logger.info(f"\n{'='*80}")
         self.logger.info(f"MIGRATION {'TEST MODE' if self.test_mode else 'PRODUCTION MODE'}")
         self.logger.info(f"{'='*80}\n")
 
+        metrics.trace_file = Config.TRACE_FILE if Config.TRACE_ENABLED else None
+
+        # Every list backup taken by this run carries its id, for --rollback --run
+        self.backup_mgr.run_id = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+        self.logger.info(f"Run ID: {self.backup_mgr.run_id}")
+        if Config.SHARD:
+            self.logger.info(f"Shard: {Config.shard_name(*Config.SHARD)} "
+                             f"(state in {Config.LOG_DIR}, backups in {Config.BACKUP_DIR})")
+
+        # Skip work recorded by earlier runs
+        planned = len(migration_files)
+        self.progress.set_total(planned)
+        migration_files = self._select_files(migration_files, mode)
+        skipped = planned - len(migration_files)
+        if skipped:
+            self.logger.info(f"Skipping {skipped} files already handled ({mode} mode)")
+
         # Limit to test count if in test mode
         if self.test_mode:
             migration_files = migration_files[:Config.TEST_FILE_COUNT]
@@ -446,106 +3815,194 @@ class STRMigration:
 
         # Create snapshot
         snapshot = self.backup_mgr.create_migration_snapshot({
+            "run_id": self.backup_mgr.run_id,
             "mode": "test" if self.test_mode else "production",
+            "shard": Config.shard_name(*Config.SHARD) if Config.SHARD else None,
             "file_count": len(migration_files),
             "timestamp": datetime.utcnow().isoformat(),
             "files": migration_files
         })
         self.logger.info(f"✓ Created migration snapshot: {snapshot}")
 
+        if Config.LIST_MIRROR_ENABLED and self.api_client and migration_files:
+            self.sync_list_mirror()
+
         results = {
+            "run_id": self.backup_mgr.run_id,
             "total": len(migration_files),
             "completed": 0,
             "failed": 0,
+            "skipped": skipped,
             "errors": []
         }
 
-        for idx, file_info in enumerate(migration_files, 1):
-            self.logger.info(f"\n[{idx}/{len(migration_files)}] Processing: {file_info['product']}")
+        workers = max(1, workers or Config.MAX_WORKERS)
+        total = len(migration_files)
 
-            try:
-                self.progress.mark_file(file_info['sharepoint_id'], "processing")
+        if workers > 1:
+            self.logger.info(f"Running with {workers} concurrent workers")
 
-                # Step 1: Download from OneDrive
-                self.logger.info("  → Downloading from OneDrive...")
-                file_content = self.api_client.download_onedrive_file(
-                    file_info['sharepoint_id']
-                )
+        scheduler = Scheduler(workers, enabled=Config.SCHEDULE_ENABLED)
+        scheduler.build(migration_files, self._transfer_sizes(migration_files))
+        self._log_schedule(scheduler.report())
 
-                if not file_content:
-                    raise Exception("Failed to download file from OneDrive")
+        started = time.monotonic()
+        outcomes, seconds = scheduler.run(
+            lambda seq, position: self._migrate_file(seq, total, migration_files[position])
+        )
+        makespan = time.monotonic() - started
 
-                # Step 2: Upload to SharePoint
-                self.logger.info("  → Uploading to SharePoint...")
-                filename = f"{file_info['product'][:50]}.bin"
-                uploaded = self.api_client.upload_to_sharepoint(filename, file_content)
+        # Finish files whose list updates were deferred for batching
+        staged = [i for i, outcome in enumerate(outcomes) if isinstance(outcome, dict)]
+        if staged:
+            flushed = self._flush_list_updates([outcomes[i] for i in staged])
+            for i, error in zip(staged, flushed):
+                outcomes[i] = error
 
-                if not uploaded:
-                    raise Exception("Failed to upload to SharePoint")
+        if self.list_mirror.synced:
+            self.list_mirror.save()
 
-                sharepoint_item_id = uploaded.get('id')
+        # Fold outcomes in plan order so the error list matches a sequential run
+        for file_info, error in zip(migration_files, outcomes):
+            self._record_outcome(results, file_info, error)
 
-                # Step 3: Create sharing link
-                self.logger.info("  → Creating sharing link...")
-                share_url = self.api_client.create_sharing_link(sharepoint_item_id)
+        self.progress.close()
 
-                if not share_url:
-                    raise Exception("Failed to create sharing link")
+        # Print summary
+        self.logger.info(f"\n{'='*80}")
+        self.logger.info(f"MIGRATION COMPLETE")
+        self.logger.info(f"{'='*80}")
+        self.logger.info(f"Total: {results['total']}")
+        self.logger.info(f"Completed: {results['completed']}")
+        self.logger.info(f"Failed: {results['failed']}")
+        self.logger.info(f"Skipped: {results['skipped']}")
+
+        results["dedup"] = self.dedup.stats()
+        self.logger.info(
+            f"Dedup cache: {results['dedup']['hits']} hits, {results['dedup']['misses']} misses"
+        )
+
+        if self.api_client:
+            results["rate_limiter"] = self.api_client.limiter.stats()
+            limiter = results["rate_limiter"]
+            self.logger.info(
+                f"Rate limiter: {limiter['rate']} req/s, {limiter['requests']} requests, "
+                f"{limiter['throttle_count']} throttled, {limiter['wait_time']}s waiting"
+            )
 
-                # Step 4: Update list
-                self.logger.info("  → Updating SharePoint list...")
-                updated = self.api_client.update_list_item(
-                    file_info['csv_row'],
-                    share_url,
-                    test_mode=self.test_mode
-                )
+        results["schedule"] = scheduler.report(makespan, seconds)
+        schedule = results["schedule"]
+        self.logger.info(
+            f"Makespan: {self._format_duration(schedule['actual_seconds'])} actual, "
+            f"{self._format_duration(schedule['projected_seconds'])} projected "
+            f"({self._format_duration(schedule['projected_plan_order_seconds'])} in plan order)"
+        )
+        self.logger.info(
+            f"Measured file times replayed: {self._format_duration(schedule['replayed_seconds'])} "
+            f"in this order, {self._format_duration(schedule['replayed_plan_order_seconds'])} in plan order"
+        )
+
+        results["metrics"] = metrics.snapshot()
+        self._log_step_breakdown(results["metrics"])
+        metrics.write(Config.METRICS_FILE)
 
-                if not updated:
-                    raise Exception("Failed to update list item")
+        if results["errors"]:
+            self.logger.error(f"\nErrors:")
+            for error in results["errors"]:
+                self.logger.error(f"  - {error['product']}: {error['error']}")
 
-                # Log success
-                self.logger.info(f"  ✓ Success! Share URL: {share_url}")
-                self.progress.mark_file(file_info['sharepoint_id'], "completed", {
-                    "share_url": share_url,
-                    "sharepoint_id": sharepoint_item_id
-                })
+        return results
 
-                audit_log("file_migrated", {
-                    "product": file_info['product'],
-                    "share_url": share_url
-                })
+    def sync_list_mirror(self):
+        """Bring the STR list mirror up to date; without it, items are fetched one by one"""
+        self.logger.info("Syncing STR list mirror...")
 
-                results["completed"] += 1
+        try:
+            changed = self.list_mirror.refresh(self.api_client, self.logger)
+        except Exception as e:
+            self.logger.warning(f"STR list mirror unavailable, backing up items individually: {e}")
+            return
 
-            except Exception as e:
-                self.logger.error(f"  ✗ Failed: {e}")
-                self.progress.mark_file(file_info['sharepoint_id'], "failed", {
-                    "error": str(e)
-                })
+        self.logger.info(f"✓ STR list mirror: {len(self.list_mirror.items)} items ({changed} changed)")
+
+    def rollback(self, run_id: str = None, products: List[str] = None,
+                 since: datetime = None, until: datetime = None, workers: int = None) -> Dict:
+        """Put backed-up Architecture_Diagram_Picture values back on the list.
+
+        Selects the earliest backup of each item taken by `run_id`, for
+        `products`, or between `since` and `until` (filters combine).
+        Updates go through $batch with --batch, otherwise through a pool of
+        workers; either way they share the client's rate limiter.
+        Rolled-back files are marked so the next migration run redoes them.
+        """
+        self.logger.info(f"\n{'='*80}")
+        self.logger.info(f"ROLLBACK {'TEST MODE' if self.test_mode else 'PRODUCTION MODE'}")
+        self.logger.info(f"{'='*80}\n")
+
+        results = {"total": 0, "restored": 0, "failed": 0, "errors": []}
+
+        entries = self.backup_mgr.select_backups(run_id, products, since, until)
+        if not entries:
+            runs = ", ".join(f"{run} ({count})" for run, count in self.backup_mgr.runs().items())
+            self.logger.warning(f"No backups match; runs in the store: {runs or 'none'}")
+            return results
+
+        restores = []
+        for entry in entries:
+            fields = self.backup_mgr.read_backup(entry)["data"].get("fields", {})
+            restores.append((entry, fields.get("Architecture_Diagram_Picture")))
 
-                audit_log("file_migration_failed", {
-                    "product": file_info['product'],
-                    "error": str(e)
-                }, status="error")
+        results["total"] = len(restores)
+        self.logger.info(f"Restoring {len(restores)} list items from backups")
 
+        if Config.BATCH_LIST_UPDATES:
+            updated = self.api_client.update_list_items_batched(
+                [(entry["item_id"], value) for entry, value in restores],
+                test_mode=self.test_mode
+            )
+            outcomes = [updated.get(entry["item_id"], False) for entry, _ in restores]
+        else:
+            workers = max(1, workers or Config.MAX_WORKERS)
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                outcomes = list(pool.map(
+                    lambda restore: self.api_client.update_list_item(
+                        restore[0]["item_id"], restore[1], test_mode=self.test_mode
+                    ),
+                    restores
+                ))
+
+        for (entry, value), restored in zip(restores, outcomes):
+            details = {
+                "product": entry["product"],
+                "item_id": entry["item_id"],
+                "run_id": entry["run_id"],
+                "backup_timestamp": entry["timestamp"],
+                "restored_value": value
+            }
+
+            if restored:
+                results["restored"] += 1
+                audit_log("item_rolled_back", details)
+                if entry["file_id"] and not self.test_mode:
+                    self.progress.mark_file(entry["file_id"], "rolled_back", details)
+            else:
                 results["failed"] += 1
-                results["errors"].append({
-                    "product": file_info['product'],
-                    "error": str(e)
-                })
+                results["errors"].append({"product": entry["product"], "item_id": entry["item_id"]})
+                audit_log("item_rollback_failed", details, status="error")
+
+        self.progress.close()
 
-        # Print summary
         self.logger.info(f"\n{'='*80}")
-        self.logger.info(f"MIGRATION COMPLETE")
+        self.logger.info("ROLLBACK COMPLETE")
         self.logger.info(f"{'='*80}")
         self.logger.info(f"Total: {results['total']}")
-        self.logger.info(f"Completed: {results['completed']}")
+        self.logger.info(f"Restored: {results['restored']}")
         self.logger.info(f"Failed: {results['failed']}")
 
         if results["errors"]:
-            self.logger.error(f"\nErrors:")
+            self.logger.error("\nErrors:")
             for error in results["errors"]:
-                self.logger.error(f"  - {error['product']}: {error['error']}")
+                self.logger.error(f"  - {error['product']} (item {error['item_id']})")
 
         return results
 
@@ -562,9 +4019,91 @@ def main():
                         help="Path to STR CSV file")
     parser.add_argument("--config", default="sharepoint_ids.json",
                         help="Path to SharePoint IDs config file")
+    parser.add_argument("--mapping", default=None,
+                        help="Document mapping JSON from str_document_matching.py to add matched documents")
+    parser.add_argument("--non-interactive", action="store_true",
+                        help="Fail instead of opening a browser if no cached sign-in can be used")
+    parser.add_argument("--diff-from", default=None,
+                        help="Earlier review-log export; only plan rows added or changed since it")
+    parser.add_argument("--plan-cache", default=None,
+                        help="Cache the parsed migration plan here (reused while the CSV is unchanged)")
+    parser.add_argument("--workers", type=int, default=Config.MAX_WORKERS,
+                        help="Number of files to migrate concurrently (default: 1)")
+    selection = parser.add_mutually_exclusive_group()
+    selection.add_argument("--resume", action="store_true",
+                           help="Only process new and interrupted files, leaving failed ones")
+    selection.add_argument("--retry-failed", action="store_true",
+                           help="Only retry files whose last attempt failed")
+    parser.add_argument("--no-dedup", action="store_true",
+                        help="Stream every file straight through instead of reusing identical uploads")
+    parser.add_argument("--batch", action="store_true",
+                        help="Batch list-item backups and updates through Graph $batch")
+    parser.add_argument("--no-list-mirror", action="store_true",
+                        help="Fetch every list item before updating it instead of using the synced list mirror")
+    parser.add_argument("--batch-links", action="store_true",
+                        help="Also batch createLink calls (with --batch)")
+    rollback = parser.add_argument_group("rollback")
+    rollback.add_argument("--rollback", action="store_true",
+                          help="Restore Architecture_Diagram_Picture from list backups instead of migrating")
+    rollback.add_argument("--run", default=None,
+                          help="Only backups taken by this run id (printed at the start of each run)")
+    rollback.add_argument("--product", action="append", default=None,
+                          help="Only this product (repeatable)")
+    rollback.add_argument("--products-file", default=None,
+                          help="Only the products listed in this file, one per line")
+    rollback.add_argument("--since", default=None, help="Only backups taken at or after this UTC time (ISO-8601)")
+    rollback.add_argument("--until", default=None, help="Only backups taken at or before this UTC time (ISO-8601)")
+    parser.add_argument("--verify", action="store_true",
+                        help="Check migrated files against their sources by hash and mark mismatches for retry")
+    plan = parser.add_argument_group("plan")
+    plan.add_argument("--plan", action="store_true",
+                      help="Check the plan against OneDrive/SharePoint metadata and project the run, without migrating")
+    plan.add_argument("--plan-latency", type=float, default=Config.PLAN_REQUEST_LATENCY,
+                      help="Assumed seconds per Graph request")
+    plan.add_argument("--plan-bandwidth", type=float, default=Config.PLAN_BANDWIDTH / (1024 * 1024),
+                      help="Assumed transfer bandwidth in MB/s")
+    plan.add_argument("--plan-throttle-rate", type=float, default=Config.PLAN_THROTTLE_RATE,
+                      help="Assumed share of requests throttled (0-1)")
+    plan.add_argument("--plan-retry-after", type=float, default=Config.PLAN_RETRY_AFTER,
+                      help="Assumed seconds a throttled request waits")
+    parser.add_argument("--trace", action="store_true",
+                        help=f"Write a per-file trace of step timings to {Config.TRACE_FILE}")
+    parser.add_argument("--metrics-port", type=int, default=Config.METRICS_PORT,
+                        help="Serve Prometheus metrics on this port while the migration runs")
+    schedule = parser.add_argument_group("scheduling")
+    schedule.add_argument("--no-schedule", action="store_true",
+                          help="Migrate in plan order instead of priority tiers, largest first")
+    schedule.add_argument("--priority", action="append", default=None, metavar="FIELD=VALUE",
+                          help="Migrate entries with this value first (repeatable, highest first; "
+                               "FIELD is 'STR Approved', 'Product Name' or 'ID'; "
+                               "default: 'STR Approved=Approved')")
+    schedule.add_argument("--fast-lane-workers", type=int, default=None,
+                          help=f"Workers that prefer files up to {Config.SMALL_FILE_MAX // (1024 * 1024)} MB "
+                               f"(default: {Config.FAST_LANE_SHARE * 100:.0f}%% of --workers)")
+    sharding = parser.add_argument_group("sharding")
+    sharding.add_argument("--shard", default=None, metavar="I/N",
+                          help="Only work on shard I of N (by a hash of sharepoint_id), "
+                               "with its own progress, audit log and backups")
+    sharding.add_argument("--merge-shards", action="store_true",
+                          help=f"Combine all shard states into {Config.SHARD_MERGE_DIR} and print a summary")
 
     args = parser.parse_args()
 
+    if args.merge_shards:
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+        summary = merge_shards(Config.LOG_DIR, Config.BACKUP_DIR, Config.SHARD_MERGE_DIR,
+                               logging.getLogger("STRMigration"))
+        sys.exit(0 if summary["shards"] and not summary["missing_shards"] else 1)
+
+    if args.shard:
+        try:
+            index, count = (int(part) for part in args.shard.split("/"))
+        except ValueError:
+            parser.error(f"--shard expects I/N, e.g. 2/4 (got {args.shard!r})")
+        if not 1 <= index <= count:
+            parser.error(f"--shard {args.shard}: I must be between 1 and N")
+        Config.use_shard(index, count)
+
     # Setup
     try:
         Config.load_from_file(Path(args.config))
@@ -572,21 +4111,112 @@ def main():
         print(f"ERROR: {e}")
         sys.exit(1)
 
+    Config.MAX_WORKERS = max(1, args.workers)
+    Config.NON_INTERACTIVE = args.non_interactive
+    Config.DEDUP_ENABLED = not args.no_dedup
+    Config.BATCH_LIST_UPDATES = args.batch
+    Config.BATCH_CREATE_LINK = args.batch_links
+    Config.LIST_MIRROR_ENABLED = not args.no_list_mirror
+    Config.TRACE_ENABLED = args.trace
+    Config.METRICS_PORT = args.metrics_port
+    Config.SCHEDULE_ENABLED = not args.no_schedule
+    Config.PLAN_REQUEST_LATENCY = args.plan_latency
+    Config.PLAN_BANDWIDTH = args.plan_bandwidth * 1024 * 1024
+
+    if args.priority:
+        # Only these review-log columns are carried into plan entries
+        fields = {}
+        for field in STRMigration.PRIORITY_FIELDS:
+            fields[field.casefold()] = field
+            fields[STRMigration.PLAN_COLUMNS[field].casefold()] = field
+
+        priorities = []
+        for override in args.priority:
+            field, sep, value = override.partition("=")
+            if not sep:
+                parser.error(f"--priority expects FIELD=VALUE (got {override!r})")
+            if field.strip().casefold() not in fields:
+                choices = ", ".join(f"'{STRMigration.PLAN_COLUMNS[f]}' ({f})" for f in STRMigration.PRIORITY_FIELDS)
+                parser.error(f"--priority: unknown field {field.strip()!r}; use one of {choices}")
+            priorities.append((fields[field.strip().casefold()], value))
+        Config.SCHEDULE_PRIORITIES = priorities
+
+    Config.FAST_LANE_WORKERS = args.fast_lane_workers
+
     logger = setup_logging(test_mode=args.test)
 
+    if Config.METRICS_PORT:
+        metrics.serve(Config.METRICS_PORT, Config.METRICS_HOST)
+        logger.info(f"✓ Serving metrics at http://{Config.METRICS_HOST}:{Config.METRICS_PORT}/metrics")
+
     # Run migration
     migrator = STRMigration(test_mode=args.test, logger=logger)
 
+    if args.rollback:
+        products = list(args.product or [])
+        if args.products_file:
+            with open(args.products_file, 'r', encoding='utf-8') as f:
+                products.extend(line.strip() for line in f if line.strip())
+
+        try:
+            since = datetime.fromisoformat(args.since) if args.since else None
+            until = datetime.fromisoformat(args.until) if args.until else None
+        except ValueError as e:
+            logger.error(f"Invalid --since/--until: {e}")
+            sys.exit(1)
+
+        if not (args.run or products or since or until):
+            logger.error("--rollback needs --run, --product/--products-file, --since or --until")
+            sys.exit(1)
+
+        if not migrator.initialize():
+            sys.exit(1)
+
+        results = migrator.rollback(args.run, products or None, since, until, workers=args.workers)
+        migrator.shutdown()
+        sys.exit(0 if results["failed"] == 0 else 1)
+
     if not migrator.initialize():
         sys.exit(1)
 
-    migration_files = migrator.load_migration_plan(Path(args.csv))
+    migration_files = migrator.load_migration_plan(
+        Path(args.csv),
+        cache_path=Path(args.plan_cache) if args.plan_cache else None,
+        mapping_path=Path(args.mapping) if args.mapping else None,
+        previous_csv=Path(args.diff_from) if args.diff_from else None
+    )
+
+    if Config.SHARD and migration_files:
+        planned = len(migration_files)
+        migration_files = select_shard(migration_files, *Config.SHARD)
+        logger.info(f"✓ Shard {Config.SHARD[0]}/{Config.SHARD[1]}: {len(migration_files)} of {planned} files")
 
     if not migration_files:
         logger.error("No files to migrate")
         sys.exit(1)
 
-    results = migrator.run_migration(migration_files)
+    migrator.resolve_onedrive_items(migration_files)
+
+    mode = "resume" if args.resume else "retry-failed" if args.retry_failed else "all"
+
+    if args.verify:
+        report = migrator.verify_migration(migration_files, workers=args.workers)
+        migrator.shutdown()
+        sys.exit(0 if not report["problems"] else 1)
+
+    if args.plan:
+        report = migrator.plan_migration(
+            migration_files, mode, workers=args.workers,
+            latency=args.plan_latency,
+            bandwidth=args.plan_bandwidth * 1024 * 1024,
+            throttle_rate=args.plan_throttle_rate,
+            retry_after=args.plan_retry_after
+        )
+        migrator.shutdown()
+        sys.exit(0 if not report["missing"] and not report["name_collisions"] else 1)
+
+    results = migrator.run_migration(migration_files, workers=args.workers, mode=mode)
+    migrator.shutdown()
 
     # Exit with error code if any failed
     sys.exit(0 if results["failed"] == 0 else 1)
@@ -0,0 +1,497 @@
+#!/usr/bin/env python3
+"""
+STR Review Log Columnar Cache
+- Converts a review-log CSV export into a compact on-disk column store
+- Categorical columns are dictionary-encoded, dates are epoch-second arrays,
+  free text is memory-mapped and only decoded for the rows a query needs
+- Small query API: filter, project, count and group-by counts, touching only
+  the columns a query names
+"""
+
+import sys
+import csv
+import json
+import hashlib
+import logging
+import mmap
+import os
+import re
+import shutil
+from array import array
+from collections import Counter
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+class CacheConfig:
+    CSV = Path("Software Technology Request (STR) Review Log (1).csv")
+    CACHE_SUFFIX = ".cols"      # cache directory sits next to the CSV
+    FORMAT_VERSION = 1
+
+    # A column is categorical when it has few distinct values overall or
+    # relative to the row count, and none of them is long free text (the
+    # dictionary is read whole when the column is opened)
+    CATEGORICAL_MAX_DISTINCT = 64
+    CATEGORICAL_MAX_RATIO = 0.5
+    CATEGORICAL_MAX_LENGTH = 80
+
+    # Formats seen in the review log's date columns; a column is a date
+    # column only if every non-empty value parses with one of them.
+    # 24-hour values come from a day-first locale ("28/08/2025 00:00").
+    DATE_FORMATS = [
+        "%m/%d/%Y %I:%M %p",
+        "%m/%d/%Y",
+        "%m/%d/%y",
+        "%d/%m/%Y %H:%M",
+        "%B %d, %Y %I:%M %p",
+        "%B %d, %Y",
+    ]
+    MISSING_DATE = -2 ** 63     # epoch-seconds sentinel for an empty date
+
+EPOCH = datetime(1970, 1, 1)
+
+def parse_date(value: str) -> Optional[datetime]:
+    """A review-log date, or None if the text is not one"""
+    value = value.strip()
+    for fmt in CacheConfig.DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return None
+
+def to_epoch(value: Union[str, date, datetime]) -> int:
+    """Query bound → epoch seconds (ISO-8601 text or a review-log date)"""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            parsed = parse_date(value)
+            if parsed is None:
+                raise ValueError(f"Not a date: {value}")
+            value = parsed
+    if not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    return int((value.replace(tzinfo=None) - EPOCH).total_seconds())
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def cache_dir_for(csv_path: Path) -> Path:
+    return csv_path.with_name(csv_path.name + CacheConfig.CACHE_SUFFIX)
+
+def encoding_settings() -> Dict:
+    """Settings that decide how columns are encoded; a cache built with others is rebuilt"""
+    return {
+        "categorical_max_distinct": CacheConfig.CATEGORICAL_MAX_DISTINCT,
+        "categorical_max_ratio": CacheConfig.CATEGORICAL_MAX_RATIO,
+        "categorical_max_length": CacheConfig.CATEGORICAL_MAX_LENGTH,
+        "date_formats": CacheConfig.DATE_FORMATS
+    }
+
+# ============================================================================
+# CONVERTER
+# ============================================================================
+
+def _code_typecode(distinct: int) -> str:
+    for typecode in ('B', 'H', 'I'):
+        if distinct <= 2 ** (8 * array(typecode).itemsize):
+            return typecode
+    return 'Q'
+
+def _write_array(path: Path, values: array):
+    with open(path, 'wb') as f:
+        values.tofile(f)
+
+def build_cache(csv_path: Path, cache_dir: Path = None) -> Path:
+    """Convert a review-log CSV into a column store; returns the cache directory.
+
+    The store is written beside the old one and swapped in when complete,
+    so readers never see a half-written cache.
+    """
+    cache_dir = cache_dir or cache_dir_for(csv_path)
+
+    with open(csv_path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        rows = [row + [''] * (len(header) - len(row)) if len(row) < len(header) else row
+                for row in reader]
+
+    tmp_dir = cache_dir.with_name(cache_dir.name + '.tmp')
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir()
+
+    columns = []
+    for number, name in enumerate(header):
+        values = [row[number] for row in rows]
+        columns.append(_write_column(tmp_dir, f"c{number:03d}", values, len(rows)) | {"name": name})
+
+    manifest = {
+        "version": CacheConfig.FORMAT_VERSION,
+        "source": str(csv_path),
+        "sha256": file_sha256(csv_path),
+        "encoding": encoding_settings(),
+        "rows": len(rows),
+        "byteorder": sys.byteorder,
+        "columns": columns
+    }
+    with open(tmp_dir / "manifest.json", 'w') as f:
+        json.dump(manifest, f)
+
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.replace(tmp_dir, cache_dir)
+    return cache_dir
+
+def _write_column(directory: Path, stem: str, values: List[str], row_count: int) -> Dict:
+    """Write one column as dates, categories or text, in that order of preference"""
+    distinct = {}
+    for value in values:
+        distinct.setdefault(value, len(distinct))
+
+    dates = {value: parse_date(value) for value in distinct if value.strip()}
+    if dates and all(dates.values()):
+        epochs = array('q', (
+            to_epoch(dates[value]) if value.strip() else CacheConfig.MISSING_DATE for value in values
+        ))
+        _write_array(directory / f"{stem}.dates", epochs)
+        return {"kind": "date", "file": f"{stem}.dates"}
+
+    few = len(distinct) <= max(CacheConfig.CATEGORICAL_MAX_DISTINCT, row_count * CacheConfig.CATEGORICAL_MAX_RATIO)
+    if few and max(map(len, distinct)) <= CacheConfig.CATEGORICAL_MAX_LENGTH:
+        codes = array(_code_typecode(len(distinct)), (distinct[value] for value in values))
+        _write_array(directory / f"{stem}.codes", codes)
+        return {"kind": "category", "file": f"{stem}.codes", "typecode": codes.typecode,
+                "dictionary": list(distinct)}
+
+    offsets = array('Q', [0])
+    with open(directory / f"{stem}.data", 'wb') as f:
+        for value in values:
+            encoded = value.encode('utf-8')
+            f.write(encoded)
+            offsets.append(offsets[-1] + len(encoded))
+    _write_array(directory / f"{stem}.offsets", offsets)
+    return {"kind": "text", "file": f"{stem}.data", "offsets": f"{stem}.offsets"}
+
+# ============================================================================
+# COLUMNS
+# ============================================================================
+
+def _read_array(path: Path, typecode: str, swap: bool) -> array:
+    values = array(typecode)
+    with open(path, 'rb') as f:
+        values.frombytes(f.read())
+    if swap:
+        values.byteswap()
+    return values
+
+class CategoryColumn:
+    """Dictionary-encoded column: one small integer code per row"""
+
+    kind = "category"
+
+    def __init__(self, directory: Path, spec: Dict, swap: bool):
+        self.dictionary = spec["dictionary"]
+        self.codes = _read_array(directory / spec["file"], spec["typecode"], swap)
+
+    def value(self, row: int) -> str:
+        return self.dictionary[self.codes[row]]
+
+    def filter(self, rows: Sequence[int], op: str, operand) -> List[int]:
+        # Decide per dictionary entry once, then only compare codes
+        wanted = {code for code, value in enumerate(self.dictionary) if _text_matches(value, op, operand)}
+        codes = self.codes
+        return [row for row in rows if codes[row] in wanted]
+
+    def group_count(self, rows: Sequence[int]) -> Counter:
+        codes = self.codes
+        counts = Counter(codes[row] for row in rows)
+        return Counter({self.dictionary[code]: count for code, count in counts.items()})
+
+class DateColumn:
+    """Epoch seconds per row; empty cells hold MISSING_DATE"""
+
+    kind = "date"
+
+    def __init__(self, directory: Path, spec: Dict, swap: bool):
+        self.epochs = _read_array(directory / spec["file"], 'q', swap)
+
+    def value(self, row: int) -> Optional[datetime]:
+        epoch = self.epochs[row]
+        if epoch == CacheConfig.MISSING_DATE:
+            return None
+        return datetime.utcfromtimestamp(epoch)
+
+    def filter(self, rows: Sequence[int], op: str, operand) -> List[int]:
+        epochs = self.epochs
+        missing = CacheConfig.MISSING_DATE
+
+        if op in ("==", "!=") and operand in ("", None):
+            empty = op == "=="
+            return [row for row in rows if (epochs[row] == missing) == empty]
+
+        if op == "in":
+            bounds = {to_epoch(value) for value in operand}
+            return [row for row in rows if epochs[row] in bounds]
+
+        bound = to_epoch(operand)
+        compare = {
+            "==": lambda epoch: epoch == bound,
+            "!=": lambda epoch: epoch != bound,
+            "<": lambda epoch: epoch < bound,
+            "<=": lambda epoch: epoch <= bound,
+            ">": lambda epoch: epoch > bound,
+            ">=": lambda epoch: epoch >= bound,
+        }.get(op)
+        if compare is None:
+            raise ValueError(f"Operator {op} does not apply to dates")
+        return [row for row in rows if epochs[row] != missing and compare(epochs[row])]
+
+    def group_count(self, rows: Sequence[int]) -> Counter:
+        return Counter(self.value(row) for row in rows)
+
+class TextColumn:
+    """Free text: a memory-mapped UTF-8 blob and row offsets into it"""
+
+    kind = "text"
+
+    def __init__(self, directory: Path, spec: Dict, swap: bool):
+        self.offsets = _read_array(directory / spec["offsets"], 'Q', swap)
+        path = directory / spec["file"]
+        if path.stat().st_size:
+            with open(path, 'rb') as f:
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.data = b''
+
+    def value(self, row: int) -> str:
+        return self.data[self.offsets[row]:self.offsets[row + 1]].decode('utf-8')
+
+    def filter(self, rows: Sequence[int], op: str, operand) -> List[int]:
+        return [row for row in rows if _text_matches(self.value(row), op, operand)]
+
+    def group_count(self, rows: Sequence[int]) -> Counter:
+        return Counter(self.value(row) for row in rows)
+
+COLUMN_KINDS = {cls.kind: cls for cls in (CategoryColumn, DateColumn, TextColumn)}
+
+def _text_matches(value: str, op: str, operand) -> bool:
+    if op == "==":
+        return value == operand
+    if op == "!=":
+        return value != operand
+    if op == "in":
+        return value in operand
+    if op == "contains":
+        return operand.casefold() in value.casefold()
+    raise ValueError(f"Operator {op} does not apply to text")
+
+# ============================================================================
+# QUERY API
+# ============================================================================
+
+Condition = Tuple[str, str, object]   # (column, operator, operand)
+
+class ReviewLog:
+    """Read side of a column store; columns are opened on first use"""
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = cache_dir
+        with open(cache_dir / "manifest.json", 'r') as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("version") != CacheConfig.FORMAT_VERSION:
+            raise ValueError(f"Unsupported cache version in {cache_dir}")
+
+        self.rows = self.manifest["rows"]
+        self.specs = {spec["name"]: spec for spec in self.manifest["columns"]}
+        self.names = [spec["name"] for spec in self.manifest["columns"]]
+        self._swap = self.manifest["byteorder"] != sys.byteorder
+        self._columns = {}
+
+    @classmethod
+    def open_csv(cls, csv_path: Path, cache_dir: Path = None, rebuild: bool = False) -> "ReviewLog":
+        """Open the cache of a CSV, (re)building it if missing or out of date"""
+        cache_dir = cache_dir or cache_dir_for(csv_path)
+        if rebuild or not cls.is_current(csv_path, cache_dir):
+            build_cache(csv_path, cache_dir)
+        return cls(cache_dir)
+
+    @classmethod
+    def open_current(cls, csv_path: Path, cache_dir: Path = None) -> Optional["ReviewLog"]:
+        """Open the cache of a CSV only if one built from these exact bytes exists"""
+        cache_dir = cache_dir or cache_dir_for(csv_path)
+        return cls(cache_dir) if cls.is_current(csv_path, cache_dir) else None
+
+    @staticmethod
+    def is_current(csv_path: Path, cache_dir: Path) -> bool:
+        try:
+            with open(cache_dir / "manifest.json", 'r') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return False
+        return (manifest.get("version") == CacheConfig.FORMAT_VERSION
+                and manifest.get("encoding") == encoding_settings()
+                and manifest.get("sha256") == file_sha256(csv_path))
+
+    def column(self, name: str):
+        """Open (once) and return a column by its CSV header name"""
+        if name not in self._columns:
+            spec = self.specs.get(name)
+            if spec is None:
+                raise KeyError(f"Column not found: {name}")
+            self._columns[name] = COLUMN_KINDS[spec["kind"]](self.cache_dir, spec, self._swap)
+        return self._columns[name]
+
+    def kind(self, name: str) -> str:
+        return self.specs[name]["kind"]
+
+    def where(self, *conditions: Condition) -> "Query":
+        return Query(self).where(*conditions)
+
+    def select(self, *columns: str, limit: int = None) -> List[Dict]:
+        return Query(self).select(*columns, limit=limit)
+
+    def group_count(self, column: str) -> List[Tuple[object, int]]:
+        return Query(self).group_count(column)
+
+class Query:
+    """Filters over a ReviewLog, evaluated when results are asked for.
+
+    Category and date filters run first (integer compares), text filters
+    last, so free text is only decoded for rows still in play.
+    """
+
+    ORDER = {"category": 0, "date": 1, "text": 2}
+
+    def __init__(self, log: ReviewLog, conditions: Iterable[Condition] = ()):
+        self.log = log
+        self.conditions = list(conditions)
+
+    def where(self, *conditions: Condition) -> "Query":
+        for column, op, _ in conditions:
+            self.log.column(column)   # fail early on unknown columns
+        return Query(self.log, self.conditions + list(conditions))
+
+    def row_ids(self) -> List[int]:
+        rows = range(self.log.rows)
+        for column, op, operand in sorted(self.conditions, key=lambda c: self.ORDER[self.log.kind(c[0])]):
+            rows = self.log.column(column).filter(rows, op, operand)
+            if not rows:
+                break
+        return list(rows)
+
+    def count(self) -> int:
+        return len(self.row_ids())
+
+    def select(self, *columns: str, limit: int = None) -> List[Dict]:
+        """Matching rows with only the named columns (all columns if none are named)"""
+        columns = columns or tuple(self.log.names)
+        rows = self.row_ids()
+        if limit is not None:
+            rows = rows[:limit]
+
+        opened = [(name, self.log.column(name)) for name in columns]
+        return [{name: column.value(row) for name, column in opened} for row in rows]
+
+    def group_count(self, column: str) -> List[Tuple[object, int]]:
+        """(value, rows) for each value of a column among matching rows, most common first"""
+        return self.log.column(column).group_count(self.row_ids()).most_common()
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+CONDITION_PATTERN = re.compile(r'^(.+?)\s*(>=|<=|!=|=|<|>|~)\s*(.*)$')
+
+def parse_condition(text: str) -> Condition:
+    """'Column=value', 'Column=a|b', 'Column~text', 'Column>=2025-01-01' → condition"""
+    match = CONDITION_PATTERN.match(text)
+    if not match:
+        raise ValueError(f"Invalid condition: {text}")
+
+    column, op, operand = match.groups()
+    if op == "~":
+        return column, "contains", operand
+    if op == "=" and "|" in operand:
+        return column, "in", operand.split("|")
+    return column, "==" if op == "=" else op, operand
+
+def _display(value) -> str:
+    return value.isoformat() if isinstance(value, datetime) else ("" if value is None else str(value))
+
+def main():
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Columnar cache of the STR review log")
+    parser.add_argument("--csv", default=str(CacheConfig.CSV), help="Review-log CSV export")
+    parser.add_argument("--cache-dir", default=None, help="Cache directory (default: next to the CSV)")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the cache even if it is current")
+    parser.add_argument("--info", action="store_true", help="List columns with their encoding and size")
+    parser.add_argument("--where", action="append", default=[],
+                        help="Filter, repeatable: 'STR Approved=Approved', 'Vendor Name=A|B', "
+                             "'Description~bedrock', 'Session Date>=2025-01-01'")
+    parser.add_argument("--select", default=None, help="Comma-separated columns to print")
+    parser.add_argument("--group-by", default=None, help="Count matching rows per value of this column")
+    parser.add_argument("--count", action="store_true", help="Print the number of matching rows only")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--json", action="store_true", help="Print rows as JSON lines")
+
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    logger = logging.getLogger("STRReviewLogCache")
+
+    csv_path = Path(args.csv)
+    if not csv_path.exists():
+        logger.error(f"✗ CSV not found: {csv_path}")
+        sys.exit(1)
+
+    started = time.monotonic()
+    cache_dir = Path(args.cache_dir) if args.cache_dir else None
+    log = ReviewLog.open_csv(csv_path, cache_dir, rebuild=args.rebuild)
+    opened = time.monotonic()
+
+    if args.info:
+        for name in log.names:
+            spec = log.specs[name]
+            size = sum((log.cache_dir / spec[key]).stat().st_size for key in ("file", "offsets") if key in spec)
+            extra = f" ({len(spec['dictionary'])} values)" if spec["kind"] == "category" else ""
+            print(f"{spec['kind']:<9} {size:>9}  {name}{extra}")
+        return
+
+    try:
+        query = log.where(*(parse_condition(text) for text in args.where))
+        if args.count:
+            result = query.count()
+        elif args.group_by:
+            result = query.group_count(args.group_by)
+        else:
+            columns = [c.strip() for c in args.select.split(",")] if args.select else []
+            result = query.select(*columns, limit=args.limit)
+    except (KeyError, ValueError) as e:
+        logger.error(f"✗ {e}")
+        sys.exit(1)
+
+    logger.info(f"✓ {log.rows} rows; cache opened in {(opened - started) * 1000:.1f}ms, "
+                f"query answered in {(time.monotonic() - opened) * 1000:.1f}ms")
+
+    if args.count:
+        print(result)
+    elif args.group_by:
+        for value, count in result[:args.limit] if args.limit else result:
+            print(f"{count:>8}  {_display(value)}")
+    else:
+        for row in result:
+            print(json.dumps({k: _display(v) for k, v in row.items()}) if args.json
+                  else " | ".join(_display(v) for v in row.values()))
+
+if __name__ == "__main__":
+    main()
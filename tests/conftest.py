@@ -0,0 +1,76 @@
+"""Shared fixtures: a scratch working directory, a quiet logger and the mock Graph server"""
+
+import logging
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import str_migration_robust as m  # noqa: E402
+from mock_graph_server import start_server  # noqa: E402
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run in an empty directory; Config paths are relative to it"""
+    monkeypatch.chdir(tmp_path)
+    m.Config.LOG_DIR.mkdir()
+    yield tmp_path
+    m.close_audit_log()
+
+@pytest.fixture
+def logger():
+    log = logging.getLogger("STRMigrationTests")
+    log.propagate = False
+    if not log.handlers:
+        log.addHandler(logging.NullHandler())
+    return log
+
+@pytest.fixture
+def graph(workdir, monkeypatch):
+    """Start the mock server for (sources, plan); returns its router (state in router.state)"""
+    servers = []
+
+    def start(sources, plan):
+        server = start_server(sources, list_items={
+            f["csv_row"]: {"Architecture_Diagram_Picture": f["old_url"]} for f in plan
+        })
+        servers.append(server)
+        monkeypatch.setattr(m.Config, "GRAPH_BASE", f"http://127.0.0.1:{server.server_port}/v1.0")
+        for name in ("SITE_ID", "DRIVE_ID", "LIST_ID"):
+            monkeypatch.setattr(m.Config, name, "test")
+        return server.router
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+@pytest.fixture
+def migrator(logger):
+    """Build STRMigration instances wired to the mock server without authentication"""
+    built = []
+
+    def build(test_mode=False):
+        mig = m.STRMigration(test_mode=test_mode, logger=logger)
+        mig.api_client = m.GraphAPIClient({"Authorization": "Bearer test"}, logger,
+                                          limiter=m.RateLimiter(rate=500, max_rate=500))
+        mig.backup_mgr.api_client = mig.api_client
+        built.append(mig)
+        return mig
+
+    yield build
+    for mig in built:
+        mig.progress.close()
+        mig.shutdown()
+
+@pytest.fixture
+def patch_route(monkeypatch):
+    """Wrap one mock handler: patch_route(router, "get_list_item", lambda handler: replacement)"""
+    def patch(router, name, wrap):
+        monkeypatch.setattr(router, "routes", [
+            (method, pattern, wrap(handler) if handler.__name__ == name else handler)
+            for method, pattern, handler in router.routes
+        ])
+    return patch
@@ -0,0 +1,128 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import str_audit_query as q
+import str_migration_robust as m
+
+REPO = Path(__file__).resolve().parent.parent
+
+def record(n, product="Alpha", status="success", timestamp=None):
+    return json.dumps({
+        "timestamp": timestamp or f"2025-01-01T00:00:{n:02d}",
+        "event_type": "file_migrated",
+        "status": status,
+        "data": {"product": product, "n": n}
+    }) + "\n"
+
+def indexed(log):
+    index = q.AuditIndex(log)
+    index.load()
+    added = index.update()
+    index.save()
+    return index, added
+
+def test_index_grows_incrementally(tmp_path):
+    log = tmp_path / "audit.jsonl"
+    log.write_text(record(1) + record(2, "Beta", "error") + record(3))
+
+    index, added = indexed(log)
+    assert added == 3
+
+    with open(log, 'a') as f:
+        f.write(record(4, "beta") + record(5))
+    index, added = indexed(log)
+
+    assert added == 2 and len(index.offsets) == 5
+    assert index.find(product="BETA ") == [1, 3]
+    assert index.find(product="beta", status="error") == [1]
+    assert [r["data"]["n"] for r in index.read(index.find(product="alpha"))] == [1, 3, 5]
+    assert indexed(log)[1] == 0
+
+def test_torn_last_line_waits_for_its_newline(tmp_path):
+    log = tmp_path / "audit.jsonl"
+    line = record(2)
+    log.write_text(record(1) + line[:20])
+
+    index, added = indexed(log)
+    assert added == 1
+
+    with open(log, 'a') as f:
+        f.write(line[20:])
+    index, added = indexed(log)
+    assert added == 1 and index.find() == [0, 1]
+
+def test_unparseable_lines_are_skipped(tmp_path):
+    log = tmp_path / "audit.jsonl"
+    log.write_text(record(1) + "not json\n" + '{"no": "timestamp"}\n' + record(2))
+
+    index, added = indexed(log)
+
+    assert (added, index.skipped) == (2, 2)
+    assert [r["data"]["n"] for r in index.read(index.find())] == [1, 2]
+
+def test_short_log_keeps_its_fingerprint_across_appends(tmp_path):
+    log = tmp_path / "audit.jsonl"
+    log.write_text(record(1))
+    indexed(log)
+
+    for n in range(2, 6):
+        with open(log, 'a') as f:
+            f.write(record(n))
+        index, added = indexed(log)
+        # One new record each time, not a rebuild of the whole log
+        assert added == 1 and len(index.offsets) == n
+
+def test_shrunk_or_replaced_log_is_rebuilt(tmp_path):
+    log = tmp_path / "audit.jsonl"
+    log.write_text(record(1) + record(2) + record(3))
+    indexed(log)
+
+    log.write_text(record(7))
+    index, added = indexed(log)
+    assert added == 1 and [r["data"]["n"] for r in index.read(index.find())] == [7]
+
+    # Same size and longer, but different content from the start
+    log.write_text(record(8, "Gamma") + record(9, "Gamma"))
+    index, added = indexed(log)
+    assert added == 2 and index.find(product="alpha") == []
+
+def test_time_filters_with_and_without_ordered_timestamps(tmp_path):
+    log = tmp_path / "audit.jsonl"
+    log.write_text(record(1) + record(2) + record(3) + record(4))
+    index, _ = indexed(log)
+    since, until = q.parse_time("2025-01-01T00:00:02"), q.parse_time("2025-01-01T00:00:03")
+    assert index.times_sorted and index.find(since=since, until=until) == [1, 2]
+
+    with open(log, 'a') as f:
+        f.write(record(5, timestamp="2025-01-01T00:00:02.500000"))
+    index, _ = indexed(log)
+    assert not index.times_sorted
+    assert index.find(since=since, until=until) == [1, 2, 4]
+    assert index.find(since=since, until=until, product="alpha") == [1, 2, 4]
+
+def test_writer_drains_the_queue_on_close(tmp_path, monkeypatch):
+    monkeypatch.setattr(m.Config, "AUDIT_LOG", tmp_path / "audit.jsonl")
+    writer = m.AuditWriter(batch_size=1000, flush_interval=60)
+    for n in range(50):
+        writer.put({"n": n})
+
+    writer.close()
+
+    lines = (tmp_path / "audit.jsonl").read_text().splitlines()
+    assert [json.loads(line)["n"] for line in lines] == list(range(50))
+
+def test_audit_records_are_written_at_interpreter_exit(tmp_path):
+    script = (
+        "import sys; sys.path.insert(0, sys.argv[1])\n"
+        "from pathlib import Path\n"
+        "import str_migration_robust as m\n"
+        "m.Config.AUDIT_LOG = Path(sys.argv[2])\n"
+        "for n in range(500):\n"
+        "    m.audit_log('file_migrated', {'n': n})\n"
+    )
+    log = tmp_path / "audit.jsonl"
+    subprocess.run([sys.executable, "-c", script, str(REPO), str(log)], check=True, timeout=60)
+
+    assert len(log.read_text().splitlines()) == 500
@@ -0,0 +1,66 @@
+import gzip
+import json
+
+import str_migration_robust as m
+
+def make_backups(count):
+    mgr = m.BackupManager(m.Config.BACKUP_DIR)
+    mgr.run_id = "run-1"
+    for i in range(count):
+        mgr.save_item_backup(str(i), {"fields": {"Architecture_Diagram_Picture": f"old-{i}"}},
+                             product=f"Product {i}", file_id=f"F{i}")
+    return mgr
+
+def test_store_is_plain_gzip_json_lines(workdir):
+    mgr = make_backups(3)
+
+    records = [json.loads(line) for line in gzip.decompress(mgr.store_path.read_bytes()).splitlines()]
+    assert [r["item_id"] for r in records] == ["0", "1", "2"]
+    assert mgr.read_backup(mgr.entries[1])["data"]["fields"]["Architecture_Diagram_Picture"] == "old-1"
+
+def test_records_missing_from_index_are_recovered(workdir):
+    mgr = make_backups(4)
+    lines = mgr.index_path.read_text().splitlines(keepends=True)
+    # Crash after two store appends whose index lines never landed, the last one torn
+    mgr.index_path.write_text(''.join(lines[:2]) + lines[2][:10])
+
+    reloaded = m.BackupManager(m.Config.BACKUP_DIR)
+
+    assert [e["item_id"] for e in reloaded.entries] == ["0", "1", "2", "3"]
+    assert reloaded.read_backup(reloaded.entries[3])["file_id"] == "F3"
+    # The torn line is replaced, so the next load reads the index alone
+    assert [json.loads(line)["item_id"] for line in reloaded.index_path.read_text().splitlines()] == \
+        ["0", "1", "2", "3"]
+
+def test_torn_store_tail_is_truncated(workdir):
+    mgr = make_backups(2)
+    size = mgr.store_path.stat().st_size
+    blob = gzip.compress(b'{"item_id": "2"}\n', mtime=0)
+    with open(mgr.store_path, 'ab') as f:
+        f.write(blob[:len(blob) // 2])
+
+    reloaded = m.BackupManager(m.Config.BACKUP_DIR)
+
+    assert len(reloaded.entries) == 2
+    assert reloaded.store_path.stat().st_size == size
+    reloaded.save_item_backup("3", {})
+    assert [e["item_id"] for e in m.BackupManager(m.Config.BACKUP_DIR).entries] == ["0", "1", "3"]
+
+def test_index_ahead_of_store_is_rebuilt(workdir):
+    mgr = make_backups(3)
+    with open(mgr.store_path, 'r+b') as f:
+        f.truncate(mgr.entries[2]["offset"])
+
+    reloaded = m.BackupManager(m.Config.BACKUP_DIR)
+
+    assert [e["item_id"] for e in reloaded.entries] == ["0", "1"]
+
+def test_select_backups_keeps_earliest_per_item(workdir):
+    mgr = make_backups(2)
+    mgr.run_id = "run-2"
+    mgr.save_item_backup("0", {"fields": {}}, product="Product 0")
+
+    assert [e["run_id"] for e in mgr.select_backups()] == ["run-1", "run-1"]
+    assert [e["item_id"] for e in mgr.select_backups(run_id="run-2")] == ["0"]
+    assert [e["item_id"] for e in mgr.select_backups(products=[" product 1 "])] == ["1"]
+    assert mgr.runs() == {"run-1": 2, "run-2": 1}
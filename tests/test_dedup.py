@@ -0,0 +1,64 @@
+import str_migration_robust as m
+
+def cache():
+    return m.DedupCache(m.Config.DEDUP_CACHE_FILE)
+
+def test_record_and_lookup(workdir):
+    dedup = cache()
+    assert dedup.lookup("h1") is None
+
+    dedup.record("h1", source_id="OD1", item_id="SP1")
+    dedup.record("h1", share_url="https://link/1")
+
+    assert dedup.lookup("h1") == {"item_id": "SP1", "share_url": "https://link/1"}
+    assert dedup.stats() == {"hits": 1, "misses": 1, "entries": 1}
+
+def test_source_alias_skips_the_download(workdir):
+    dedup = cache()
+    dedup.record("h1", source_id="OD1", item_id="SP1")
+    dedup.record("h1", source_id="OD2")
+
+    assert dedup.lookup_source("OD2") == ("h1", {"item_id": "SP1"})
+    assert dedup.lookup_source("OD3") is None
+    # A hash seen but never uploaded is no hit
+    dedup.record("h2", source_id="OD4")
+    assert dedup.lookup_source("OD4") is None
+
+def test_reupload_to_an_item_evicts_its_old_content(workdir):
+    dedup = cache()
+    dedup.record("old", source_id="OD1", item_id="SP1", share_url="https://link/1")
+    dedup.record("new", source_id="OD2", item_id="SP1")
+
+    assert dedup.lookup("old") is None
+    assert dedup.lookup_source("OD1") is None
+    assert dedup.lookup("new") == {"item_id": "SP1"}
+
+def test_journal_replay_rebuilds_the_same_state(workdir):
+    dedup = cache()
+    dedup.record("old", source_id="OD1", item_id="SP1")
+    dedup.record("other", source_id="OD2", item_id="SP2", share_url="https://link/2")
+    dedup.record("new", source_id="OD3", item_id="SP1")
+    with open(m.Config.DEDUP_CACHE_FILE, 'a') as f:
+        f.write('{"hash": "torn"')
+
+    reloaded = cache()
+
+    assert reloaded.entries == dedup.entries
+    assert reloaded.sources == dedup.sources
+    assert reloaded.lookup("old") is None
+
+def test_key_lock_is_shared_per_hash(workdir):
+    dedup = cache()
+    assert dedup.key_lock("h1") is dedup.key_lock("h1")
+    assert dedup.key_lock("h1") is not dedup.key_lock("h2")
+
+def test_discard_drops_every_entry_for_an_item(workdir):
+    dedup = cache()
+    dedup.record("h1", source_id="OD1", item_id="SP1")
+    dedup.record("h2", source_id="OD2", item_id="SP2")
+
+    assert dedup.discard("SP1") == 1
+    assert dedup.discard("SP1") == 0
+    assert dedup.lookup_source("OD1") is None
+    assert cache().lookup("h2") == {"item_id": "SP2"}
+    assert cache().lookup("h1") is None
@@ -0,0 +1,112 @@
+import json
+from pathlib import Path
+
+import pytest
+
+import str_document_matching as d
+import str_migration_robust as m
+
+REVIEW_LOG = Path(__file__).resolve().parent.parent / d.MatchConfig.REVIEW_LOG
+UUID = "d5bfe12f-0ed3-47d7-8549-ee34fa679288"
+
+def products(*names):
+    return [{"name": name, "info": {"row": row, "id": str(row)}} for row, name in enumerate(names, 2)]
+
+def exact(names, document):
+    index = d.ProductIndex(products(*names))
+    found = index.exact(d.normalize_document(document))
+    return None if found is None else names[found]
+
+def test_id_prefixes_and_extensions_are_stripped():
+    assert d.split_file_name(UUID + "pce-bedrock.png") == (UUID, "pce-bedrock.png")
+    assert d.split_file_name(UUID) is None
+    assert d.split_file_name("bedrock.png") is None
+
+    assert d.normalize_document("276a96cc-7549-41bb-92ad-2d2ce00db634pce-bedrock.png") == "pce bedrock"
+    assert d.normalize_document("0123456789abcdef0123456789ABCDEF" + UUID + "Fleet_Link.v2.png") == \
+        "fleet link"
+
+def test_files_are_grouped_by_document_name():
+    other = "276a96cc-7549-41bb-92ad-2d2ce00db634"
+    documents, total = d.group_documents([UUID + "a.png", other + "a.png", "no-prefix.png"])
+
+    assert total == 2
+    assert documents == {"a.png": [[UUID, UUID + "a.png"], [other, other + "a.png"]]}
+
+def test_most_specific_name_wins():
+    assert exact(["Figma", "Figma AI"], "figma-ai.png") == "Figma AI"
+    assert exact(["Amazon Q", "Amazon Q Business and AWS Chatbot"],
+                 "STR - Amazon Q Business and AWS Chatbot Strategic Portfolio V3.1.docx") == \
+        "Amazon Q Business and AWS Chatbot"
+    assert exact(["Figma", "Figma AI"], "figma.png") == "Figma"
+
+def test_short_names_must_match_a_whole_token():
+    assert exact(["Box"], "AmberBox Data Flow Diagram.pdf") is None
+    assert exact(["Box", "AmberBox"], "AmberBox Data Flow Diagram.pdf") == "AmberBox"
+    assert exact(["Box"], "Box SSO flow.png") == "Box"
+    # Four letters and up match anywhere in the name
+    assert exact(["Logi", "Armis"], "Armis Logical Diagram.png") == "Armis"
+
+def test_partial_matches_score_distinctive_tokens():
+    index = d.ProductIndex(products("Fleet Link Manager", "Data Portal"))
+
+    assert index.partial(d.normalize_document("fleet-manager-overview.png")) == (0, 2 / 3)
+    # Stop words alone never match
+    assert index.partial(d.normalize_document("data-flow-diagram.png")) is None
+
+# Documents the matcher places differently from the mapping shipped with the repo,
+# which predates it (substring hits on "Logi", "Box" and "RDI", less specific names)
+@pytest.mark.parametrize("document, product", [
+    ("AmberBox Data Flow Diagram - CONFIDENTIAL.pdf", "AmberBox"),
+    ("Armis Logical Diagram.png", "Armis"),
+    ("BRAND.ai Logical Architecture.png", "Brand.ai"),
+    ("IBM Guardium AI STR Diagram.jpg", "IBM Guardium AI"),
+    ("IBM Guardium AI STR Diagram_v2.jpg", "IBM Guardium AI"),
+    ("Logical-iCoupon.png", "iCoupon"),
+    ("STR - Amazon Q Business and AWS Chatbot Strategic Portfolio New Product Request Form V3.1.docx",
+     "Amazon Q Business and AWS Chatbot"),
+    ("STR SSO Knowable Logicalv2.png", "Knowable"),
+    ("Udemy_Logical_AI assistant.pdf", "Udemy"),
+    ("figma-ai.png", "Figma AI"),
+])
+def test_review_log_matches(document, product):
+    mapping = d.match_documents(d.load_products(REVIEW_LOG), {document: [[UUID, UUID + document]]}, 1)
+    assert [match["product"] for match in mapping["exact_matches"]] == [product]
+
+# Placement of mapping matches on list items (STRMigration._add_mapped_documents)
+
+HEADER = "ID,Product Name,STR Approved,Architecture Diagram/Picture\n"
+
+def place(workdir, logger, matches):
+    csv_path = workdir / "log.csv"
+    csv_path.write_text(HEADER + "11,Alpha,Approved,\n12,Beta,Approved,\n13,Beta,Pending,\n")
+    mapping = workdir / "mapping.json"
+    mapping.write_text(json.dumps({"exact_matches": matches}))
+    plan = []
+    m.STRMigration(logger=logger)._add_mapped_documents(plan, mapping, csv_path)
+    return [(f["csv_row"], f["document"]) for f in plan]
+
+def match(product, info, document):
+    return {"product": product, "product_info": info, "files": [[UUID, document]]}
+
+def test_matches_with_an_id_are_placed_on_it(workdir, logger):
+    assert place(workdir, logger, [match("Beta", {"id": "13", "row": 2}, "b.png")]) == [("13", "b.png")]
+
+def test_matches_without_an_id_use_their_row_then_the_name(workdir, logger):
+    assert place(workdir, logger, [
+        match("Beta", {"row": 4}, "b.png"),       # row 4 is the second Beta
+        match("Alpha", {"row": 3}, "a.png"),      # row 3 is Beta: first Alpha by name instead
+    ]) == [("13", "b.png"), ("11", "a.png")]
+
+def test_unplaceable_matches_are_skipped_with_a_warning(workdir, logger, caplog):
+    logger.propagate = True
+    with caplog.at_level("WARNING", logger=logger.name):
+        placed = place(workdir, logger, [match("Gamma", {"row": 2}, "g.png"),
+                                         match("Alpha", {"id": "11"}, "a.png")])
+
+    assert placed == [("11", "a.png")]
+    assert "Gamma" in caplog.text and "1 mapping matches could not be placed" in caplog.text
+
+def test_one_document_per_list_item(workdir, logger):
+    assert place(workdir, logger, [match("Alpha", {"id": "11"}, "a1.png"),
+                                   match("Alpha", {"id": "11"}, "a2.png")]) == [("11", "a1.png")]
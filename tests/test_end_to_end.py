@@ -0,0 +1,61 @@
+from benchmark_migration import make_plan
+from mock_graph_server import GraphState
+
+def new_urls(state, plan):
+    return [state.list_items[f["csv_row"]]["Architecture_Diagram_Picture"].startswith("https://mock")
+            for f in plan]
+
+def test_test_run_leaves_files_for_production(graph, migrator):
+    sources, plan = make_plan(8, size_scale=0.02)
+    state = graph(sources, plan).state
+
+    results = migrator(test_mode=True).run_migration(plan)
+    assert results["completed"] == 5
+    assert not any(new_urls(state, plan))
+
+    results = migrator().run_migration(plan)
+    assert (results["completed"], results["skipped"]) == (8, 0)
+    assert all(new_urls(state, plan))
+
+def test_duplicate_product_names_get_their_own_uploads(graph, migrator):
+    sources, plan = make_plan(3, duplicate_ratio=0, size_scale=0.02)
+    for file_info in plan:
+        file_info["product"] = "monday.com"
+    state = graph(sources, plan).state
+    mig = migrator()
+
+    assert mig.run_migration(plan)["completed"] == 3
+    assert len({mig.progress.get_file(f["sharepoint_id"])["details"]["sharepoint_id"] for f in plan}) == 3
+    assert len(state.drive) == 3
+
+    report = mig.verify_migration(plan)
+    assert (report["verified"], report["mismatched"], report["missing"]) == (3, 0, 0)
+
+def test_reconcile_adopts_only_the_entrys_own_upload(graph, migrator):
+    sources, plan = make_plan(2, duplicate_ratio=0, size_scale=0.02)
+    state = graph(sources, plan).state
+    mig = migrator()
+    mig.resolve_onedrive_items(plan)
+    for file_info in plan:
+        mig.progress.mark_file(file_info["sharepoint_id"], "processing")
+
+    # Interrupted after the first upload landed; a foreign file holds the second name
+    name = [mig.api_client._sanitize_filename(mig._target_filename(f)) for f in plan]
+    own = state.store(name[0], GraphState.content(sources[plan[0]["onedrive_item_id"]]))
+    state.store(name[1], b"someone else's file")
+
+    assert mig._reconcile("t", plan[0])["sharepoint_id"] == own["id"]
+    assert mig._reconcile("t", plan[1]) == {}
+
+def test_identical_attachments_upload_once(graph, migrator):
+    sources, plan = make_plan(6, duplicate_ratio=0, size_scale=0.02)
+    first = sources[plan[0]["onedrive_item_id"]]
+    for source in sources.values():
+        source.update(content_key=first["content_key"], size=first["size"])
+    state = graph(sources, plan).state
+
+    results = migrator().run_migration(plan, workers=4)
+
+    assert results["completed"] == 6
+    assert len(state.drive) == 1
+    assert all(new_urls(state, plan))
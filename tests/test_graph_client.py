@@ -0,0 +1,61 @@
+import random
+
+import mock_graph_server
+import str_migration_robust as m
+
+def batch_gets(count):
+    return [{"id": str(i), "method": "GET", "url": m.GraphAPIClient.list_item_path(str(i))}
+            for i in range(count)]
+
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(m.GraphAPIClient, "RETRY_DELAY", 0.001)
+    monkeypatch.setattr(mock_graph_server.MockConfig, "RETRY_AFTER", 0.001)
+
+def test_injected_errors_inside_batches_are_retried(graph, migrator, monkeypatch):
+    graph({}, [])
+    client = migrator().api_client
+    fast_retries(monkeypatch)
+    monkeypatch.setattr(mock_graph_server.MockConfig, "ERROR_RATE", 0.1)
+    random.seed(4)
+
+    results = client.execute_batch(batch_gets(100))
+
+    assert sorted(results, key=int) == [str(i) for i in range(100)]
+    assert {response["status"] for response in results.values()} == {200}
+
+def test_persistent_server_error_stops_after_max_retries(graph, migrator, monkeypatch, patch_route):
+    router = graph({}, [])
+    client = migrator().api_client
+    fast_retries(monkeypatch)
+    calls = []
+
+    def failing(match, query, headers, body):
+        calls.append(match.group(1))
+        return 502, {}, {"error": {"code": "BadGateway"}}
+
+    patch_route(router, "get_list_item", lambda handler: failing)
+
+    results = client.execute_batch(batch_gets(2))
+
+    assert {response["status"] for response in results.values()} == {502}
+    assert sorted(calls) == ["0"] * client.MAX_RETRIES + ["1"] * client.MAX_RETRIES
+
+def test_list_item_backup_goes_through_retries(graph, migrator, monkeypatch, patch_route):
+    router = graph({}, [{"csv_row": "7", "old_url": "https://old"}])
+    mig = migrator()
+    fast_retries(monkeypatch)
+    throttles = []
+    monkeypatch.setattr(mig.api_client.limiter, "on_throttle", throttles.append)
+    responses = iter([(429, {"Retry-After": "0.001"}, {}), (502, {}, {})])
+
+    def flaky(handler):
+        def respond(match, query, headers, body):
+            return next(responses, None) or handler(match, query, headers, body)
+        return respond
+
+    patch_route(router, "get_list_item", flaky)
+
+    backup = mig.backup_mgr.backup_sharepoint_item("7", mig.api_client.headers)
+
+    assert backup
+    assert throttles == [0.001]
@@ -0,0 +1,62 @@
+import json
+
+import str_migration_robust as m
+
+def plan_of(count):
+    return [{"csv_row": str(i), "old_url": f"https://old/{i}"} for i in range(1, count + 1)]
+
+def synced(mig, logger):
+    mirror = m.ListMirror(m.Config.LIST_MIRROR_FILE)
+    changed = mirror.refresh(mig.api_client, logger)
+    return mirror, changed
+
+def test_full_read_pages_and_persists_the_delta_link(graph, migrator, logger, monkeypatch):
+    monkeypatch.setattr(m.GraphAPIClient, "LIST_PAGE_SIZE", 2)
+    graph({}, plan_of(5))
+    mig = migrator()
+
+    mirror, changed = synced(mig, logger)
+
+    assert changed == 5
+    assert mirror.get("3")["fields"] == {"Architecture_Diagram_Picture": "https://old/3"}
+    saved = json.loads(m.Config.LIST_MIRROR_FILE.read_text())
+    assert saved["delta_link"] == mirror.delta_link and len(saved["items"]) == 5
+
+def test_next_sync_reads_only_changes(graph, migrator, logger):
+    graph({}, plan_of(4))
+    mig = migrator()
+    synced(mig, logger)
+    assert mig.api_client.update_list_item("2", "https://new/2")
+
+    mirror, changed = synced(mig, logger)
+
+    assert changed == 1
+    assert mirror.get("2")["fields"]["Architecture_Diagram_Picture"] == "https://new/2"
+    assert mirror.get("1")["fields"]["Architecture_Diagram_Picture"] == "https://old/1"
+
+def test_expired_delta_token_re_reads_the_list(graph, migrator, logger, patch_route):
+    router = graph({}, plan_of(3))
+    mig = migrator()
+    synced(mig, logger)
+
+    def expire(handler):
+        def respond(match, query, headers, body):
+            if query.get("token", ["0"])[0] != "0":
+                return 410, {}, {"error": {"code": "resyncRequired"}}
+            return handler(match, query, headers, body)
+        return respond
+
+    patch_route(router, "get_list_delta", expire)
+    mirror, changed = synced(mig, logger)
+
+    assert changed == 3 and len(mirror.items) == 3
+
+def test_mirror_of_another_list_is_ignored(graph, migrator, logger, monkeypatch):
+    graph({}, plan_of(2))
+    synced(migrator(), logger)
+    monkeypatch.setattr(m.Config, "LIST_ID", "other")
+
+    mirror = m.ListMirror(m.Config.LIST_MIRROR_FILE)
+
+    assert mirror.items == {} and mirror.delta_link is None
+    assert mirror.get("1") is None
@@ -0,0 +1,19 @@
+import requests
+
+from mock_graph_server import start_server
+
+def test_servers_in_one_process_keep_separate_state():
+    first = start_server({}, list_items={"1": {"Title": "first"}})
+    second = start_server({}, list_items={"1": {"Title": "second"}})
+    try:
+        titles = [
+            requests.get(f"http://127.0.0.1:{server.server_port}/v1.0/sites/s/lists/l/items/1",
+                         timeout=5).json()["fields"]["Title"]
+            for server in (first, second)
+        ]
+        assert titles == ["first", "second"]
+        assert first.router.state is not second.router.state
+    finally:
+        for server in (first, second):
+            server.shutdown()
+            server.server_close()
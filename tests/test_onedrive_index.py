@@ -0,0 +1,59 @@
+import json
+
+from benchmark_migration import make_plan
+import mock_graph_server
+import str_migration_robust as m
+
+def refreshed(mig, logger):
+    index = m.OneDriveIndex(m.Config.ONEDRIVE_INDEX_FILE)
+    changed = index.refresh(mig.api_client, logger)
+    return index, changed
+
+def test_delta_pages_are_indexed_and_the_link_persisted(graph, migrator, logger, monkeypatch):
+    monkeypatch.setattr(mock_graph_server.MockConfig, "DELTA_PAGE_SIZE", 3)
+    sources, plan = make_plan(8)
+    graph(sources, plan)
+    mig = migrator()
+
+    index, changed = refreshed(mig, logger)
+
+    assert changed == 8 and set(index.items) == set(sources)
+    saved = json.loads(m.Config.ONEDRIVE_INDEX_FILE.read_text())
+    assert saved["delta_link"].endswith("token=1") and len(saved["items"]) == 8
+    name = sources["OD00000003"]["name"]
+    assert index.find_by_name(name) == index.find_by_name(name.upper()) == "OD00000003"
+
+    # The next refresh continues from the saved link
+    index, changed = refreshed(mig, logger)
+    assert changed == 0 and len(index.items) == 8
+
+def test_expired_delta_token_re_enumerates(graph, migrator, logger, patch_route):
+    sources, plan = make_plan(4)
+    router = graph(sources, plan)
+    mig = migrator()
+    refreshed(mig, logger)
+    del router.state.sources["OD00000000"]
+
+    def expire(handler):
+        def respond(match, query, headers, body):
+            if query.get("token"):
+                return 410, {}, {"error": {"code": "resyncRequired"}}
+            return handler(match, query, headers, body)
+        return respond
+
+    patch_route(router, "get_delta", expire)
+    index, changed = refreshed(mig, logger)
+
+    assert changed == 3
+    assert sorted(index.items) == ["OD00000001", "OD00000002", "OD00000003"]
+
+def test_plan_entries_resolve_through_share_tokens(graph, migrator):
+    sources, plan = make_plan(5)
+    plan[4]["old_url"] = plan[4]["old_url"].replace(plan[4]["sharepoint_id"], "EbUnknown")
+    plan[4]["sharepoint_id"] = "EbUnknown"
+    graph(sources, plan)
+    mig = migrator()
+
+    assert mig.resolve_onedrive_items(plan) == 1
+    assert [f["onedrive_item_id"] for f in plan] == ["OD00000000", "OD00000001", "OD00000002",
+                                                     "OD00000003", None]
@@ -0,0 +1,47 @@
+import math
+
+from benchmark_migration import make_plan
+import str_migration_robust as m
+
+MB = 1024 * 1024
+
+def planned(graph, migrator, sources, plan, **kwargs):
+    graph(sources, plan)
+    mig = migrator()
+    mig.resolve_onedrive_items(plan)
+    return mig, mig.plan_migration(plan, **kwargs)
+
+def test_request_counts_follow_the_pipeline(graph, migrator):
+    sources, plan = make_plan(30, duplicate_ratio=0, size_scale=0.001)
+    large = plan[0]["onedrive_item_id"]
+    sources[large]["size"] = 5 * MB
+
+    _, report = planned(graph, migrator, sources, plan, workers=4)
+
+    chunks = math.ceil(5 * MB / m.GraphAPIClient.UPLOAD_CHUNK_SIZE)
+    transfers = 2 * 30 + chunks                      # download + upload, plus the session's ranges
+    assert report["upload_sessions"] == 1
+    assert report["requests"] == {
+        "unbatched": transfers + 30 + 2 * 30,        # link, backup, update per file
+        "batched": transfers + 2 + 2 * 2,            # 30 links, backups and updates in envelopes of 20
+    }
+    assert report["transfer_bytes"] == 2 * sum(s["size"] for s in sources.values())
+    assert report["projected_seconds"]["batched"] <= report["projected_seconds"]["unbatched"]
+
+def test_recorded_progress_and_duplicates_need_fewer_requests(graph, migrator):
+    sources, plan = make_plan(3, duplicate_ratio=0, size_scale=0.001)
+    duplicate = dict(plan[2], csv_row="99", sharepoint_id=plan[2]["sharepoint_id"] + "-copy")
+    plan.append(duplicate)
+    graph(sources, plan)
+    mig = migrator()
+    mig.resolve_onedrive_items(plan)
+    duplicate["onedrive_item_id"] = plan[2]["onedrive_item_id"]
+    mig.progress.mark_file(plan[0]["sharepoint_id"], "completed", {"sharepoint_id": "SP1"})
+    mig.progress.mark_file(plan[1]["sharepoint_id"], "failed",
+                           {"sharepoint_id": "SP2", "share_url": "https://mock/link"})
+
+    report = mig.plan_migration(plan, workers=2)
+
+    assert (report["skipped"], report["files"], report["transfers"], report["reused_uploads"]) == (1, 3, 1, 1)
+    # Entry 1 only needs backup + update; entry 2 transfers; its duplicate reuses the upload
+    assert report["requests"]["unbatched"] == 2 + (2 + 3) + (1 + 2)
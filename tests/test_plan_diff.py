@@ -0,0 +1,69 @@
+import csv
+import json
+
+import str_migration_robust as m
+
+HEADER = ['ID', 'Product Name', 'STR Approved', 'Architecture Diagram/Picture']
+
+def link(token: str) -> str:
+    return f"https://contoso-my.sharepoint.com/:i:/g/personal/joseph_brashear_contoso_com/{token}"
+
+def write_export(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(rows)
+    return path
+
+def test_diff_keeps_added_and_changed_rows(workdir, logger):
+    old = write_export(workdir / "old.csv", [
+        ['1', 'Alpha', 'Approved', link('EbAlpha')],
+        ['2', 'Beta', 'Approved', link('EbBeta')],
+        ['3', 'Gamma', 'Pending', link('EbGamma')],
+    ])
+    new = write_export(workdir / "new.csv", [
+        ['1', 'Alpha', 'Approved', link('EbAlpha')],
+        ['2', 'Beta', 'Approved', link('EbBeta2')],
+        ['3', 'Gamma', 'Approved', link('EbGamma') + '  '],   # status and whitespace do not count
+        ['4', 'Delta', 'Approved', link('EbDelta')],
+        ['5', 'Epsilon', 'Approved', 'https://example.com/not-a-onedrive-link'],
+    ])
+    mig = m.STRMigration(logger=logger)
+
+    plan = mig.load_migration_plan(new, previous_csv=old)
+
+    assert [(f['csv_row'], f['sharepoint_id']) for f in plan] == [('2', 'EbBeta2'), ('4', 'EbDelta')]
+
+def test_diff_against_same_export_is_empty(workdir, logger):
+    export = write_export(workdir / "export.csv", [
+        ['1', 'Alpha', 'Approved', link('EbAlpha')],
+        ['2', 'Beta', 'Approved', ''],
+    ])
+    mig = m.STRMigration(logger=logger)
+
+    assert len(mig.load_migration_plan(export)) == 1
+    assert mig.load_migration_plan(export, previous_csv=export) == []
+
+def test_mapped_documents_are_diffed_with_the_full_plan(workdir, logger):
+    rows = [
+        ['1', 'Alpha', 'Approved', link('EbAlpha')],
+        ['2', 'Beta', 'Approved', ''],
+    ]
+    old = write_export(workdir / "old.csv", rows)
+    new = write_export(workdir / "new.csv", rows + [['3', 'Gamma', 'Approved', '']])
+    mapping = workdir / "mapping.json"
+    mapping.write_text(json.dumps({"exact_matches": [
+        {"product": "Alpha", "product_info": {"id": "1"}, "files": [["", "alpha.vsdx"]]},
+        {"product": "Beta", "product_info": {"id": "2"}, "files": [["", "beta.vsdx"]]},
+        {"product": "Gamma", "product_info": {"row": 4}, "files": [["", "gamma.vsdx"]]},
+    ]}))
+    mig = m.STRMigration(logger=logger)
+
+    full = mig.load_migration_plan(new, mapping_path=mapping)
+    assert [(f['csv_row'], f.get('document')) for f in full] == [
+        ('1', None), ('2', 'beta.vsdx'), ('3', 'gamma.vsdx')
+    ]
+
+    # Alpha's own link still covers it and Beta is unchanged; only Gamma's row is new
+    diffed = mig.load_migration_plan(new, mapping_path=mapping, previous_csv=old)
+    assert [(f['csv_row'], f['document']) for f in diffed] == [('3', 'gamma.vsdx')]
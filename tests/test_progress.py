@@ -0,0 +1,60 @@
+import json
+
+import str_migration_robust as m
+
+def test_journal_replays_on_top_of_snapshot(workdir):
+    tracker = m.ProgressTracker(m.Config.PROGRESS_FILE)
+    tracker.mark_file("a", "completed", {"sharepoint_id": "SP1"})
+    tracker.save()
+    tracker.mark_file("b", "processing")
+    tracker.mark_file("b", "failed", {"error": "timeout"})
+    tracker._journal.close()  # crash: the last records exist only in the journal
+
+    reloaded = m.ProgressTracker(m.Config.PROGRESS_FILE)
+    assert reloaded.data["files"]["a"]["details"] == {"sharepoint_id": "SP1"}
+    assert reloaded.data["files"]["b"]["status"] == "failed"
+    assert (reloaded.data["completed"], reloaded.data["failed"]) == (1, 1)
+
+def test_total_is_journaled(workdir):
+    tracker = m.ProgressTracker(m.Config.PROGRESS_FILE)
+    tracker.set_total(3)
+    tracker.set_total(5)
+    tracker._journal.close()
+
+    assert m.ProgressTracker(m.Config.PROGRESS_FILE).data["total"] == 5
+
+def test_torn_journal_line_is_ignored(workdir):
+    tracker = m.ProgressTracker(m.Config.PROGRESS_FILE)
+    tracker.mark_file("a", "completed")
+    tracker._journal.write('{"id": "b", "sta')
+    tracker._journal.close()
+
+    reloaded = m.ProgressTracker(m.Config.PROGRESS_FILE)
+    assert reloaded.data["files"]["a"]["status"] == "completed"
+    assert "b" not in reloaded.data["files"]
+
+def test_compaction_folds_journal_into_snapshot(workdir, monkeypatch):
+    monkeypatch.setattr(m.Config, "PROGRESS_COMPACT_EVERY", 3)
+    tracker = m.ProgressTracker(m.Config.PROGRESS_FILE)
+    for file_id in "abc":
+        tracker.mark_file(file_id, "completed")
+
+    snapshot = json.loads(m.Config.PROGRESS_FILE.read_text())
+    assert snapshot["journal_seq"] == 3 and set(snapshot["files"]) == {"a", "b", "c"}
+    assert tracker.journal_path.read_text() == ""
+
+    tracker.mark_file("d", "completed")
+    tracker._journal.close()
+    reloaded = m.ProgressTracker(m.Config.PROGRESS_FILE)
+    assert reloaded.data["completed"] == 4
+
+def test_stale_journal_after_compaction_is_not_replayed(workdir):
+    tracker = m.ProgressTracker(m.Config.PROGRESS_FILE)
+    tracker.mark_file("a", "completed")
+    journal = tracker.journal_path.read_text()
+    tracker.save()
+    # Crash between the snapshot rename and the journal truncate
+    tracker.journal_path.write_text(journal)
+
+    reloaded = m.ProgressTracker(m.Config.PROGRESS_FILE)
+    assert reloaded.data["completed"] == 1
@@ -0,0 +1,50 @@
+import base64
+
+import str_migration_robust as m
+
+def reference_quick_xor(data: bytes) -> str:
+    """Bit-by-bit quickXorHash, as in Microsoft's reference implementation"""
+    register = [0] * 160
+    for i, byte in enumerate(data):
+        for bit in range(8):
+            if byte >> bit & 1:
+                register[(i * 11 + bit) % 160] ^= 1
+    value = sum(bit << position for position, bit in enumerate(register))
+    value ^= len(data) << 96
+    return base64.b64encode(value.to_bytes(20, 'little')).decode()
+
+def digest(*chunks: bytes) -> str:
+    hasher = m.QuickXorHash()
+    for chunk in chunks:
+        hasher.update(chunk)
+    return hasher.base64digest()
+
+def test_known_vectors():
+    assert digest(b'') == "AAAAAAAAAAAAAAAAAAAAAAAAAAA="
+    assert digest(b'J') == "SgAAAAAAAAAAAAAAAQAAAAAAAAA="
+
+def test_matches_reference_across_block_boundaries():
+    data = bytes(range(256)) * 3 + b'tail'
+    for length in (1, 2, 159, 160, 161, 320, 333, len(data)):
+        assert digest(data[:length]) == reference_quick_xor(data[:length])
+
+def test_chunked_updates_match_single_update():
+    data = bytes((i * 7 + 3) % 251 for i in range(5000))
+    assert digest(data[:1], data[1:170], data[170:171], data[171:]) == digest(data)
+
+def test_update_at_skips_replayed_ranges():
+    data = bytes(range(200)) * 4
+    hasher = m.QuickXorHash()
+    hasher.update_at(0, data[:300])
+    hasher.update_at(250, data[250:500])   # resumed transfer replays 250-299
+    hasher.update_at(500, data[500:])
+    assert hasher.base64digest() == digest(data)
+
+def test_update_at_rejects_gaps():
+    hasher = m.QuickXorHash()
+    hasher.update(b'abc')
+    try:
+        hasher.update_at(5, b'xyz')
+    except ValueError:
+        return
+    raise AssertionError("a gap in the input was accepted")
@@ -0,0 +1,95 @@
+import csv
+import shutil
+from pathlib import Path
+
+import pytest
+
+import str_migration_robust as m
+from str_review_log_cache import ReviewLog, build_cache, cache_dir_for, parse_date
+
+REVIEW_LOG = Path(__file__).resolve().parent.parent / "Software Technology Request (STR) Review Log (1).csv"
+
+def read_csv(path):
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        return header, [row + [''] * (len(header) - len(row)) for row in reader]
+
+def expected(cell, kind):
+    if kind != "date":
+        return cell
+    return parse_date(cell).replace(tzinfo=None) if cell.strip() else None
+
+@pytest.fixture
+def review_log(tmp_path):
+    path = tmp_path / REVIEW_LOG.name
+    shutil.copy(REVIEW_LOG, path)
+    return path
+
+def test_every_cell_round_trips(review_log):
+    header, rows = read_csv(review_log)
+
+    log = ReviewLog.open_csv(review_log)
+
+    assert log.names == header and log.rows == len(rows)
+    assert {log.kind(name) for name in header} == {"category", "date", "text"}
+    for number, name in enumerate(header):
+        column, kind = log.column(name), log.kind(name)
+        assert [column.value(row) for row in range(log.rows)] == [expected(row[number], kind) for row in rows], name
+
+def test_each_column_kind_is_chosen(tmp_path):
+    path = tmp_path / "log.csv"
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Created', 'Status', 'Notes'])
+        for number in range(70):
+            writer.writerow([f"1/{number % 28 + 1}/2025" if number % 5 else '',
+                             'Approved' if number % 2 else 'Pending',
+                             f"note {number} – ünïcode"])
+        writer.writerow(['2/1/2025'])   # short row: missing cells read as empty
+
+    log = ReviewLog.open_csv(path)
+
+    assert [log.kind(name) for name in log.names] == ["date", "category", "text"]
+    assert log.column('Status').dictionary == ['Pending', 'Approved', '']
+    assert log.column('Notes').value(7) == "note 7 – ünïcode"
+    assert log.column('Created').value(0) is None
+    late_approved = [n for n in range(70) if n % 5 and n % 28 + 1 >= 20 and n % 2]
+    assert log.where(('Created', '>=', '2025-01-20'), ('Status', '==', 'Approved')).row_ids() == late_approved
+    assert log.select('Status', 'Notes')[-1] == {'Status': '', 'Notes': ''}
+
+def test_changed_csv_is_rebuilt(review_log):
+    ReviewLog.open_csv(review_log)
+    assert ReviewLog.open_current(review_log) is not None
+
+    with open(review_log, 'a', encoding='utf-8', newline='') as f:
+        f.write("\n")
+    assert ReviewLog.open_current(review_log) is None
+
+    rebuilt = ReviewLog.open_csv(review_log)
+    assert ReviewLog.is_current(review_log, cache_dir_for(review_log))
+    assert rebuilt.rows == len(read_csv(review_log)[1])
+    assert not cache_dir_for(review_log).with_name(cache_dir_for(review_log).name + '.tmp').exists()
+
+def test_plan_loader_reads_the_cache(review_log, logger, caplog):
+    mig = m.STRMigration(logger=logger)
+    from_csv = list(mig.iter_migration_plan(review_log))
+    assert from_csv
+
+    build_cache(review_log)
+    logger.propagate = True
+    with caplog.at_level("INFO", logger=logger.name):
+        from_cache = list(mig.iter_migration_plan(review_log))
+
+    assert from_cache == from_csv
+    assert "Reading plan columns from" in caplog.text
+
+def test_plan_loader_ignores_a_stale_cache(review_log, logger, caplog):
+    build_cache(review_log)
+    with open(review_log, 'a', encoding='utf-8', newline='') as f:
+        f.write("\n")
+
+    logger.propagate = True
+    with caplog.at_level("INFO", logger=logger.name):
+        assert list(m.STRMigration(logger=logger).iter_migration_plan(review_log))
+    assert "Reading plan columns from" not in caplog.text
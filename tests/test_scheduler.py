@@ -0,0 +1,104 @@
+import threading
+
+import str_migration_robust as m
+
+MB = 1024 * 1024
+
+def entries(*statuses):
+    return [{'status': status, 'product': f"P{i}", 'csv_row': str(i)} for i, status in enumerate(statuses)]
+
+def scheduler(workers, **kwargs):
+    kwargs.setdefault('priorities', [('status', 'Approved')])
+    return m.Scheduler(workers, small_file_max=MB, latency=0.1, bandwidth=MB, **kwargs)
+
+def test_tiers_follow_priority_order():
+    sched = scheduler(2, priorities=[('status', 'Approved'), ('product', 'P1')])
+    plan = entries('Pending', 'Pending', ' approved ')
+    assert [sched.tier(f) for f in plan] == [2, 1, 0]
+
+def test_lanes_sort_by_tier_then_longest_first():
+    sched = scheduler(4)
+    plan = entries('Pending', 'Approved', 'Approved', 'Pending', 'Approved', 'Pending')
+    sizes = [5 * MB, 2 * MB, 8 * MB, 100, 1000, 10 * MB]
+    sched.build(plan, sizes)
+
+    assert sched.lanes[sched.FAST] == [4, 3]
+    assert sched.lanes[sched.MAIN] == [2, 1, 5, 0]
+
+def test_fast_lane_workers():
+    assert scheduler(8).worker_lanes.count(m.Scheduler.FAST) == 2
+    assert scheduler(4, fast_lane_workers=3).worker_lanes.count(m.Scheduler.FAST) == 3
+    # At least one worker always serves the main lane
+    assert scheduler(2, fast_lane_workers=5).worker_lanes == [m.Scheduler.FAST, m.Scheduler.MAIN]
+    assert scheduler(1).worker_lanes == [m.Scheduler.MAIN]
+    assert scheduler(4, enabled=False).worker_lanes == [m.Scheduler.MAIN] * 4
+
+def test_idle_worker_takes_the_other_lane_only_for_a_lower_tier():
+    sched = scheduler(2)
+    plan = entries('Pending', 'Approved', 'Pending')
+    sched.build(plan, [10 * MB, 100, 200])
+    queues = sched._queues()
+
+    # A main-lane worker prefers the Approved small file over its own Pending head
+    assert sched._take(queues, sched.MAIN) == 1
+    assert sched._take(queues, sched.MAIN) == 0
+    assert sched._take(queues, sched.MAIN) == 2
+    assert sched._take(queues, sched.MAIN) is None
+
+def test_single_worker_runs_in_schedule_order():
+    sched = scheduler(1)
+    plan = entries('Pending', 'Approved', 'Pending', 'Approved')
+    sched.build(plan, [MB // 2, 3 * MB, 4 * MB, 200])
+    order = []
+
+    outcomes, seconds = sched.run(lambda seq, position: order.append(position) or seq)
+
+    assert order == [1, 3, 2, 0]
+    assert outcomes == [4, 1, 3, 2] and len(seconds) == 4
+
+def test_disabled_runs_in_plan_order():
+    sched = scheduler(1, enabled=False)
+    plan = entries('Pending', 'Approved', 'Pending')
+    sched.build(plan, [MB // 2, 3 * MB, 200])
+    order = []
+
+    sched.run(lambda seq, position: order.append(position))
+
+    assert order == [0, 1, 2]
+
+def test_run_dispatches_every_entry_once_across_workers():
+    sched = scheduler(4)
+    plan = entries(*['Approved', 'Pending'] * 20)
+    sched.build(plan, [(i % 5) * MB // 2 + 1 for i in range(40)])
+    lock = threading.Lock()
+    seen = []
+
+    def work(seq, position):
+        with lock:
+            seen.append(position)
+        return position
+
+    outcomes, _ = sched.run(work)
+
+    assert sorted(seen) == list(range(40))
+    assert outcomes == list(range(40))
+
+def test_longest_first_shortens_the_makespan():
+    sched = scheduler(2, fast_lane_workers=0)
+    plan = entries(*['Pending'] * 5)
+    sched.build(plan, [2 * MB] * 4 + [8 * MB])
+
+    assert sched.lanes[sched.MAIN][0] == 4
+    # The large file starts first instead of running alone at the end
+    assert sched.simulate(sched.estimates) == 4 * sched.estimates[0]
+    assert sched.simulate(sched.estimates, plan_order=True) == 2 * sched.estimates[0] + sched.estimates[4]
+
+def test_project_is_bounded_by_bandwidth():
+    sched = scheduler(8)
+    plan = entries(*['Pending'] * 4)
+    sched.build(plan, [4 * MB] * 4)
+
+    assert sched.project() >= 2 * 16 * MB / sched.bandwidth
+    report = sched.report(actual=1.0, seconds=[0.5] * 4)
+    assert report["lanes"] == {"fast": 0, "main": 4}
+    assert report["replayed_seconds"] == 0.5
@@ -0,0 +1,101 @@
+import json
+from collections import Counter
+
+import str_migration_robust as m
+
+def entry(status, timestamp, error=None):
+    return {"status": status, "timestamp": timestamp, "details": {"error": error} if error else {}}
+
+def write_shard(workdir, name, files, total, audit=()):
+    """Lay out one shard's progress snapshot, audit log and backup index"""
+    log_dir = workdir / m.Config.LOG_DIR / name
+    log_dir.mkdir(parents=True)
+    with open(log_dir / m.Config.PROGRESS_FILE.name, 'w') as f:
+        json.dump({"started": "2025-01-01T00:00:00", "total": total, "completed": 0, "failed": 0,
+                   "files": files, "journal_seq": 0}, f)
+    with open(log_dir / m.Config.AUDIT_LOG.name, 'w') as f:
+        for timestamp, event in audit:
+            f.write(json.dumps({"timestamp": timestamp, "event": event}) + '\n')
+        f.write('{"timestamp": "2025-01-0')   # torn final line of a running shard
+
+    backup_dir = workdir / m.Config.BACKUP_DIR / name
+    backup_dir.mkdir(parents=True)
+    with open(backup_dir / m.Config.BACKUP_INDEX_NAME, 'w') as f:
+        f.write('{}\n' * len(files))
+
+def merge(workdir, logger):
+    return m.merge_shards(workdir / m.Config.LOG_DIR, workdir / m.Config.BACKUP_DIR,
+                          workdir / "merged", logger)
+
+def test_shard_assignment_is_stable_and_in_range():
+    ids = [f"Eb{number:05d}" for number in range(2000)]
+
+    shards = [m.shard_of(sharepoint_id, 4) for sharepoint_id in ids]
+
+    assert shards == [m.shard_of(sharepoint_id, 4) for sharepoint_id in ids]
+    assert set(shards) == {1, 2, 3, 4}
+    assert min(Counter(shards).values()) > 400
+    # Pinned: sha256-based, so the same on every host and Python version
+    assert [m.shard_of(sharepoint_id, 4) for sharepoint_id in ("EbAlpha", "EbBeta", "EbGamma")] == [4, 4, 3]
+    assert [m.shard_of(sharepoint_id, 7) for sharepoint_id in ("EbAlpha", "EbBeta", "EbGamma")] == [5, 4, 1]
+    assert m.shard_of("anything", 1) == 1
+
+def test_select_shard_partitions_the_plan_in_order():
+    plan = [{"sharepoint_id": f"Eb{number}"} for number in range(100)]
+
+    selected = [m.select_shard(plan, index, 3) for index in (1, 2, 3)]
+
+    assert sorted(sum(selected, []), key=plan.index) == plan
+    assert sum(len(part) for part in selected) == len(plan)
+    for part in selected:
+        assert part == sorted(part, key=plan.index)
+
+def test_use_shard_moves_state_files(monkeypatch):
+    for attr in m.Config.SHARD_STATE_FILES + ("LOG_DIR", "BACKUP_DIR", "SHARD"):
+        monkeypatch.setattr(m.Config, attr, getattr(m.Config, attr))
+    log_dir, backup_dir = m.Config.LOG_DIR, m.Config.BACKUP_DIR
+
+    m.Config.use_shard(2, 3)
+
+    assert m.Config.SHARD == (2, 3)
+    assert m.Config.LOG_DIR == log_dir / "shard-2-of-3"
+    assert m.Config.BACKUP_DIR == backup_dir / "shard-2-of-3"
+    for attr in m.Config.SHARD_STATE_FILES:
+        assert getattr(m.Config, attr).parent == log_dir / "shard-2-of-3"
+
+def test_merge_keeps_newest_status_and_reports_missing_shards(workdir, logger):
+    write_shard(workdir, "shard-1-of-3", {
+        "a": entry("completed", "2025-01-01T10:00:00"),
+        "b": entry("failed", "2025-01-01T10:05:00", error="HTTP 500"),
+    }, total=2, audit=[("2025-01-01T10:00:00", "one"), ("2025-01-01T10:05:00", "three")])
+    # A re-sharded run picked "b" up again later and finished it
+    write_shard(workdir, "shard-1-of-2", {
+        "b": entry("completed", "2025-01-02T09:00:00"),
+        "c": entry("failed", "2025-01-02T09:30:00", error="Download failed"),
+    }, total=2, audit=[("2025-01-01T10:02:00", "two"), ("2025-01-02T09:30:00", "four")])
+
+    summary = merge(workdir, logger)
+
+    with open(workdir / "merged" / m.Config.PROGRESS_FILE.name) as f:
+        progress = json.load(f)
+    assert {file_id: e["status"] for file_id, e in progress["files"].items()} == {
+        "a": "completed", "b": "completed", "c": "failed"}
+    assert (progress["total"], progress["completed"], progress["failed"]) == (4, 2, 1)
+    assert m.ProgressTracker(workdir / "merged" / m.Config.PROGRESS_FILE.name).data["files"] == progress["files"]
+
+    assert summary["missing_shards"] == ["shard-2-of-2", "shard-2-of-3", "shard-3-of-3"]
+    assert summary["failed_files"] == [{"file_id": "c", "shard": "shard-1-of-2", "error": "Download failed"}]
+    assert summary["shards"]["shard-1-of-3"]["statuses"] == {"completed": 1, "failed": 1}
+    assert summary["totals"]["backups"] == 4
+
+    with open(workdir / "merged" / m.Config.AUDIT_LOG.name) as f:
+        audit = [json.loads(line) for line in f]
+    assert [(r["event"], r["shard"]) for r in audit] == [
+        ("one", "shard-1-of-3"), ("two", "shard-1-of-2"), ("three", "shard-1-of-3"), ("four", "shard-1-of-2")]
+    assert summary["totals"]["audit_records"] == 4
+
+def test_merge_without_shards(workdir, logger):
+    summary = merge(workdir, logger)
+
+    assert summary["shards"] == {} and summary["missing_shards"] == []
+    assert not (workdir / "merged").exists()
@@ -0,0 +1,78 @@
+import threading
+import time
+
+from azure.core.credentials import AccessToken
+from azure.identity import AuthenticationRequiredError
+
+import str_migration_robust as m
+
+class FakeCredential:
+    def __init__(self, name, lifetime=3600, error=None):
+        self.name = name
+        self.lifetime = lifetime
+        self.error = error
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def get_token(self, *scopes):
+        time.sleep(0.02)
+        with self.lock:
+            self.calls += 1
+            if self.error:
+                raise self.error
+            return AccessToken(f"{self.name}-{self.calls}", int(time.time() + self.lifetime))
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+def test_burst_of_401s_refreshes_once(logger):
+    credential = FakeCredential("token")
+    provider = m.TokenProvider(credential, logger)
+    stale = provider.headers["Authorization"]
+    results = []
+
+    threads = [threading.Thread(target=lambda: results.append(provider.refresh(stale_header=stale)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert credential.calls == 2
+    assert set(results) == {"Bearer token-2"} == {provider.headers["Authorization"]}
+
+def test_background_refresh_never_uses_the_interactive_credential(logger, monkeypatch):
+    monkeypatch.setattr(m.Config, "TOKEN_REFRESH_MARGIN", 3600)
+    interactive = FakeCredential("browser")
+    silent = FakeCredential("silent")
+    provider = m.TokenProvider(interactive, logger, background_credential=silent)
+
+    provider.start()
+    try:
+        assert wait_for(lambda: silent.calls >= 2)
+    finally:
+        provider.stop()
+
+    assert interactive.calls == 1
+    assert provider.headers["Authorization"].startswith("Bearer silent-")
+
+def test_background_refresh_stops_when_sign_in_is_needed(logger, monkeypatch):
+    monkeypatch.setattr(m.Config, "TOKEN_REFRESH_MARGIN", 3600)
+    interactive = FakeCredential("browser")
+    silent = FakeCredential("silent", error=AuthenticationRequiredError([m.Config.GRAPH_SCOPE]))
+    provider = m.TokenProvider(interactive, logger, background_credential=silent)
+
+    provider.start()
+    provider._thread.join(timeout=5)
+
+    assert not provider._thread.is_alive()
+    assert (interactive.calls, silent.calls) == (1, 1)
+    assert provider.headers["Authorization"] == "Bearer browser-1"
+
+def test_no_background_refresh_without_a_silent_credential(logger):
+    provider = m.TokenProvider(FakeCredential("browser"), logger)
+    provider.start()
+    assert provider._thread is None